@@ -1,7 +1,16 @@
 from __future__ import annotations
-from typing import Optional, Text
+import mmap
+import re
+import struct
+import sys
+from collections import deque
+from collections.abc import MutableMapping
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Text
 from a2_support import UserInterface, TextInterface
 from constants import *
+from history import History
+from instrumentation import Instrument
+from level_cache import LevelPack, is_pack, open_cache, open_pack, read_cache, write_cache
 
 # Replace these <strings> with your name, student number and email address.
 __author__ = "<Your Name>, <Your Student Number>"
@@ -14,27 +23,266 @@ __version__ = 1.0
 # Uncomment this function when you have completed the Level class and are ready
 # to attempt the Model class.
 
-def load_game(filename: str) -> list['Level']:
+_HEADER_PATTERN = re.compile(r'Maze (\d+) - (\d+) (\d+)\s*$')
+
+class LevelFormatError(ValueError):
+    """ 
+    Raised when a game file is malformed. Records where the problem is.
+    """
+    def __init__(self, filename: str, line_number: int, message: str) -> None:
+        """ Sets up the error for the given line of a game file.
+
+        Parameters:
+            self: instance itself
+            filename: The path to the game file
+            line_number: The 1-based line the problem was found on
+            message: A description of the problem
+
+        Returns:
+            None
+        """
+        super().__init__(f"{filename}:{line_number}: {message}")
+        self.filename = filename
+        self.line_number = line_number
+
+def iter_levels(filename: str) -> Iterator['Level']:
+    """ Reads a game file in a single pass, yielding each Level, with its
+        LevelIndex built, as soon as all of its rows have been read.
+
+    Parameters:
+        filename: The path to the game file
+
+    Returns:
+        An iterator over the Level instances in the file, in order
+
+    Raises:
+        LevelFormatError: If a header or row is malformed, or a maze has the
+            wrong number of rows
+    """
+    with open(filename, 'r') as file:
+        for level in parse_levels(file, filename):
+            level.index = LevelIndex(level)
+            yield level
+
+def split_levels(lines: Iterable[str], filename: str,
+                 first_line: int = 1) -> Iterator[tuple[int, tuple[int,int], list[tuple[int,str]]]]:
+    """ Splits the lines of a game file, or of part of one that starts at a
+        maze header, into levels without checking their rows. Each level is
+        yielded as soon as the next header is found.
+
+    Parameters:
+        lines: The lines to split, with or without their line endings
+        filename: The path of the game file, for error messages
+        first_line: The line number of the first line
+
+    Returns:
+        An iterator over (header line number, (#rows, #columns), rows) for
+        each level, where rows are the non-blank (line number, row) pairs
+
+    Raises:
+        LevelFormatError: If a header is malformed or a row comes before the
+            first header
+    """
+    dimensions = None
+    header_line = 0
+    rows = []
+    for line_number, line in enumerate(lines, first_line):
+        line = line.rstrip('\r\n')
+        if line.startswith('Maze'):
+            if dimensions is not None:
+                yield header_line, dimensions, rows
+            match = _HEADER_PATTERN.match(line)
+            if match is None:
+                raise LevelFormatError(filename, line_number, f"malformed maze header {line!r}")
+            dimensions = (int(match.group(2)), int(match.group(3)))
+            header_line = line_number
+            rows = []
+        elif len(line.strip()) == 0:
+            continue
+        elif dimensions is None:
+            raise LevelFormatError(filename, line_number, "row found before the first maze header")
+        else:
+            rows.append((line_number, line))
+    if dimensions is not None:
+        yield header_line, dimensions, rows
+
+def parse_levels(lines: Iterable[str], filename: str, first_line: int = 1) -> Iterator['Level']:
+    """ Parses the lines of a game file, or of part of one that starts at a
+        maze header, yielding each Level as soon as all of its rows are read.
+
+    Parameters:
+        lines: The lines to parse, with or without their line endings
+        filename: The path of the game file, for error messages
+        first_line: The line number of the first line
+
+    Returns:
+        An iterator over the Level instances in the lines, in order
+
+    Raises:
+        LevelFormatError: If a header or row is malformed, or a maze has the
+            wrong number of rows
+    """
+    for header_line, dimensions, rows in split_levels(lines, filename, first_line):
+        level = Level(dimensions)
+        num_rows, num_cols = dimensions
+        for line_number, line in rows:
+            if level.maze.rows_added == num_rows:
+                raise LevelFormatError(filename, line_number, f"maze has more than {num_rows} rows")
+            if len(line) != num_cols:
+                raise LevelFormatError(filename, line_number,
+                                       f"row has {len(line)} columns, expected {num_cols}")
+            invalid = _INVALID_CHARACTER.search(line)
+            if invalid is not None:
+                raise LevelFormatError(filename, line_number,
+                                       f"unknown character {invalid.group()!r} in column {invalid.start()}")
+            level.add_row(line)
+        _check_complete(level, filename, header_line)
+        yield level
+
+def _check_complete(level: 'Level', filename: str, header_line: int) -> None:
+    """ Raises LevelFormatError if the level is missing rows. """
+    num_rows = level.get_dimensions()[0]
+    if level.maze.rows_added != num_rows:
+        raise LevelFormatError(filename, header_line,
+                               f"maze has {level.maze.rows_added} rows, expected {num_rows}")
+
+def load_game(filename: str, use_cache: bool = False) -> list['Level']:
     """ Reads a game file and creates a list of all the levels in order.
+        With use_cache, compiled levels are cached next to the game file and
+        reused for as long as the file is unchanged.
         
     Parameters:
         filename: The path to the game file
+        use_cache: Whether to read and write the compiled level cache
         
     Returns:
         A list of all Level instances to play in the game
     """
-    levels = []
-    with open(filename, 'r') as file:
-        for line in file:
-            line = line.strip()
-            if line.startswith('Maze'):
-                _, _, dimensions = line[5:].partition(' - ')
-                dimensions = [int(item) for item in dimensions.split()]
-                levels.append(Level(dimensions))
-            elif len(line) > 0 and len(levels) > 0:
-                levels[-1].add_row(line)
+    if is_pack(filename):
+        return list(open_levels(filename))
+    if use_cache:
+        records = read_cache(filename)
+        if records is not None:
+            return [Level.from_compiled(record) for record in records]
+    levels = list(iter_levels(filename))
+    if use_cache:
+        write_cache(filename, [level.compile() for level in levels])
     return levels
 
+def open_levels(filename: str, use_cache: bool = False) -> 'PackedLevels':
+    """ Opens the levels of a game file or level pack without decoding them.
+        A text game file is opened as a LevelFile, which only parses the
+        levels that are used, or with use_cache compiled into its cache,
+        which is memory-mapped.
+
+    Parameters:
+        filename: The path to the game file or level pack
+        use_cache: Whether to read and write the compiled level cache
+
+    Returns:
+        A PackedLevels sequence of the levels in the file
+    """
+    if is_pack(filename):
+        pack = open_pack(filename)
+        if pack is None:
+            raise ValueError(f"{filename} is not a valid level pack")
+        return PackedLevels(pack)
+    if not use_cache:
+        return PackedLevels(LevelFile(filename))
+    pack = open_cache(filename)
+    if pack is None:
+        records = [level.compile() for level in iter_levels(filename)]
+        if write_cache(filename, records):
+            pack = open_cache(filename)
+        if pack is None:
+            pack = LevelPack.from_records(records)
+    return PackedLevels(pack)
+
+class LevelFile():
+    """ 
+    The levels of a text game file as a sequence of compiled level records,
+    like a LevelPack. The file is memory-mapped, the start of each maze is
+    found as it is needed, and a level is parsed only when it is asked for,
+    so opening a game reads no further than its first level.
+    """
+    def __init__(self, filename: str) -> None:
+        """ Opens a game file, checking that it starts with a maze header.
+
+        Parameters:
+            self: instance itself
+            filename: The path to the game file
+
+        Returns:
+            None
+
+        Raises:
+            LevelFormatError: If there are rows before the first maze header
+        """
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                self._data = b''
+        # The (byte offset, line number) of each maze found so far.
+        self._starts = []
+        self._scanned = 0
+        self._search = 0
+        self._line = 1
+        self._complete = False
+        self._scan(1)
+        end = self._starts[0][0] if self._starts else len(self._data)
+        lines = self._data[:end].decode(errors='replace').split('\n')
+        list(parse_levels(lines, filename))
+
+    def _scan(self, count: int) -> None:
+        """ Finds the starts of mazes until count have been found or the file
+            ends.
+        """
+        data = self._data
+        while len(self._starts) < count and not self._complete:
+            start = data.find(b'Maze', self._search)
+            if start == -1:
+                self._complete = True
+                break
+            self._search = start + 4
+            if start and data[start - 1] not in b'\r\n':
+                continue
+            self._line += data[self._scanned:start].count(b'\n')
+            self._scanned = start
+            self._starts.append((start, self._line))
+
+    def __len__(self) -> int:
+        self._scan(sys.maxsize)
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> bytes:
+        """ Parses the level at the given index and returns it compiled.
+
+        Parameters:
+            self: instance itself
+            index: the position of the level in the file
+
+        Returns:
+            The compiled level record
+
+        Raises:
+            LevelFormatError: If the level is malformed
+        """
+        self._scan(index + 2)
+        if not 0 <= index < len(self._starts):
+            raise IndexError('level index out of range')
+        start, line_number = self._starts[index]
+        end = self._starts[index + 1][0] if index + 1 < len(self._starts) else len(self._data)
+        text = self._data[start:end].decode().replace('\r\n', '\n').replace('\r', '\n')
+        level, = parse_levels(text.split('\n'), self.filename, line_number)
+        return level.compile()
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
 
 class Tile():
     """ 
@@ -50,6 +298,8 @@ class Tile():
             None
         """
         self.id = "AT"
+        # Set on the shared instances in TILE_FLYWEIGHTS, which must not change.
+        self.frozen = False
 
     def is_blocking(self) -> bool:
         """ A tile is blocking if a player would not be allowed to move onto the position
@@ -147,11 +397,15 @@ class Door(Tile):
     Door is a type of Tile that starts as locked (blocking). 
     Once the player has collected all coins in a given maze, the door is 'unlocked'.
     """
-    def __init__(self) -> None:
+    def __init__(self, maze: Optional[Maze] = None,
+                 position: Optional[tuple[int,int]] = None) -> None:
         super(Door,self).__init__()
         self.id = DOOR
+        self.maze = maze
+        self.position = position
     def unlock(self) -> None:
-        """ Unlocks the door
+        """ Unlocks the door. A door handed out by Maze.get_tile also opens
+            its cell of the maze. The shared Door tile cannot be unlocked.
         
         Parameters:
             self: instance itself
@@ -159,12 +413,33 @@ class Door(Tile):
         Returns:
             None
         """
+        if self.frozen:
+            raise TypeError("the shared Door tile cannot be unlocked; "
+                            "use Maze.get_tile(position).unlock() or Maze.unlock_door()")
         self.id = EMPTY
+        if self.maze is not None:
+            self.maze.open_door(self.position)
+
+# Maze keeps its tiles as one byte per cell. Each code indexes a shared Tile
+# instance, so looking up a tile never builds a new object.
+EMPTY_CODE, WALL_CODE, LAVA_CODE, DOOR_CODE = range(4)
+TILE_FLYWEIGHTS = (Empty(), Wall(), Lava(), Door())
+for _tile in TILE_FLYWEIGHTS:
+    _tile.frozen = True
+
+# Translation table from row characters to tile codes. Anything that is not a
+# tile (items, the player, unknown characters) is floor.
+_TILE_CODE_TABLE = bytearray([EMPTY_CODE]) * 256
+for _char, _code in ((WALL, WALL_CODE), (LAVA, LAVA_CODE), (DOOR, DOOR_CODE)):
+    _TILE_CODE_TABLE[ord(_char)] = _code
+_TILE_CHAR_TABLE = bytes.maketrans(bytes(range(len(TILE_FLYWEIGHTS))),
+                                   ''.join(tile.get_id() for tile in TILE_FLYWEIGHTS).encode())
 
 class Entity():
     """ 
     Provides base functionality for all entities in the game.
     """
+    __slots__ = ('position',)
     id = "E"
     def __init__(self,position: tuple[int,int]) -> None:
         """ Sets up this entity at the given (row, column) position.
@@ -176,9 +451,8 @@ class Entity():
         Returns:
             None
         """
-        self.row = position[0]
-        self.column = position[1]
-        
+        self.position = tuple(position)
+
 
     def get_position(self) -> tuple[int,int]:
         """ Returns this entities (row, column) position.
@@ -189,7 +463,7 @@ class Entity():
         Returns:
             Coordinates for the position of the entity (tuple of two integers)
         """
-        return (self.row,self.column)
+        return self.position
 
     def get_name(self) -> str:
         """ Returns the name of the class to which this entity belongs.
@@ -200,7 +474,7 @@ class Entity():
         Returns:
             string
         """
-        return self.class_name
+        return self.__class__.__name__
     
     def get_id(self) -> str:
         """ Returns the ID of this entity. For all non-abstract subclasses, 
@@ -235,13 +509,15 @@ class Entity():
         Returns:
             String
         """
-        return f"{self.__class__.__name__}(({self.row}, {self.column}))"
+        return f"{self.__class__.__name__}({self.position})"
 
 class DynamicEntity(Entity):
     """ 
     DynamicEntity is an abstract class which provides base functionality for special types 
     of Entities that are dynamic (e.g. can move from their original position).
     """
+    __slots__ = ()
+
     def set_position(self,new_position: tuple[int,int]) -> None:
         """ Updates the DynamicEntity's position to new_position, assuming it is a valid position.
 
@@ -252,8 +528,7 @@ class DynamicEntity(Entity):
         Returns:
             None
         """
-        self.row = new_position[0]
-        self.column = new_position[1]
+        self.position = tuple(new_position)
 
 
 class Player(DynamicEntity):
@@ -261,10 +536,24 @@ class Player(DynamicEntity):
     Player is a DynamicEntity that is controlled by the user, and must move 
     from its original position to the end of each maze.
     """
-    hunger = 0
-    thirst = 0
-    hp = 100
-    inventory = None
+    __slots__ = ('hunger', 'thirst', 'hp', 'inventory')
+
+    def __init__(self, position: tuple[int,int]) -> None:
+        """ Sets up a player at the given position with full health, no
+            hunger or thirst, and an empty inventory.
+
+        Parameters:
+            self: instance itself
+            position: the coordinates (row and column)
+
+        Returns:
+            None
+        """
+        super().__init__(position)
+        self.hunger = 0
+        self.thirst = 0
+        self.hp = MAX_HEALTH
+        self.inventory = Inventory()
 
     def get_hunger(self) -> int:
         """ Returns the player's current hunger level.
@@ -362,8 +651,6 @@ class Player(DynamicEntity):
         Returns:
             Inventory
         """
-        if self.inventory == None:
-            self.inventory = Inventory()
         return self.inventory
 
     def add_item(self, item: Item) -> None:
@@ -381,7 +668,9 @@ class Player(DynamicEntity):
 class Item(Entity):
     """ 
     Subclass of Entity which provides base functionality for all items in the game.
+    An item's only state is its position; its effect belongs to its class.
     """
+    __slots__ = ()
 
     def apply(self, player: Player) -> None:
         """ Applies the items effect, if any, to the given player.
@@ -399,18 +688,17 @@ class Potion(Item):
     """ 
     Inherits from Item. A potion is an item that increases the player's HP by 20 when applied.
     """
+    __slots__ = ()
     id = POTION
 
     def apply(self, player: Player) -> None:
-        self.player = player
-        self.player.hp += POTION_AMOUNT
-        if self.player.hp > 100:
-            self.player.hp = 100
+        player.change_health(POTION_AMOUNT)
 
 class Coin(Item):
     """ 
     Inherits from Item. A coin is an item that has no effect when applied to a player.
     """
+    __slots__ = ()
     id = COIN
     def apply(self, player: Player) -> None:
         pass
@@ -419,93 +707,117 @@ class Water(Item):
     """ 
     Inherits from Item. Water is an item that will decrease the player's thirst by 5 when applied.
     """
+    __slots__ = ()
     id = WATER
     def apply(self, player: Player) -> None:
-        self.player = player
-        self.player.thirst += WATER_AMOUNT
-        if self.player.thirst < 0:
-            self.player.thirst = 0
+        player.change_thirst(WATER_AMOUNT)
 
 class Food(Item):
     """ 
     Inherits from Item. Food is an abstract class. 
     Food subclasses implement an apply method that decreases the players hunger by a certain amount, depending on the type of food.
     """
+    __slots__ = ()
     id = FOOD
     def apply(self, player: Player) -> None:
-        self.player = player
-        self.player.hunger -= 0
-        if self.player.hunger < 0:
-            self.player.hunger = 0
+        player.change_hunger(0)
 
 class Apple(Food):
     """ 
     Inherits from Food. Apple is a type of food that decreases the player's hunger by 1 when applied.
     """
+    __slots__ = ()
     id = APPLE
     def apply(self, player: Player) -> None:
-        self.player = player
-        self.player.hunger += APPLE_AMOUNT
-        if self.player.hunger < 0:
-            self.player.hunger = 0
+        player.change_hunger(APPLE_AMOUNT)
 
 class Honey(Food):
     """ 
     Inherits from Food. Honey is a type of food that decreases the player's hunger by 5 when applied.
     """
+    __slots__ = ()
     id = HONEY
     def apply(self, player: Player) -> None:
-        self.player = player
-        self.player.hunger += HONEY_AMOUNT
-        if self.player.hunger < 0:
-            self.player.hunger = 0
+        player.change_hunger(HONEY_AMOUNT)
+
+# Maps the character used for each item in a game file to its class.
+ITEM_CLASSES = {COIN: Coin, POTION: Potion, APPLE: Apple, HONEY: Honey, WATER: Water}
+ITEM_NAMES = frozenset(item_class.__name__ for item_class in ITEM_CLASSES.values())
+_STRIP_ENTITIES = str.maketrans({entity_id: EMPTY for entity_id in (*ITEM_CLASSES, PLAYER)})
+_ENTITY_PATTERN = re.compile('[' + re.escape(''.join(ITEM_CLASSES) + PLAYER + DOOR) + ']')
+_INVALID_CHARACTER = re.compile('[^' + re.escape(''.join(ITEM_CLASSES) + PLAYER + WALL + LAVA + EMPTY + DOOR) + ']')
 
 class Inventory():
     """ 
-    An Inventory contains and manages a collection of items.
+    An Inventory contains and manages a collection of items. It counts how
+    many of each kind of item it holds; the item instances themselves are
+    only kept if keep_items is set. Otherwise only the first item of each
+    kind is kept, and items handed back out are new instances of its class
+    at its position.
     """
-    def __init__(self, initial_items: Optional[list] = None) -> None:
+    def __init__(self, initial_items: Optional[list] = None, keep_items: bool = False) -> None:
         """ Sets up initial inventory. If no initial_items is provided, 
-            inventory starts with an empty dictionary for the items. 
-            Otherwise, the initial dictionary is set up from the initial_items 
-            list to be a dictionary mapping item names to a list of item instances 
-            with that name.
+            inventory starts empty. Otherwise, the items in the list are
+            added in order.
 
         Parameters:
             self: instance itself
             initial_items: An optional list of Item instances
+            keep_items: whether to keep every Item instance, so remove_item
+                        returns the exact item that was added
             
         Returns:
             None
         """
-        self.inventory_dct = dict()
+        self.counts = dict()
+        self.kinds = dict()
+        self.kept = dict() if keep_items else None
+        self._text = None
         if initial_items is not None:
-            for i in initial_items:
-                class_name = i.__class__.__name__
-                if class_name in self.inventory_dct:
-                    self.inventory_dct[class_name].append(i)
-                else:
-                    self.inventory_dct[class_name] = [i]
+            self.add_items(initial_items)
         
-    def add_item(self, item: Item) -> None:
+    def add_item(self, item: Item, amount: int = 1) -> None:
         """ Adds the given item to this inventory's collection of items.
 
         Parameters:
             self: instance itself
             item: an Item instance
+            amount: how many times to add it
             
         Returns:
             None
         """
+        if amount <= 0:
+            return
         class_name = item.__class__.__name__
-        if class_name in self.inventory_dct:
-            self.inventory_dct[class_name].append(item)
-        else:
-            self.inventory_dct[class_name] = [item]
+        self.counts[class_name] = self.counts.get(class_name, 0) + amount
+        self.kinds.setdefault(class_name, item)
+        if self.kept is not None:
+            self.kept.setdefault(class_name, deque()).extend([item] * amount)
+        self._text = None
+
+    def add_items(self, items: Iterable[Item]) -> None:
+        """ Adds every given item to this inventory, in order.
+
+        Parameters:
+            self: instance itself
+            items: Item instances
+            
+        Returns:
+            None
+        """
+        for item in items:
+            self.add_item(item)
+
+    def _new_items(self, item_name: str, amount: int) -> list[Item]:
+        kind = self.kinds[item_name]
+        return [kind.__class__(kind.get_position()) for _ in range(amount)]
 
     def get_items(self) -> dict[str,list]:
         """ Returns a dictionary mapping the names of all items in the inventory to 
-            lists containing each instance of the item with that name.
+            lists containing each instance of the item with that name. The
+            dictionary is a new copy on each call, so changing it does not
+            change the inventory; use count for quantities.
 
         Parameters:
             self: instance itself
@@ -513,7 +825,21 @@ class Inventory():
         Returns:
             Dictionary
         """
-        return self.inventory_dct
+        if self.kept is not None:
+            return {name: list(items) for name, items in self.kept.items()}
+        return {name: self._new_items(name, count) for name, count in self.counts.items()}
+
+    def count(self, item_name: str) -> int:
+        """ Returns how many items with the given name the inventory holds.
+
+        Parameters:
+            self: instance itself
+            item_name: a string representation of an item
+            
+        Returns:
+            Integer
+        """
+        return self.counts.get(item_name, 0)
 
     def remove_item(self, item_name: str) -> Optional[Item]:
         """ Removes and returns the first instance of the item with the given item_name from the inventory. 
@@ -526,12 +852,42 @@ class Inventory():
         Returns:
             Either an Item instance or None
         """
-        output = None
-        if item_name in self.inventory_dct:
-            output = self.inventory_dct[item_name].pop(0)
-            if len(self.inventory_dct[item_name]) == 0:
-                del self.inventory_dct[item_name]
-        return output
+        removed = self.remove_items(item_name, 1)
+        return removed[0] if removed else None
+
+    def remove_items(self, item_name: str, amount: int) -> list[Item]:
+        """ Removes up to amount items with the given name, first added first.
+
+        Parameters:
+            self: instance itself
+            item_name: a string representation of an item
+            amount: how many items to remove
+            
+        Returns:
+            The removed Item instances, fewer than amount if the inventory
+            ran out
+        """
+        held = self.counts.get(item_name, 0)
+        amount = min(amount, held)
+        if amount <= 0:
+            return []
+        if self.kept is not None:
+            kept = self.kept[item_name]
+            removed = [kept.popleft() for _ in range(amount)]
+        else:
+            removed = self._new_items(item_name, amount)
+        if amount == held:
+            del self.counts[item_name]
+            del self.kinds[item_name]
+            if self.kept is not None:
+                del self.kept[item_name]
+        else:
+            self.counts[item_name] = held - amount
+        self._text = None
+        return removed
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
 
     def __str__(self) -> str:
         """ Returns a string containing information about quantities of items available in the inventory.
@@ -542,12 +898,9 @@ class Inventory():
         Returns:
             String
         """
-        output_str = ""
-        for key in self.inventory_dct:
-            output_str += key + ": " + str(len(self.inventory_dct[key]))
-            if key != list(self.inventory_dct)[-1]:
-                output_str += "\n"
-        return output_str
+        if self._text is None:
+            self._text = "\n".join(f"{name}: {count}" for name, count in self.counts.items())
+        return self._text
     
     def __repr__(self) -> str:
         """ Returns a string that could be used to construct a new instance of Inventory containing 
@@ -559,10 +912,9 @@ class Inventory():
         Returns:
             String
         """
-        items = []
-        for key in self.inventory_dct:
-            for val in self.inventory_dct[key]:
-                items.append(val)
+        items = [item for items in self.get_items().values() for item in items]
+        if self.kept is not None:
+            return f"{__class__.__name__}(initial_items={items}, keep_items=True)"
         return f"{__class__.__name__}(initial_items={items})"
 
 class Maze():
@@ -582,8 +934,73 @@ class Maze():
         self.num_rows = dimensions[0]
         self.num_columns = dimensions[1]
         self.maze = [[]*self.num_columns for _ in range(self.num_rows)]
-        self.tile_maze = []
-        
+        self.rows_added = 0
+        self.tiles = bytearray(self.num_rows * self.num_columns)
+        self.tile_maze = None
+        self.doors = []
+        # Bumped whenever the terrain changes, so cached data can be rebuilt.
+        self.version = 0
+        # Set on copy-on-write mazes: the template, and the maze whose terrain
+        # is currently shared (the template or its unlocked copy).
+        self.template = None
+        self.shared = None
+        self._unlocked = None
+
+    @classmethod
+    def from_template(cls, template: Maze) -> Maze:
+        """ Returns a maze that shares the template's terrain instead of
+            copying it. Unlocking its doors switches it to an unlocked copy
+            of the template that is also shared, so the terrain is never
+            copied per maze. The template must not be changed afterwards.
+
+        Parameters:
+            cls: the Maze class
+            template: the maze to share
+
+        Returns:
+            Maze
+        """
+        maze = cls((0, 0))
+        maze.num_rows = template.num_rows
+        maze.num_columns = template.num_columns
+        maze.rows_added = template.rows_added
+        maze.doors = template.doors
+        maze.version = template.version
+        maze.template = template
+        maze._share(template)
+        return maze
+
+    def _share(self, source: Maze) -> None:
+        self.shared = source
+        self.tiles = source.tiles
+        self.maze = source.maze
+        self.tile_maze = None
+
+    def _detach(self) -> None:
+        """ Takes a private copy of shared terrain before it is changed. """
+        if self.shared is not None:
+            self.tiles = bytearray(self.tiles)
+            self.maze = list(self.maze)
+            self.doors = list(self.doors)
+            self.shared = None
+            self.template = None
+
+    def unlocked(self) -> Maze:
+        """ Returns a copy of this maze with its doors unlocked. It is built
+            once and shared by every copy-on-write maze of this template.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            Maze
+        """
+        if self._unlocked is None:
+            twin = Maze((self.num_rows, self.num_columns))
+            twin.load_tiles(bytes(self.tiles))
+            twin.unlock_door()
+            self._unlocked = twin
+        return self._unlocked
 
     def get_dimensions(self) -> tuple[int,int]:
         """ Returns the (#rows, #columns) in the maze.
@@ -597,7 +1014,8 @@ class Maze():
         return (self.num_rows,self.num_columns)
 
     def add_row(self, row: str) -> None:
-        """ Adds a row of tiles to the maze.
+        """ Adds a row of tiles to the maze. Rows of the wrong length, or rows
+            beyond the maze's dimensions, are ignored.
         
         Parameters:
             self: instance itself
@@ -606,19 +1024,56 @@ class Maze():
         Returns:
             None
         """
-        tiles = [WALL,LAVA,EMPTY,DOOR]
-        if len(row) == self.num_columns:
-            for i in range(len(row)):
-                if row[i] not in tiles:
-                    row[i].replace(row[i],EMPTY)
-            for i in range(len(self.maze)):
-                if len(self.maze[i]) == 0:
-                    self.maze[i] = row
-                    break
-        return
+        if len(row) != self.num_columns or self.rows_added == self.num_rows:
+            return
+        self._detach()
+        self._unlocked = None
+        start = self.rows_added * self.num_columns
+        codes = row.encode('latin-1', 'replace').translate(_TILE_CODE_TABLE)
+        self.tiles[start:start + self.num_columns] = codes
+        self.maze[self.rows_added] = row
+        column = codes.find(DOOR_CODE)
+        while column != -1:
+            self.doors.append((self.rows_added, column))
+            column = codes.find(DOOR_CODE, column + 1)
+        self.rows_added += 1
+        self.tile_maze = None
+        self.version += 1
     
+    def load_tiles(self, codes: bytes) -> None:
+        """ Replaces the whole maze with a grid of tile codes, one byte per
+            cell in row-major order.
+
+        Parameters:
+            self: instance itself
+            codes: num_rows * num_columns tile codes
+
+        Returns:
+            None
+        """
+        if len(codes) != self.num_rows * self.num_columns:
+            raise ValueError(f"expected {self.num_rows * self.num_columns} tile codes, got {len(codes)}")
+        self.shared = None
+        self.template = None
+        self._unlocked = None
+        self.tiles = bytearray(codes)
+        text = codes.translate(_TILE_CHAR_TABLE).decode('latin-1')
+        self.maze = [text[start:start + self.num_columns]
+                     for start in range(0, len(text), self.num_columns)]
+        self.rows_added = self.num_rows
+        self.tile_maze = None
+        self.doors = []
+        self.version += 1
+        index = self.tiles.find(DOOR_CODE)
+        while index != -1:
+            self.doors.append(divmod(index, self.num_columns))
+            index = self.tiles.find(DOOR_CODE, index + 1)
+
     def get_tiles(self) -> list[list[Tile]]:
         """ Returns the Tile instances in this maze. Each element is a row (list of Tile instances in order).
+            The grid is built once and kept up to date as doors unlock. Its
+            tiles are the shared ones, which cannot be changed; use get_tile
+            to unlock a single door.
         
         Parameters:
             self: instance itself
@@ -626,27 +1081,14 @@ class Maze():
         Returns:
             2-D array of Tile instances
         """
-        self.tile_maze = []
-        x = 0
-        for row in self.maze:
-            if len(row)==0:
-                x += 1
-        
-        if x != len(self.maze):
-            for r in range(len(self.maze)):
-                if len(self.maze[r]) == 0: continue
-                self.tile_maze.append([])
-                for c in range(len(self.maze[r])):
-                    self.tile_maze[r].append([])
-                    if self.maze[r][c] == DOOR:
-                        self.tile_maze[r][c] = Door()
-                    elif self.maze[r][c] == LAVA:
-                        self.tile_maze[r][c] = Lava()
-                    elif self.maze[r][c] == WALL:
-                        self.tile_maze[r][c] = Wall()
-                    else:
-                        self.tile_maze[r][c] = Empty()
-        print(self.tile_maze)
+        if self.shared is not None:
+            return self.shared.get_tiles()
+        if self.tile_maze is None:
+            self.tile_maze = []
+            for r in range(self.rows_added):
+                start = r * self.num_columns
+                codes = self.tiles[start:start + self.num_columns]
+                self.tile_maze.append([TILE_FLYWEIGHTS[code] for code in codes])
         return self.tile_maze
 
 
@@ -659,14 +1101,71 @@ class Maze():
         Returns:
             None
         """
-        for row in range(len(self.maze)):
-            for column in range(len(self.maze[row])):
-                if self.maze[row][column] == DOOR:
-                    self.maze[row] = self.maze[row].replace(self.maze[row][column],EMPTY)
-                    break
+        if self.shared is not None:
+            if self.doors:
+                self._share(self.template.unlocked())
+                self.version += 1
+            self.doors = []
+            return
+        for row, column in self.doors:
+            self._set_code(row, column, EMPTY_CODE)
+        if self.doors:
+            self.version += 1
+        self.doors = []
+
+    def open_door(self, position: tuple[int,int]) -> None:
+        """ Unlocks the door at the given position, leaving any other doors
+            locked.
+
+        Parameters:
+            self: instance itself
+            position: the position of the door
+
+        Returns:
+            None
+        """
+        if position not in self.doors:
+            return
+        if len(self.doors) == 1:
+            self.unlock_door()
+            return
+        self._detach()
+        self._set_code(position[0], position[1], EMPTY_CODE)
+        self.doors = [door for door in self.doors if door != position]
+        self.version += 1
+
+    def _set_code(self, row: int, column: int, code: int) -> None:
+        """ Changes one cell of private terrain, keeping every view of it in step. """
+        self.tiles[row * self.num_columns + column] = code
+        self.maze[row] = (self.maze[row][:column] + TILE_FLYWEIGHTS[code].get_id()
+                          + self.maze[row][column+1:])
+        if self.tile_maze is not None:
+            self.tile_maze[row][column] = TILE_FLYWEIGHTS[code]
+
+    def lock_doors(self, doors: list[tuple[int,int]]) -> None:
+        """ Locks the given doors again, undoing unlock_door.
+
+        Parameters:
+            self: instance itself
+            doors: the door positions unlock_door removed from doors
+
+        Returns:
+            None
+        """
+        if not doors:
+            return
+        if self.shared is not None:
+            self._share(self.template)
+        else:
+            for row, column in doors:
+                self._set_code(row, column, DOOR_CODE)
+        self.doors = list(doors)
+        self.version += 1
 
     def get_tile(self, position: tuple[int,int]) -> Tile:
-        """ Returns the Tile instance at the given position.
+        """ Returns the Tile instance at the given position. Tiles are shared
+            between cells and cannot be changed, except that a locked door
+            is handed out as its own Door, which opens the cell when unlocked.
         
         Parameters:
             self: instance itself
@@ -675,29 +1174,14 @@ class Maze():
         Returns:
             Tile instance
         """
-        self.tile_maze = []
-        x = 0
-        for row in self.maze:
-            if len(row)==0:
-                x += 1
         row = position[0]
         column = position[1]
-        
-        
-        if x != len(self.maze):
-            for r in range(len(self.maze)):
-                self.tile_maze.append([])
-                for c in range(len(self.maze[r])):
-                    self.tile_maze[r].append([])
-                    if self.maze[r][c] == DOOR:
-                        self.tile_maze[r][c] = Door()
-                    elif self.maze[r][c] == LAVA:
-                        self.tile_maze[r][c] = Lava()
-                    elif self.maze[r][c] == WALL:
-                        self.tile_maze[r][c] = Wall()
-                    else:
-                        self.tile_maze[r][c] = Empty()
-        return self.tile_maze[row][column]
+        if not (0 <= row < self.num_rows and 0 <= column < self.num_columns):
+            raise IndexError(f"position {position} is outside the maze")
+        code = self.tiles[row * self.num_columns + column]
+        if code == DOOR_CODE:
+            return Door(self, (row, column))
+        return TILE_FLYWEIGHTS[code]
 
     def __str__(self) -> str:
         """ Returns the Tile instance at the given position.
@@ -721,6 +1205,202 @@ class Maze():
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(({self.num_rows}, {self.num_columns}))"
 
+# Layout of a compiled level: a header, one tile code per cell, then the items.
+_COMPILED_HEADER = struct.Struct('<IIiiI')
+_COMPILED_ITEM = struct.Struct('<IIc')
+
+def _compiled_items(record: bytes) -> Iterator[tuple[tuple[int,int],str]]:
+    """ Yields the (position, item ID) of each item in a compiled level. """
+    num_rows, num_cols, _, _, num_items = _COMPILED_HEADER.unpack_from(record)
+    offset = _COMPILED_HEADER.size + num_rows * num_cols
+    items = record[offset:offset + num_items * _COMPILED_ITEM.size]
+    for row, column, item_id in _COMPILED_ITEM.iter_unpack(items):
+        yield (row, column), item_id.decode()
+
+# Layout of a Model snapshot: a header, then the player's item counts, the
+# positions of the current level's items that are gone, and the items added.
+SNAPSHOT_MAGIC = b'MZS\x00'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<4sHIIIBiiiiiIII')
+_SNAPSHOT_COUNT = struct.Struct('<cI')
+_SNAPSHOT_POSITION = struct.Struct('<II')
+_SNAPSHOT_LEVELLED_UP = 1
+_SNAPSHOT_UNLOCKED = 2
+# Where restored inventory items say they are; they are no longer in a maze.
+_NOWHERE = (-1, -1)
+
+class ItemOverlay(MutableMapping):
+    """ 
+    A level's items, kept as the changes made to a shared item map: the
+    positions whose shared item is gone, and the items added since.
+    """
+    def __init__(self, base: dict[tuple[int,int],Item]) -> None:
+        """ Sets up an overlay with no changes.
+
+        Parameters:
+            self: instance itself
+            base: the shared item map, which is never changed
+
+        Returns:
+            None
+        """
+        self.base = base
+        self.removed = set()
+        self.added = dict()
+
+    def get(self, position: tuple[int,int], default: Optional[Item] = None) -> Optional[Item]:
+        item = self.added.get(position)
+        if item is not None:
+            return item
+        if position in self.removed:
+            return default
+        return self.base.get(position, default)
+
+    def __getitem__(self, position: tuple[int,int]) -> Item:
+        item = self.get(position)
+        if item is None:
+            raise KeyError(position)
+        return item
+
+    def __setitem__(self, position: tuple[int,int], item: Item) -> None:
+        if position in self.base:
+            self.removed.add(position)
+        self.added[position] = item
+
+    def __delitem__(self, position: tuple[int,int]) -> None:
+        if position in self.added:
+            del self.added[position]
+        elif position in self.base and position not in self.removed:
+            self.removed.add(position)
+        else:
+            raise KeyError(position)
+
+    def __contains__(self, position: object) -> bool:
+        return position in self.added or (position in self.base and position not in self.removed)
+
+    def __iter__(self) -> Iterator[tuple[int,int]]:
+        removed = self.removed
+        for position in self.base:
+            if position not in removed:
+                yield position
+        yield from self.added
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+# Translation tables from tile codes to '1' for the cells a bitmask marks.
+_WALL_BITS = bytes.maketrans(bytes(range(len(TILE_FLYWEIGHTS))),
+                             bytes(ord('1' if code == WALL_CODE else '0')
+                                   for code in range(len(TILE_FLYWEIGHTS))))
+_LAVA_BITS = bytes.maketrans(bytes(range(len(TILE_FLYWEIGHTS))),
+                             bytes(ord('1' if code == LAVA_CODE else '0')
+                                   for code in range(len(TILE_FLYWEIGHTS))))
+
+def _bitmask(codes: bytes, table: bytes) -> bytes:
+    """ Packs one bit per cell, in row-major order, set where table maps the
+        cell's tile code to '1'.
+    """
+    if not codes:
+        return b''
+    bits = int(bytes(codes).translate(table)[::-1], 2)
+    return bits.to_bytes((len(codes) + 7) // 8, 'little')
+
+class LevelIndex():
+    """ 
+    Positional facts about a level, built when the level is loaded so that
+    questions about it are lookups: item positions by kind and bitmasks of the
+    wall and lava cells. The level keeps the item positions up to date as
+    items are collected or added. The player start, the door and whether it
+    is locked are read from the level itself, so they cannot disagree with it.
+    """
+    def __init__(self, level: Level) -> None:
+        """ Builds the index of a level. A copy-on-write level shares the
+            bitmasks and, until its items change, the item positions of its
+            template's index.
+
+        Parameters:
+            self: instance itself
+            level: the level to index
+
+        Returns:
+            None
+        """
+        self.level = level
+        self.num_rows = level.rows
+        self.num_columns = level.columns
+        template = level.template
+        if template is not None:
+            shared = template.get_index()
+            self.walls, self.lava = shared.walls, shared.lava
+        else:
+            self.walls = _bitmask(level.maze.tiles, _WALL_BITS)
+            self.lava = _bitmask(level.maze.tiles, _LAVA_BITS)
+        self.shared_items = template is not None and level.item_map is template.item_map
+        if self.shared_items:
+            self.items = shared.items
+        else:
+            self.items = dict()
+            for position, item in level.get_items().items():
+                self.items.setdefault(item.get_id(), set()).add(position)
+
+    @property
+    def start(self) -> Optional[tuple[int,int]]:
+        return self.level.player_start
+
+    @property
+    def door(self) -> Optional[tuple[int,int]]:
+        return self.level.door_position
+
+    def _bit(self, mask: bytes, position: tuple[int,int]) -> bool:
+        row, column = position
+        if not (0 <= row < self.num_rows and 0 <= column < self.num_columns):
+            return False
+        index = row * self.num_columns + column
+        return bool(mask[index >> 3] >> (index & 7) & 1)
+
+    def is_wall(self, position: tuple[int,int]) -> bool:
+        return self._bit(self.walls, position)
+
+    def is_lava(self, position: tuple[int,int]) -> bool:
+        return self._bit(self.lava, position)
+
+    def door_locked(self) -> bool:
+        return bool(self.level.maze.doors)
+
+    def is_blocking(self, position: tuple[int,int]) -> bool:
+        """ Returns True if the position is a wall or a locked door. """
+        return self.is_wall(position) or position in self.level.maze.doors
+
+    def item_positions(self, item_id: str) -> set[tuple[int,int]]:
+        """ Returns the positions of the items with the given ID that are
+            still in the level. The set must not be changed, and is only
+            current until an item is next added or removed.
+        """
+        return self.items.get(item_id, set())
+
+    def lava_cells(self) -> Iterator[tuple[int,int]]:
+        """ Yields the position of every lava cell, in row-major order. """
+        for byte_index, byte in enumerate(self.lava):
+            while byte:
+                low = byte & -byte
+                yield divmod(byte_index * 8 + low.bit_length() - 1, self.num_columns)
+                byte ^= low
+
+    def _writable_items(self) -> dict[str,set]:
+        if self.shared_items:
+            self.items = {item_id: set(positions) for item_id, positions in self.items.items()}
+            self.shared_items = False
+        return self.items
+
+    def _add(self, position: tuple[int,int], item_id: str) -> None:
+        self._writable_items().setdefault(item_id, set()).add(position)
+
+    def _discard(self, position: tuple[int,int], item_id: str) -> None:
+        self._writable_items().get(item_id, set()).discard(position)
+
 class Level():
 
     def __init__(self,dimensions:tuple[int,int]) -> None:
@@ -728,103 +1408,244 @@ class Level():
         self.columns = dimensions[1]
         self.maze = Maze((self.rows,self.columns))
         self.item_map = dict()
+        self.player_start = None
+        self.door_position = None
+        self.template = None
+        self.index = None
+
+    @classmethod
+    def from_template(cls, template: Level) -> Level:
+        """ Returns a level to play that shares the template's terrain and
+            items. Its maze is copy-on-write, and collecting or adding items
+            records just the changes in an ItemOverlay, made on the first
+            change. The template must not be changed afterwards.
+
+        Parameters:
+            cls: the Level class
+            template: the level to share
+
+        Returns:
+            Level
+        """
+        level = cls((0, 0))
+        level.rows = template.rows
+        level.columns = template.columns
+        level.maze = Maze.from_template(template.maze)
+        level.item_map = template.item_map
+        level.player_start = template.player_start
+        level.door_position = template.door_position
+        level.template = template
+        level.index = LevelIndex(level)
+        return level
+
+    def _writable_items(self) -> dict[tuple[int,int],Item]:
+        if self.template is not None and self.item_map is self.template.item_map:
+            self.item_map = ItemOverlay(self.item_map)
+        return self.item_map
 
     def get_maze(self) -> Maze:
         return self.maze
 
+    def can_exit(self) -> bool:
+        """ Returns True if every coin in the level has been collected.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            boolean (True or False)
+        """
+        return not self.get_index().item_positions(COIN)
+
     def attempt_unlock_door(self) -> None:
-        coins_avail = 0
-        door_row = 0
-        door_column = 0
-        for row in range(len(self.maze.maze)):
-            for col in range(len(self.maze.maze[row])):
-                if self.maze.maze[row][col] == COIN:
-                    coins_avail += 1
-                elif self.maze.maze[row][col] == DOOR:
-                    door_row = row
-                    door_column = col
-        if coins_avail == 0:
-            door_tile = self.maze.get_tile((door_row,door_column))
-            door_tile.unlock()
-            self.maze.maze[door_row] = self.maze.maze[door_row][:door_column] + " " + self.maze.maze[door_row][door_column+1:]
+        """ Unlocks the level's door once every coin has been collected.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            None
+        """
+        if self.maze.doors and self.can_exit():
+            self.maze.unlock_door()
 
     def add_row(self, row: str) -> None:
-        self.maze.add_row(row)
-        if len(self.maze.maze) == self.maze.num_rows:
-            self.orig_maze = self.maze
+        """ Adds a row of tiles and entities to the level. Items and the
+            player start are recorded on the level; the maze only keeps terrain.
+
+        Parameters:
+            self: instance itself
+            row: a string where each character is a tile or entity ID
+
+        Returns:
+            None
+        """
+        row_index = self.maze.rows_added
+        self.index = None
+        self.maze.add_row(row.translate(_STRIP_ENTITIES))
+        if self.maze.rows_added == row_index:
+            return
+        for match in _ENTITY_PATTERN.finditer(row):
+            char = match.group()
+            column = match.start()
+            if char in ITEM_CLASSES:
+                self._place_item((row_index,column), char)
+            elif char == PLAYER:
+                self.add_player_start((row_index,column))
+            else:
+                self.door_position = (row_index,column)
 
     def add_entity(self, position: tuple[int,int], entity_id: str) -> None:
-        row = position[0]
-        column = position[1]
-        items = [COIN,POTION,APPLE,HONEY,WATER]
-        try:
-            if self.maze.maze[row][column] in items or self.maze.maze[row][column] == EMPTY:
-                output_str = self.maze.maze[row][:column] + entity_id + self.maze.maze[row][column+1:]
-                self.maze.maze[row] = output_str
-        except:
-            output_str = " " * self.maze.num_columns
-            output_str = output_str[:column] + entity_id + output_str[column+1:]
-            self.maze.maze[row] = output_str
+        """ Adds a new entity to the level at the given position, provided the
+            tile there is empty floor.
+
+        Parameters:
+            self: instance itself
+            position: the (row, column) of the new entity
+            entity_id: the ID of the entity to add
+
+        Returns:
+            None
+        """
+        if entity_id == PLAYER:
+            self.add_player_start(position)
+        elif entity_id in ITEM_CLASSES and self.maze.get_tile(position).get_id() == EMPTY:
+            self.remove_item(position)
+            self._place_item(position, entity_id)
+
+    def _place_item(self, position: tuple[int,int], item_id: str) -> None:
+        """ Adds a new item with the given ID to the level. """
+        self.put_item(position, ITEM_CLASSES[item_id](position))
+
+    def put_item(self, position: tuple[int,int], item: Item) -> None:
+        """ Puts an Item instance at the given position, e.g. to put back an
+            item that was collected. The tile there is not checked.
+
+        Parameters:
+            self: instance itself
+            position: the (row, column) of the item
+            item: the Item instance
+
+        Returns:
+            None
+        """
+        self.remove_item(position)
+        self._writable_items()[position] = item
+        if self.index is not None:
+            self.index._add(position, item.get_id())
 
     def get_dimensions(self) -> tuple[int,int]:
         return self.maze.get_dimensions()
 
+    def compile(self) -> bytes:
+        """ Returns a compact binary record of the level's terrain, items and
+            player start, which from_compiled turns back into a Level.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            Bytes
+        """
+        start = self.player_start if self.player_start is not None else (-1, -1)
+        header = _COMPILED_HEADER.pack(self.rows, self.columns, start[0], start[1], len(self.item_map))
+        items = b''.join(_COMPILED_ITEM.pack(row, column, item.get_id().encode())
+                         for (row, column), item in self.item_map.items())
+        return header + bytes(self.maze.tiles) + items
+
+    @classmethod
+    def from_compiled(cls, record: bytes) -> Level:
+        """ Builds a Level from a record made by compile.
+
+        Parameters:
+            cls: the Level class
+            record: the compiled level
+
+        Returns:
+            Level
+        """
+        num_rows, num_cols, start_row, start_col, num_items = _COMPILED_HEADER.unpack_from(record)
+        offset = _COMPILED_HEADER.size
+        level = cls((num_rows, num_cols))
+        level.maze.load_tiles(record[offset:offset + num_rows * num_cols])
+        offset += num_rows * num_cols
+        if level.maze.doors:
+            level.door_position = level.maze.doors[-1]
+        if start_row >= 0:
+            level.add_player_start((start_row, start_col))
+        for position, item_id in _compiled_items(record):
+            level._place_item(position, item_id)
+        level.index = LevelIndex(level)
+        return level
+
     def get_items(self) -> dict[tuple[int,int],Item]:
-        x = 0
-        for row in self.maze.maze:
-            if len(row)==0:
-                x += 1
-
-        if x != len(self.maze.maze):
-            for row in range(len(self.maze.maze)):
-                for column in range(len(self.maze.maze[row])):
-                    if self.maze.maze[row][column] == COIN:
-                        self.item_map[(row,column)] = Coin((row,column))
-                    elif self.maze.maze[row][column] == POTION:
-                        self.item_map[(row,column)] = Potion((row,column))
-                    elif self.maze.maze[row][column] == HONEY:
-                        self.item_map[(row,column)] = Honey((row,column))
-                    elif self.maze.maze[row][column] == APPLE:
-                        self.item_map[(row,column)] = Apple((row,column))
-                    elif self.maze.maze[row][column] == WATER:
-                        self.item_map[(row,column)] = Water((row,column))
+        """ Returns the level's item index, mapping positions to the items
+            that are still in the maze. The same Item instances are returned
+            on every call until they are removed.
 
+        Parameters:
+            self: instance itself
+
+        Returns:
+            Dictionary
+        """
         return self.item_map
 
     def remove_item(self, position: tuple[int,int]) -> None:
-        row = position[0]
-        column = position[1]
-        items = [COIN,POTION,APPLE,HONEY,WATER]
-        if self.maze[row][column] in items:
-            self.maze[row][column] = EMPTY
+        """ Removes the item at the given position, if there is one.
+
+        Parameters:
+            self: instance itself
+            position: the (row, column) of the item
+
+        Returns:
+            None
+        """
+        if position not in self.item_map:
+            return
+        item = self._writable_items().pop(position)
+        if self.index is not None:
+            self.index._discard(position, item.get_id())
 
     def add_player_start(self,position: tuple[int,int]) -> None:
-        row = position[0]
-        column = position[1]
-        new_str = self.maze.maze[row]
-        if len(self.maze.maze[row]) == 0:
-            new_str = " " * self.columns
-        self.maze.maze[row] = new_str[:column] + PLAYER + new_str[column+1:]
-        self.player_start = (row,column)
+        """ Records the position the player starts the level at. The player
+            is not part of the maze's terrain.
+
+        Parameters:
+            self: instance itself
+            position: the (row, column) the player starts at
+
+        Returns:
+            None
+        """
+        self.player_start = position
+
+    def get_index(self) -> LevelIndex:
+        """ Returns the level's index. Levels read from a game file or level
+            pack are indexed as they are loaded; a level built row by row is
+            indexed on first use.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            LevelIndex
+        """
+        if self.index is None:
+            self.index = LevelIndex(self)
+        return self.index
 
     def get_player_start(self) -> Optional[tuple[int,int]]:
-        
-        for row in range(len(self.maze.maze)):
-            for column in range(len(self.maze.maze[row])):
-                if self.maze.maze[row][column] == PLAYER:
-                    try:
-                        return self.player_start    
-                    except:
-                        try:
-                            for row2 in range(len(self.orig_maze.maze)):
-                                for column2 in range(len(self.orig_maze.maze[row2])):
-                                    if self.orig_maze.maze[row2][column2] == PLAYER:
-                                        return (row2,column2)
-                        except:
-                            return (row,column)    
-                        
-                        
-        return None
+        """ Returns the player's starting position, or None if no start has
+            been added to the level.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            Tuple or None
+        """
+        return self.player_start
 
     def __str__(self) -> str:
         output_str = ""
@@ -839,19 +1660,191 @@ class Level():
         
         return f"Level(({self.rows},{self.columns}))"
 
+class PackedLevels():
+    """ 
+    A read-only sequence of the levels in a level pack. Levels are decoded on
+    first use and kept until released.
+    """
+    def __init__(self, pack: LevelPack, templates: Optional[LevelTemplates] = None) -> None:
+        """ Sets up the sequence over an open level pack.
+
+        Parameters:
+            self: instance itself
+            pack: the level pack holding the compiled levels
+            templates: shared templates of the pack's levels; if given, levels
+                       are copy-on-write instances of them instead of private
+                       copies
+
+        Returns:
+            None
+        """
+        self.pack = pack
+        self.templates = templates
+        self.decoded = dict()
+
+    def __len__(self) -> int:
+        return len(self.pack)
+
+    def __getitem__(self, index: int) -> Level:
+        """ Returns the level at the given index, decoding it if needed.
+
+        Parameters:
+            self: instance itself
+            index: the position of the level in the pack
+
+        Returns:
+            Level
+        """
+        if index < 0:
+            index += len(self.pack)
+        level = self.decoded.get(index)
+        if level is None:
+            if self.templates is not None:
+                level = Level.from_template(self.templates[index])
+            else:
+                level = Level.from_compiled(self.pack[index])
+            self.decoded[index] = level
+        return level
+
+    def prefetch(self, index: int) -> None:
+        """ Decodes the level at the given index ahead of use, if it exists.
+
+        Parameters:
+            self: instance itself
+            index: the position of the level in the pack
+
+        Returns:
+            None
+        """
+        if 0 <= index < len(self.pack):
+            self[index]
+
+    def keep(self, index: int, level: Level) -> None:
+        """ Makes level the decoded level at the given index, e.g. to bring
+            back a released level that is still in use.
+
+        Parameters:
+            self: instance itself
+            index: the position of the level in the pack
+            level: the level to keep
+
+        Returns:
+            None
+        """
+        self.decoded[index] = level
+
+    def release(self, index: int) -> None:
+        """ Drops the decoded level at the given index. Indexing it again
+            decodes a fresh copy from the pack.
+
+        Parameters:
+            self: instance itself
+            index: the position of the level in the pack
+
+        Returns:
+            None
+        """
+        self.decoded.pop(index, None)
+
+class LevelTemplates():
+    """ 
+    The levels of a level pack decoded once and shared, read-only, by every
+    PackedLevels made with it. Each template is decoded on first use.
+    """
+    def __init__(self, pack: LevelPack) -> None:
+        """ Sets up the templates of an open level pack.
+
+        Parameters:
+            self: instance itself
+            pack: the level pack holding the compiled levels
+
+        Returns:
+            None
+        """
+        self.pack = pack
+        self.decoded = dict()
+
+    @classmethod
+    def open(cls, filename: str, use_cache: bool = False) -> LevelTemplates:
+        """ Opens the templates of a game file or level pack, as open_levels
+            opens its levels.
+
+        Parameters:
+            cls: the LevelTemplates class
+            filename: The path to the game file or level pack
+            use_cache: Whether to read and write the compiled level cache
+
+        Returns:
+            LevelTemplates
+        """
+        return cls(open_levels(filename, use_cache).pack)
+
+    def __len__(self) -> int:
+        return len(self.pack)
+
+    def __getitem__(self, index: int) -> Level:
+        level = self.decoded.get(index)
+        if level is None:
+            level = Level.from_compiled(self.pack[index])
+            self.decoded[index] = level
+        return level
+
+    def levels(self) -> PackedLevels:
+        """ Returns a new sequence of copy-on-write levels for one game.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            PackedLevels
+        """
+        return PackedLevels(self.pack, self)
+
+# A batch of moves: move keys, each optionally preceded by a repeat count.
+_MOVE_BATCH = re.compile(r'(?:\d*[' + re.escape(''.join(MOVE_DELTAS)) + r'])+')
+_MOVE_BATCH_STEP = re.compile(r'(\d*)([' + re.escape(''.join(MOVE_DELTAS)) + r'])')
+
+def parse_moves(command: str) -> Optional[list[tuple[int,tuple[int,int]]]]:
+    """ Parses a batch of moves such as 'dddwwa' or '5d2w', where a number
+        repeats the key after it.
+
+    Parameters:
+        command: the command as the player typed it
+
+    Returns:
+        A list of (repeats, delta) in order, or None if command is not a
+        batch of moves
+    """
+    command = command.strip()
+    if _MOVE_BATCH.fullmatch(command) is None:
+        return None
+    return [(int(count) if count else 1, MOVE_DELTAS[key])
+            for count, key in _MOVE_BATCH_STEP.findall(command)]
+
+class SimulationResult(NamedTuple):
+    """ 
+    The outcome of running a sequence of commands with Model.simulate.
+    """
+    stats: tuple[int,int,int]
+    levels_cleared: int
+    won: bool
+    lost: bool
+    steps: int
+
 class Model():
     
-    def __init__(self,game_file: str):
+    def __init__(self,game_file: str, levels: Optional[PackedLevels] = None,
+                 use_cache: bool = False):
         self.game_file = game_file
-        self.levels = load_game(game_file)
+        self.levels = levels if levels is not None else open_levels(game_file, use_cache)
         self.curr_level = self.levels[0]
         self.levelled_up = False
         self.move_streak = 0
         self.start_player_pos = self.curr_level.get_player_start()
         self.player = Player(self.start_player_pos)
-        self.player.inventory = Inventory()
-        self.can_levelup = False
         self.index = 0
+        self.instrument: Optional[Instrument] = None
+        self.history: Optional[History] = None
     
     def has_won(self) -> bool:
         decision = False
@@ -875,12 +1868,13 @@ class Model():
 
     def level_up(self) -> None:
         self.index += 1
+        self.levelled_up = False
         if self.has_won():
-            print(WIN_MESSAGE)
-            exit()
+            return
 
-        index = self.levels.index(self.curr_level)
-        self.curr_level = self.levels[index+1]
+        self.levels.release(self.index - 1)
+        self.curr_level = self.levels[self.index]
+        self.levels.prefetch(self.index + 1)
         self.start_player_pos = self.curr_level.get_player_start()
         self.player.set_position(self.start_player_pos)
         self.levelled_up = False
@@ -890,70 +1884,275 @@ class Model():
         return self.levelled_up
 
     def move_player(self, delta: tuple[int,int]) -> None:
-        move_pos_row = delta[0]
-        move_pos_col = delta[1]
-        self.can_levelup = True
-
-        for idx,row in enumerate(self.curr_level.maze.maze):
-            if PLAYER in row:
-                col = row.index(PLAYER)
-                self.player_curr_pos = (idx,col)
-                break
-
-        new_pos_row = idx + move_pos_row
-        new_pos_col = col + move_pos_col
+        history = self.history
+        if history is None:
+            self._move(delta)
+            return
+        history.begin(self, delta=delta)
+        self._move(delta)
+        history.end(self)
+
+    def _move(self, delta: tuple[int,int]) -> None:
+        probe = self.instrument
+        if self.levelled_up:
+            self.level_up()
+            if probe:
+                probe.mark('level_up')
+                probe.count('level_ups')
+            return
+
+        row, column = self.player.get_position()
+        new_position = (row + delta[0], column + delta[1])
+        level = self.curr_level
+        maze = level.get_maze()
+
+        num_rows, num_cols = maze.get_dimensions()
+        if not (0 <= new_position[0] < num_rows and 0 <= new_position[1] < num_cols): return
+        tile = maze.get_tile(new_position)
+        if probe:
+            probe.mark('tile')
+        if tile.is_blocking():
+            if probe:
+                probe.count('blocked')
+            return
+
+        self.attempt_collect_item(new_position)
+        self.player.set_position(new_position)
+        level.attempt_unlock_door()
+        if probe:
+            probe.mark('collect')
+            probe.count('moves')
 
-        current_items = self.get_current_items()
-        for v in current_items.values():
-            if isinstance(v,Coin):
-                self.can_levelup = False
-                break
-                   
-        tile = self.curr_level.maze.get_tile((new_pos_row,new_pos_col))
-        if tile.get_id() == DOOR:
-            if self.can_levelup:
-                tile.unlock()
-                self.levelled_up = True
-                
-
-        if tile.is_blocking(): return
-        self.attempt_collect_item((new_pos_row,new_pos_col))
-
-        self.curr_level.maze.maze[idx] = row[:col] + " " + row[col+1:]
-        string = self.curr_level.maze.maze[new_pos_row]
-        self.curr_level.maze.maze[new_pos_row] = string[:new_pos_col] + PLAYER + string[new_pos_col+1:]
         self.move_streak += 1
         if self.move_streak == 5:
             self.player.change_hunger(1)
             self.player.change_thirst(1)
             self.move_streak = 0
 
-        if tile.get_id() == LAVA:
-            self.player.change_health(tile.damage())
+        self.player.change_health(-tile.damage())
         self.player.change_health(-1)
 
-        self.player_curr_pos = (new_pos_row,new_pos_col)
-        self.player.row = self.player_curr_pos[0]
-        self.player.column = self.player_curr_pos[1]
+        if new_position == level.door_position:
+            self.levelled_up = True
+        if probe:
+            probe.mark('stats')
 
-        if self.levelled_up:
-            self.level_up()
-        
-        
     def attempt_collect_item(self, position: tuple[int,int]) -> None:
-        move_pos_row = position[0]
-        move_pos_col = position[1]
-
-        if self.curr_level.maze.maze[move_pos_row][move_pos_col] == POTION:
-            self.player.add_item(Potion(self.player_curr_pos))
-        elif self.curr_level.maze.maze[move_pos_row][move_pos_col] == COIN:
-            self.player.add_item(Coin(self.player_curr_pos))
-        elif self.curr_level.maze.maze[move_pos_row][move_pos_col] == HONEY:
-            self.player.add_item(Honey(self.player_curr_pos))
-        elif self.curr_level.maze.maze[move_pos_row][move_pos_col] == APPLE:
-            self.player.add_item(Apple(self.player_curr_pos))
-        elif self.curr_level.maze.maze[move_pos_row][move_pos_col] == WATER:
-            self.player.add_item(Water(self.player_curr_pos))    
+        item = self.curr_level.get_items().get(position)
+        if item is not None:
+            self.player.add_item(item)
+            self.curr_level.remove_item(position)
+
+    def use_item(self, item_name: str) -> bool:
+        """ Removes an item with the given name from the player's inventory
+            and applies it to the player.
+
+        Parameters:
+            self: instance itself
+            item_name: the class name of the item, e.g. 'Apple'
+
+        Returns:
+            True if the player had the item
+        """
+        history = self.history
+        if history is not None:
+            history.begin(self, item_name=item_name)
+        item = self.player.get_inventory().remove_item(item_name)
+        if item is not None:
+            item.apply(self.player)
+        if history is not None:
+            history.end(self, used=item)
+        return item is not None
+
+    def apply_command(self, command: str) -> bool:
+        """ Applies one player command: a move key from MOVE_DELTAS, a batch
+            of moves accepted by parse_moves, or 'i <item name>' to use an
+            item.
+
+        Parameters:
+            self: instance itself
+            command: the command as the player would type it
+
+        Returns:
+            True if the command was recognised
+        """
+        if command in MOVE_DELTAS:
+            self.move_player(MOVE_DELTAS[command])
+        elif command.startswith('i '):
+            self.use_item(command[2:])
+        else:
+            moves = parse_moves(command)
+            if moves is None:
+                return False
+            self.move_batch(moves)
+        return True
+
+    def move_batch(self, moves: Iterable[tuple[int,tuple[int,int]]]) -> int:
+        """ Makes a batch of moves, as returned by parse_moves. The batch
+            stops early at a move that is blocked, once the player reaches
+            the door or moves on to the next level, or when the game is won
+            or lost.
+
+        Parameters:
+            self: instance itself
+            moves: (repeats, delta) pairs to apply in order
+
+        Returns:
+            The number of moves made, not counting a blocked move
+        """
+        made = 0
+        for repeats, delta in moves:
+            for _ in range(repeats):
+                if self.has_won() or self.has_lost():
+                    return made
+                levelling_up = self.levelled_up
+                position = self.player.get_position()
+                self.move_player(delta)
+                if levelling_up:
+                    return made + 1
+                if self.player.get_position() == position:
+                    return made
+                made += 1
+                if self.levelled_up:
+                    return made
+        return made
+
+    def simulate(self, commands: Iterable[str]) -> SimulationResult:
+        """ Applies a sequence of commands without drawing, reading input or
+            exiting, stopping early once the game is won or lost.
+            Unrecognised commands are skipped and do not count as steps.
+
+        Parameters:
+            self: instance itself
+            commands: the commands to apply, as accepted by apply_command
+
+        Returns:
+            SimulationResult describing the state after the last command
+        """
+        steps = 0
+        probe = self.instrument
+        for command in commands:
+            if self.has_won() or self.has_lost():
+                break
+            if probe:
+                probe.start_turn()
+            if self.apply_command(command):
+                steps += 1
+            if probe:
+                probe.end_turn()
+        return SimulationResult(self.get_player_stats(), self.index,
+                                self.has_won(), self.has_lost(), steps)
+
+    def _level_index(self) -> int:
+        """ Returns the index of curr_level, which stays on the last level
+            once the game is won.
+        """
+        return min(self.index, len(self.levels) - 1)
+
+    def _item_changes(self) -> tuple[Iterable[tuple[int,int]], list[tuple[tuple[int,int],str]]]:
+        """ Returns the positions of the current level's original items that
+            are gone or replaced, and the (position, item ID) of the items
+            that were added.
+        """
+        level = self.curr_level
+        items = level.get_items()
+        if isinstance(items, ItemOverlay):
+            return sorted(items.removed), [(position, item.get_id()) for position, item in items.added.items()]
+        if level.template is not None and items is level.template.item_map:
+            return (), []
+        original = dict(_compiled_items(self.levels.pack[self._level_index()]))
+        removed = [position for position, item_id in original.items()
+                   if position not in items or items[position].get_id() != item_id]
+        added = [(position, item.get_id()) for position, item in items.items()
+                 if original.get(position) != item.get_id()]
+        return removed, added
+
+    def snapshot(self) -> bytes:
+        """ Returns the state of the game as a compact binary record. Only the
+            changes to the current level are stored; everything else comes
+            from the game's levels again when restored.
+
+        Parameters:
+            self: instance itself
+
+        Returns:
+            Bytes
+        """
+        level = self.curr_level
+        flags = _SNAPSHOT_LEVELLED_UP if self.levelled_up else 0
+        if level.door_position is not None and not level.maze.doors:
+            flags |= _SNAPSHOT_UNLOCKED
+        row, column = self.player.get_position()
+        inventory = self.player.get_inventory()
+        removed, added = self._item_changes()
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.levels),
+                                       self.index, self.move_streak, flags, row, column,
+                                       self.player.hp, self.player.hunger, self.player.thirst,
+                                       len(inventory.counts), len(removed), len(added))
+        counts = b''.join(_SNAPSHOT_COUNT.pack(inventory.kinds[name].get_id().encode(), count)
+                          for name, count in inventory.counts.items())
+        gone = b''.join(_SNAPSHOT_POSITION.pack(*position) for position in removed)
+        new = b''.join(_COMPILED_ITEM.pack(row, column, item_id.encode())
+                       for (row, column), item_id in added)
+        return header + counts + gone + new
+
+    def restore(self, snapshot: bytes) -> None:
+        """ Puts the game back into the state recorded by snapshot.
+
+        Parameters:
+            self: instance itself
+            snapshot: a record made by snapshot on a Model of the same game
+
+        Returns:
+            None
+        """
+        (magic, version, num_levels, index, move_streak, flags, row, column, hp, hunger, thirst,
+         num_counts, num_removed, num_added) = _SNAPSHOT_HEADER.unpack_from(snapshot)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("not a snapshot of this version")
+        if num_levels != len(self.levels):
+            raise ValueError(f"snapshot is of a game with {num_levels} levels, not {len(self.levels)}")
+
+        offset = _SNAPSHOT_HEADER.size
+        inventory = Inventory()
+        for item_id, count in _SNAPSHOT_COUNT.iter_unpack(
+                snapshot[offset:offset + num_counts * _SNAPSHOT_COUNT.size]):
+            inventory.add_item(ITEM_CLASSES[item_id.decode()](_NOWHERE), count)
+        offset += num_counts * _SNAPSHOT_COUNT.size
+
+        self.levels.release(self._level_index())
+        self.index = index
+        level_index = self._level_index()
+        self.levels.release(level_index)
+        level = self.levels[level_index]
+        for position in _SNAPSHOT_POSITION.iter_unpack(
+                snapshot[offset:offset + num_removed * _SNAPSHOT_POSITION.size]):
+            level.remove_item(position)
+        offset += num_removed * _SNAPSHOT_POSITION.size
+        for row_added, column_added, item_id in _COMPILED_ITEM.iter_unpack(
+                snapshot[offset:offset + num_added * _COMPILED_ITEM.size]):
+            level._place_item((row_added, column_added), item_id.decode())
+        if flags & _SNAPSHOT_UNLOCKED:
+            level.maze.unlock_door()
+        self.levels.prefetch(level_index + 1)
+
+        self.curr_level = level
+        self.start_player_pos = level.get_player_start()
+        self.move_streak = move_streak
+        self.levelled_up = bool(flags & _SNAPSHOT_LEVELLED_UP)
+        self.player.set_position((row, column))
+        self.player.hp, self.player.hunger, self.player.thirst = hp, hunger, thirst
+        self.player.inventory = inventory
+
+    def save(self, filename: str) -> None:
+        """ Writes a snapshot of the game to a file. """
+        with open(filename, 'wb') as file:
+            file.write(self.snapshot())
+
+    def load(self, filename: str) -> None:
+        """ Restores the game from a file written by save. """
+        with open(filename, 'rb') as file:
+            self.restore(file.read())
 
     def get_player(self) -> Player:
         return self.player
@@ -969,25 +2168,13 @@ class Model():
         return self.curr_level.maze
     
     def get_current_items(self) -> dict[tuple[int,int], Item]:
-        x = 0
-        for row in self.curr_level.maze.maze:
-            if len(row)==0:
-                x += 1
-        self.curr_level.item_map = dict()
-        if x != len(self.curr_level.maze.maze):
-            for row in range(len(self.curr_level.maze.maze)):
-                for column in range(len(self.curr_level.maze.maze[row])):
-                    if self.curr_level.maze.maze[row][column] == COIN:
-                        self.curr_level.item_map[(row,column)] = Coin((row,column))
-                    elif self.curr_level.maze.maze[row][column] == POTION:
-                        self.curr_level.item_map[(row,column)] = Potion((row,column))
-                    elif self.curr_level.maze.maze[row][column] == HONEY:
-                        self.curr_level.item_map[(row,column)] = Honey((row,column))
-                    elif self.curr_level.maze.maze[row][column] == APPLE:
-                        self.curr_level.item_map[(row,column)] = Apple((row,column))
-                    elif self.curr_level.maze.maze[row][column] == WATER:
-                        self.curr_level.item_map[(row,column)] = Water((row,column))
-        return self.curr_level.item_map
+        return self.curr_level.get_items()
+
+    def get_level_index(self) -> LevelIndex:
+        """ Returns the index of the level being played, which changes with
+            the level on level up.
+        """
+        return self.curr_level.get_index()
 
     def __str__(self) -> str:
         return "Model('"+self.game_file+"')"
@@ -997,46 +2184,101 @@ class Model():
     
 class MazeRunner():
 
-    def __init__(self, game_file: str, view: UserInterface) -> None:
-        self.model = Model(game_file)
+    def __init__(self, game_file: str, view: UserInterface,
+                 read_input: Callable[[str], str] = input,
+                 instrument: Optional[Instrument] = None,
+                 levels: Optional[PackedLevels] = None) -> None:
+        self.model = Model(game_file, levels)
+        self.model.instrument = instrument
         self.view = view
+        self.read_input = read_input
+        self.instrument = instrument
 
     def play(self) -> None:
-        
-        while True:
-            maze = self.model.curr_level.get_maze()
-            items = self.model.get_current_items()
-            inventory = self.model.get_player_inventory()
-            player_pos = self.model.player.get_position()
-            stats = self.model.get_player_stats()
+        probe = self.instrument
+        try:
+            while True:
+                if probe:
+                    probe.start_turn()
+                self.draw()
+                self.move_player()
+                if probe:
+                    probe.end_turn()
+
+                if self.model.has_won():
+                    print(WIN_MESSAGE)
+                    exit()
+                if self.model.has_lost():
+                    print(LOSS_MESSAGE)
+                    exit()
+        finally:
+            # exit() raises SystemExit, so sinks still get to write out.
+            if probe:
+                probe.close()
+
+    def draw(self) -> None:
+        """ Draws the current state of the game with the view.
 
-            self.view.draw(maze,items,player_pos,inventory,stats)
-            
-            if self.model.has_lost():
-                print(LOSS_MESSAGE)
-                exit()
+        Parameters:
+            self: instance itself
 
-            self.move_player()        
+        Returns:
+            None
+        """
+        probe = self.instrument
+        maze = self.model.curr_level.get_maze()
+        items = self.model.get_current_items()
+        inventory = self.model.get_player_inventory()
+        player_pos = self.model.player.get_position()
+        stats = self.model.get_player_stats()
+        if probe:
+            probe.mark('items')
+
+        self.view.draw(maze,items,player_pos,inventory,stats)
+        if probe:
+            probe.mark('render')
 
     def move_player(self) -> None:
+        probe = self.instrument
         while True:
-            move = input("\nEnter a move: ")
-            if move in MOVE_DELTAS:
-                self.model.move_player(MOVE_DELTAS[move])
-                break
-            elif "i " in move:
-                inventory = self.model.get_player_inventory()
-                item_name = move[2:]
-                all_items = inventory.get_items()
-                if item_name in all_items:
-                    item = inventory.remove_item(item_name)
-                    item.apply(self.model.player) 
-                    if len(all_items[item_name]) == 0:
-                        del self.model.get_player_inventory().get_items()[item_name]
-                else:
-                    print(ITEM_UNAVAILABLE_MESSAGE)
-                break
-            
+            move = self.read_input("\nEnter a move: ")
+            if probe:
+                probe.mark('wait')
+            if self.handle_move(move):
+                return
+
+    def handle_move(self, move: str) -> bool:
+        """ Applies one line of player input: a move key, a batch of moves
+            such as 'dddwwa' or '5d', or 'i <item name>' to use an item. A
+            batch is one turn, so only its final state is drawn.
+
+        Parameters:
+            self: instance itself
+            move: the text the player entered
+
+        Returns:
+            True if the input used up the player's turn, False if it was not
+            understood and the player should be asked again
+        """
+        probe = self.instrument
+        if probe:
+            probe.mark('input')
+        if move in MOVE_DELTAS:
+            self.model.move_player(MOVE_DELTAS[move])
+            return True
+        elif move.startswith("i "):
+            if move[2:] not in ITEM_NAMES:
+                print(ITEM_UNKNOWN_MESSAGE)
+            elif not self.model.use_item(move[2:]):
+                print(ITEM_UNAVAILABLE_MESSAGE)
+            if probe:
+                probe.mark('item_use')
+            return True
+        moves = parse_moves(move)
+        if moves is not None:
+            self.model.move_batch(moves)
+            return True
+        return False
 
 
 def main():
@@ -1,5 +1,16 @@
+import os
+import shutil
+import sys
+from typing import Optional, TextIO
 from constants import PLAYER
 
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CLEAR_LINE = '\x1b[K'
+CLEAR_BELOW = '\x1b[J'
+# Lines the move prompt takes below a frame: a blank line, the prompt and
+# the line the cursor moves to when the move is entered.
+PROMPT_LINES = 3
+
 class UserInterface:
     """ Abstract class providing an interface for any MazeRunner View class. """
     def draw(
@@ -62,22 +73,202 @@ class TextInterface(UserInterface):
         items: dict[tuple[int, int], 'Item'],
         player_position: tuple[int, int]
     ) -> None:
-        num_rows, num_cols = maze.get_dimensions()
-        for row in range(num_rows):
-            row_str = ''
-            for col in range(num_cols):
-                if (row, col) == player_position:
-                    row_str += PLAYER
-                elif (row, col) in items:
-                    row_str += items.get((row, col)).get_id()
-                else:
-                    row_str += maze.get_tile((row, col)).get_id()
-            print(row_str)
+        print('\n'.join(self._level_lines(maze, items, player_position)))
     
     def _draw_inventory(self, inventory: 'Inventory') -> None:
-        text = str(inventory) if inventory.get_items() != {} else 'Empty'
-        print('---------------\nInventory\n' + text + '\n' + '---------------')
+        print('\n'.join(self._inventory_lines(inventory)))
     
     def _draw_player_stats(self, player_stats: tuple[int, int, int]) -> None:
+        print('\n'.join(self._stats_lines(player_stats)))
+
+    def _level_lines(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int]
+    ) -> list[str]:
+        """ Returns the rows of text that show the maze, its items and the
+            player.
+
+        Parameters:
+            maze: The current maze for the level
+            items: Maps locations to the items currently at those locations
+            player_position: The current position of the player
+        """
+        rows = [[tile.get_id() for tile in row] for row in maze.get_tiles()]
+        for (row, col), item in items.items():
+            rows[row][col] = item.get_id()
+        row, col = player_position
+        rows[row][col] = PLAYER
+        return [''.join(row) for row in rows]
+
+    def _inventory_lines(self, inventory: 'Inventory') -> list[str]:
+        text = str(inventory) or 'Empty'
+        return ['---------------', 'Inventory', *text.split('\n'), '---------------']
+
+    def _stats_lines(self, player_stats: tuple[int, int, int]) -> list[str]:
         hp, hunger, thirst = player_stats
-        print(f'HP: {hp}\nhunger: {hunger}\nthirst: {thirst}')
+        return [f'HP: {hp}', f'hunger: {hunger}', f'thirst: {thirst}']
+
+
+class ViewportTextInterface(TextInterface):
+    """ A TextInterface that only draws the part of the maze around the
+        player that fits in the terminal. Drawing cost depends on the size of
+        the window, not the maze. Can be combined with BufferedTextInterface
+        by subclassing both.
+    """
+    def __init__(self, size: Optional[tuple[int, int]] = None, **kwargs) -> None:
+        """ 
+        Parameters:
+            size: The (#rows, #columns) of the window; defaults to what fits
+                  in the terminal above the inventory, stats and prompt when
+                  each frame is drawn
+        """
+        super().__init__(**kwargs)
+        self._size = size
+        # Lines kept free below the maze, worked out by draw.
+        self._reserved = PROMPT_LINES
+
+    def draw(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int],
+        inventory: 'Inventory',
+        player_stats: tuple[int, int, int]
+    ) -> None:
+        self._reserved = (len(self._inventory_lines(inventory))
+                          + len(self._stats_lines(player_stats)) + PROMPT_LINES)
+        super().draw(maze, items, player_position, inventory, player_stats)
+
+    def get_window(
+        self,
+        maze: 'Maze',
+        player_position: tuple[int, int]
+    ) -> tuple[int, int, int, int]:
+        """ Returns the (top, left, #rows, #columns) of the window centred on
+            the player, clipped to the maze.
+
+        Parameters:
+            maze: The current maze for the level
+            player_position: The current position of the player
+        """
+        num_rows, num_cols = maze.get_dimensions()
+        if self._size is not None:
+            height, width = self._size
+        else:
+            terminal = shutil.get_terminal_size()
+            height = terminal.lines - self._reserved
+            width = terminal.columns
+        height = max(1, min(height, num_rows))
+        width = max(1, min(width, num_cols))
+        row, col = player_position
+        top = min(max(row - height // 2, 0), num_rows - height)
+        left = min(max(col - width // 2, 0), num_cols - width)
+        return top, left, height, width
+
+    def _level_lines(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int]
+    ) -> list[str]:
+        top, left, height, width = self.get_window(maze, player_position)
+        tiles = maze.get_tiles()
+        lines = []
+        for row in range(top, top + height):
+            cells = [tile.get_id() for tile in tiles[row][left:left + width]]
+            for col in range(left, left + width):
+                item = items.get((row, col))
+                if item is not None:
+                    cells[col - left] = item.get_id()
+            if row == player_position[0] and left <= player_position[1] < left + width:
+                cells[player_position[1] - left] = PLAYER
+            lines.append(''.join(cells))
+        return lines
+
+
+def supports_cursor_addressing(stream: TextIO) -> bool:
+    """ Returns True if the stream is a terminal that understands ANSI cursor
+        movement.
+    """
+    isatty = getattr(stream, 'isatty', None)
+    return (isatty is not None and isatty()
+            and os.environ.get('TERM', '') not in ('', 'dumb'))
+
+
+class BufferedTextInterface(TextInterface):
+    """ A TextInterface that builds each frame in one buffer and writes it
+        with a single call. On a terminal that supports cursor addressing,
+        frames after the first only rewrite the cells that changed.
+    """
+    def __init__(self, stream: Optional[TextIO] = None, diff: bool = True, **kwargs) -> None:
+        """ 
+        Parameters:
+            stream: Where to write frames; defaults to sys.stdout at draw time
+            diff: Whether to send only changed cells when the stream allows it
+        """
+        super().__init__(**kwargs)
+        self._stream = stream
+        self._diff = diff
+        self._previous = None
+
+    def draw(
+        self,
+        maze: 'Maze',
+        items: dict[tuple[int, int], 'Item'],
+        player_position: tuple[int, int],
+        inventory: 'Inventory',
+        player_stats: tuple[int, int, int]
+    ) -> None:
+        stream = self._stream if self._stream is not None else sys.stdout
+        lines = self._level_lines(maze, items, player_position)
+        lines.extend(self._inventory_lines(inventory))
+        lines.extend(self._stats_lines(player_stats))
+
+        if self._diff and supports_cursor_addressing(stream):
+            stream.write(self._frame_update(lines))
+        else:
+            stream.write('\n'.join(lines) + '\n')
+        stream.flush()
+
+    def reset(self) -> None:
+        """ Forgets the last frame, so the next one is drawn in full. """
+        self._previous = None
+
+    def _frame_update(self, lines: list[str]) -> str:
+        """ Returns the escape sequences that turn the last frame into this
+            one, leaving the cursor on the line below the frame.
+
+        Parameters:
+            lines: The rows of text in the new frame
+        """
+        previous = self._previous
+        self._previous = lines
+        height = shutil.get_terminal_size().lines
+        # A frame that does not leave room for the prompt scrolls the screen,
+        # which would put every absolute cursor position in the next diff off.
+        if (previous is None or len(previous) != len(lines)
+                or len(lines) + PROMPT_LINES > height):
+            return CLEAR_SCREEN + '\n'.join(lines) + '\n'
+
+        out = []
+        for row, (old, new) in enumerate(zip(previous, lines), start=1):
+            if old == new:
+                continue
+            width = min(len(old), len(new))
+            col = 0
+            while col < width:
+                if old[col] == new[col]:
+                    col += 1
+                    continue
+                start = col
+                while col < width and old[col] != new[col]:
+                    col += 1
+                out.append(f'\x1b[{row};{start + 1}H{new[start:col]}')
+            if len(new) > width:
+                out.append(f'\x1b[{row};{width + 1}H{new[width:]}')
+            elif len(old) > width:
+                out.append(f'\x1b[{row};{width + 1}H{CLEAR_LINE}')
+        out.append(f'\x1b[{len(lines) + 1};1H{CLEAR_BELOW}')
+        return ''.join(out)
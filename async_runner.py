@@ -0,0 +1,272 @@
+""" Runs MazeRunner games as asyncio coroutines, so many games can share one
+process and one thread.
+
+An AsyncMazeRunner plays the same turns as MazeRunner.play, but reads moves
+from a MoveSource and sends everything the view prints back through it, and
+it returns a GameResult instead of calling exit(). Sources are provided for
+stdin, asyncio streams (e.g. a socket), a pair of queues and a fixed list of
+moves such as a recorded transcript.
+
+Usage: python async_runner.py GAME_FILE
+       python async_runner.py --replay TRANSCRIPT...
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from a2 import MazeRunner, PackedLevels
+from a2_support import TextInterface, UserInterface
+from constants import LOSS_MESSAGE, WIN_MESSAGE
+from instrumentation import Instrument
+
+MOVE_PROMPT = "\nEnter a move: "
+
+WON = 'won'
+LOST = 'lost'
+ENDED = 'ended'
+
+
+class GameResult(NamedTuple):
+    """ How a game finished: WON, LOST, or ENDED when the input ran out. """
+    outcome: str
+    levels_cleared: int
+    stats: tuple[int, int, int]
+    turns: int
+
+
+class MoveSource():
+    """ Where an AsyncMazeRunner reads moves from and sends its output to. """
+    async def read_move(self, prompt: str) -> Optional[str]:
+        """ Shows the prompt and waits for the next line of input.
+
+        Returns:
+            The line without its line ending, or None once input has ended
+        """
+        raise NotImplementedError
+
+    async def write(self, text: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class StreamSource(MoveSource):
+    """ Reads lines from an asyncio StreamReader and writes to a StreamWriter,
+        e.g. the two ends of a socket connection.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 encoding: str = 'utf-8') -> None:
+        self.reader = reader
+        self.writer = writer
+        self.encoding = encoding
+
+    async def read_move(self, prompt: str) -> Optional[str]:
+        await self.write(prompt)
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return line.decode(self.encoding, 'replace').rstrip('\r\n')
+
+    async def write(self, text: str) -> None:
+        if text:
+            self.writer.write(text.encode(self.encoding))
+            await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self.writer.wait_closed()
+
+
+class StdinSource(MoveSource):
+    """ Reads moves from stdin without blocking the event loop and writes to
+        stdout. Only one StdinSource should be reading at a time.
+
+        When stdin is a pipe or terminal it is read through the event loop;
+        otherwise, e.g. when it is redirected from a file, lines are read in
+        the loop's default executor.
+    """
+    def __init__(self) -> None:
+        self.reader = None
+        self.piped = None
+
+    async def read_move(self, prompt: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        if self.piped is None:
+            self.reader = asyncio.StreamReader()
+            protocol = asyncio.StreamReaderProtocol(self.reader)
+            try:
+                await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+                self.piped = True
+            except ValueError:
+                # Only pipes, sockets and character devices can be watched.
+                self.reader = None
+                self.piped = False
+        await self.write(prompt)
+        if self.piped:
+            line = (await self.reader.readline()).decode(errors='replace')
+        else:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            return None
+        return line.rstrip('\r\n')
+
+    async def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class QueueSource(MoveSource):
+    """ Takes moves from one asyncio queue and puts output on another. A None
+        move ends the input.
+    """
+    def __init__(self, moves: asyncio.Queue, output: Optional[asyncio.Queue] = None) -> None:
+        self.moves = moves
+        self.output = output
+
+    async def read_move(self, prompt: str) -> Optional[str]:
+        await self.write(prompt)
+        return await self.moves.get()
+
+    async def write(self, text: str) -> None:
+        if self.output is not None and text:
+            await self.output.put(text)
+
+
+class ReplaySource(MoveSource):
+    """ Plays a fixed list of moves, waiting delay seconds before each one,
+        and records the session as a transcript would show it.
+    """
+    def __init__(self, moves: Iterable[str], delay: float = 0.0) -> None:
+        self.moves = iter(moves)
+        self.delay = delay
+        self.output = io.StringIO()
+
+    @classmethod
+    def from_transcript(cls, path: str, delay: float = 0.0) -> 'ReplaySource':
+        from replay import GAME_FILE_PROMPT, parse_transcript
+
+        transcript = parse_transcript(path)
+        source = cls(transcript.moves, delay)
+        source.output.write(GAME_FILE_PROMPT + transcript.game_file + '\n')
+        return source
+
+    async def read_move(self, prompt: str) -> Optional[str]:
+        # Sleeping, even for 0 seconds, lets other sessions take a turn.
+        await asyncio.sleep(self.delay)
+        await self.write(prompt)
+        move = next(self.moves, None)
+        if move is not None:
+            await self.write(move + '\n')
+        return move
+
+    async def write(self, text: str) -> None:
+        self.output.write(text)
+
+    def getvalue(self) -> str:
+        return self.output.getvalue()
+
+
+class AsyncMazeRunner(MazeRunner):
+    """
+    A MazeRunner whose game loop is a coroutine driven by a MoveSource.
+    """
+    def __init__(self, game_file: str, view: UserInterface, source: MoveSource,
+                 instrument: Optional[Instrument] = None,
+                 levels: Optional[PackedLevels] = None) -> None:
+        super().__init__(game_file, view, instrument=instrument, levels=levels)
+        self.source = source
+        self.turns = 0
+
+    def _captured(self, action: Callable[..., object], *args: object) -> tuple[object, str]:
+        """ Runs a synchronous step with its printed output captured. No other
+            coroutine can run in between, so redirecting stdout is safe.
+        """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            result = action(*args)
+        return result, out.getvalue()
+
+    async def run(self) -> GameResult:
+        """ Plays the game until it is won, lost or the input ends. Calling
+            run again, e.g. with a new source, carries on the same game.
+
+        Returns:
+            GameResult
+        """
+        probe = self.instrument
+        while True:
+            if probe:
+                probe.start_turn()
+            _, text = self._captured(self.draw)
+            await self.source.write(text)
+            while True:
+                move = await self.source.read_move(MOVE_PROMPT)
+                if probe:
+                    probe.mark('wait')
+                if move is None:
+                    if probe:
+                        probe.end_turn()
+                    return self._result(ENDED)
+                done, text = self._captured(self.handle_move, move)
+                await self.source.write(text)
+                if done:
+                    break
+            self.turns += 1
+            if probe:
+                probe.end_turn()
+
+            if self.model.has_won():
+                await self.source.write(WIN_MESSAGE + '\n')
+                return self._result(WON)
+            if self.model.has_lost():
+                await self.source.write(LOSS_MESSAGE + '\n')
+                return self._result(LOST)
+
+    def _result(self, outcome: str) -> GameResult:
+        return GameResult(outcome, self.model.index, self.model.get_player_stats(), self.turns)
+
+
+async def run_games(runners: Iterable[AsyncMazeRunner]) -> list[GameResult]:
+    """ Plays several games concurrently and returns their results in order. """
+    return list(await asyncio.gather(*(runner.run() for runner in runners)))
+
+
+async def _replay_transcripts(paths: list[str]) -> int:
+    from replay import parse_transcript, resolve_game_file
+
+    sources = [ReplaySource.from_transcript(path) for path in paths]
+    runners = [AsyncMazeRunner(resolve_game_file(parse_transcript(path)), TextInterface(), source)
+               for path, source in zip(paths, sources)]
+    results = await run_games(runners)
+    failed = 0
+    for path, source, result in zip(paths, sources, results):
+        with open(path, 'r') as file:
+            matches = file.read().rstrip('\n') == source.getvalue().rstrip('\n')
+        failed += not matches
+        print(f"{'ok  ' if matches else 'FAIL'} {path}: {result.outcome} after {result.turns} turns")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Play MazeRunner on an asyncio event loop.')
+    parser.add_argument('game_file', nargs='?')
+    parser.add_argument('--replay', nargs='+', metavar='TRANSCRIPT',
+                        help='replay transcripts concurrently and compare the output')
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        return asyncio.run(_replay_transcripts(args.replay))
+    if args.game_file is None:
+        parser.error('a game file or --replay is required')
+    runner = AsyncMazeRunner(args.game_file, TextInterface(), StdinSource())
+    result = asyncio.run(runner.run())
+    return 0 if result.outcome == WON else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+""" Benchmarks the game's hot paths on generated mazes of several sizes.
+
+Each operation is timed over repeated batches on a square maze of each size.
+A second, traced run measures the memory it allocates (net, after the
+operation) and the peak memory it uses. Results are printed as a table and
+can be written as JSON, and compared against an earlier JSON run to catch
+regressions.
+
+Usage: python benchmark.py [--sizes N ...] [--ops NAME ...] [--out FILE]
+                           [--baseline FILE] [--tolerance T] [--min-time S]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from a2 import Model, load_game
+from a2_support import TextInterface
+from constants import LEFT, MAX_HEALTH, MOVE_DELTAS, RIGHT
+from generator import generate_game
+
+DEFAULT_SIZES = (5, 50, 200, 1000, 2000)
+DEFAULT_TOLERANCE = 0.25
+
+# A benchmark takes a generated game file and returns a function that runs
+# one batch of the operation and returns how many operations it ran.
+Benchmark = Callable[[str], Callable[[], int]]
+
+
+def bench_load_game(path: str) -> Callable[[], int]:
+    def run() -> int:
+        load_game(path, use_cache=False)
+        return 1
+    return run
+
+
+def bench_load_game_cached(path: str) -> Callable[[], int]:
+    load_game(path, use_cache=True)
+    def run() -> int:
+        load_game(path, use_cache=True)
+        return 1
+    return run
+
+
+def bench_get_tile(path: str) -> Callable[[], int]:
+    maze = Model(path).get_current_maze()
+    num_rows, num_cols = maze.get_dimensions()
+    rng = random.Random(0)
+    positions = [(rng.randrange(num_rows), rng.randrange(num_cols)) for _ in range(1000)]
+    def run() -> int:
+        get_tile = maze.get_tile
+        for position in positions:
+            get_tile(position)
+        return len(positions)
+    return run
+
+
+def bench_get_current_items(path: str) -> Callable[[], int]:
+    model = Model(path)
+    def run() -> int:
+        model.get_current_items()
+        return 1
+    return run
+
+
+def bench_move_player(path: str) -> Callable[[], int]:
+    # Generated mazes always have an open corridor along the first row, so
+    # the player can step right and back for ever.
+    model = Model(path)
+    player = model.get_player()
+    moves = [MOVE_DELTAS[RIGHT], MOVE_DELTAS[LEFT]] * 50
+    def run() -> int:
+        for delta in moves:
+            model.move_player(delta)
+        player.hp, player.hunger, player.thirst = MAX_HEALTH, 0, 0
+        return len(moves)
+    return run
+
+
+def bench_get_player_start(path: str) -> Callable[[], int]:
+    level = Model(path).get_level()
+    def run() -> int:
+        level.get_player_start()
+        return 1
+    return run
+
+
+def bench_draw(path: str) -> Callable[[], int]:
+    model = Model(path)
+    view = TextInterface()
+    def run() -> int:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            view.draw(model.get_current_maze(), model.get_current_items(),
+                      model.get_player().get_position(), model.get_player_inventory(),
+                      model.get_player_stats())
+        return 1
+    return run
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    'load_game': bench_load_game,
+    'load_game_cached': bench_load_game_cached,
+    'get_tile': bench_get_tile,
+    'get_current_items': bench_get_current_items,
+    'move_player': bench_move_player,
+    'get_player_start': bench_get_player_start,
+    'draw': bench_draw,
+}
+
+
+def measure(run: Callable[[], int], min_time: float) -> dict[str, float]:
+    """ Times batches of an operation until min_time has passed (and at least
+        three batches have run), then traces one more batch for memory.
+
+    Returns:
+        The per-operation latency statistics and memory use
+    """
+    latencies = []
+    operations = 0
+    started = time.perf_counter()
+    gc.collect()
+    while len(latencies) < 3 or time.perf_counter() - started < min_time:
+        before = time.perf_counter()
+        count = run()
+        latencies.append((time.perf_counter() - before) / count)
+        operations += count
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    count = run()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'operations': operations,
+        'mean_s': statistics.fmean(latencies),
+        'median_s': statistics.median(latencies),
+        'p95_s': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'alloc_bytes': (after - before) / count,
+        'peak_bytes': peak - before,
+    }
+
+
+def run_benchmarks(sizes: list[int], ops: list[str], min_time: float,
+                   seed: int = 0) -> dict:
+    """ Runs the chosen benchmarks on a generated maze of each size.
+
+    Returns:
+        The results, ready to be written as JSON
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f'maze_{size}.txt')
+            generate_game(path, 1, (size, size), seed, coins=0.02, items=0.01, lava=0.0)
+            for op in ops:
+                result = measure(BENCHMARKS[op](path), min_time)
+                results.append({'op': op, 'size': size, **result})
+                print(f"{op:>18} {size:>5}  {result['median_s'] * 1e6:12.2f} us"
+                      f"  {result['alloc_bytes']:12.0f} B  {result['peak_bytes']:12.0f} B peak",
+                      file=sys.stderr)
+    return {'python': platform.python_version(), 'seed': seed, 'results': results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """ Returns a line for every operation whose median latency is more than
+        tolerance slower than in the baseline.
+    """
+    previous = {(entry['op'], entry['size']): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results['results']:
+        old = previous.get((entry['op'], entry['size']))
+        if old is None or old['median_s'] <= 0:
+            continue
+        ratio = entry['median_s'] / old['median_s']
+        if ratio > 1 + tolerance:
+            regressions.append(f"{entry['op']} at {entry['size']}: {ratio:.2f}x slower "
+                               f"({old['median_s'] * 1e6:.2f} us -> {entry['median_s'] * 1e6:.2f} us)")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark MazeRunner hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--ops', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds to spend timing each operation and size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown before reporting a regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.ops, args.min_time, args.seed)
+    if args.out:
+        with open(args.out, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -40,3 +40,4 @@ LAVA_DAMAGE = 5
 WIN_MESSAGE = 'Congratulations! You have finished all levels and won the game!'
 LOSS_MESSAGE = 'You lose :('
 ITEM_UNAVAILABLE_MESSAGE = '\nYou don\'t have any of that item!\n'
+ITEM_UNKNOWN_MESSAGE = '\nNo item with that name!\n'
@@ -0,0 +1,166 @@
+""" Generates random game files in the format load_game reads.
+
+Mazes are built with the sidewinder algorithm, which decides one row of the
+maze at a time from nothing but the row itself. Levels are written to disk
+row by row, so memory use depends on the width of a maze, not its size.
+Sidewinder makes a spanning tree of the maze's cells, so every cell, item
+and the door can be reached from the start. Extra openings (loops) are only
+ever added, which keeps it that way; lava does not block movement.
+
+Usage: python generator.py OUT [--levels N] [--size ROWS COLUMNS] [--seed S]
+                           [--coins P] [--items P] [--lava P] [--loops P] [--check]
+"""
+import argparse
+import random
+import sys
+from typing import Iterator, Optional, TextIO
+
+from constants import APPLE, COIN, DOOR, EMPTY, HONEY, LAVA, PLAYER, POTION, WALL, WATER
+
+USABLE_ITEMS = (POTION, APPLE, HONEY, WATER)
+
+
+def _cell_rows(height: int, width: int, rng: random.Random,
+               loops: float) -> Iterator[tuple[bytearray, bytearray]]:
+    """ Yields, for each row of cells, which cells open to the north and
+        which open to the east.
+    """
+    for row in range(height):
+        north = bytearray(width)
+        east = bytearray(width)
+        if row == 0:
+            east[:width - 1] = b'\x01' * (width - 1)
+        else:
+            run_start = 0
+            for column in range(width):
+                if column == width - 1 or rng.random() < 0.5:
+                    north[rng.randrange(run_start, column + 1)] = 1
+                    run_start = column + 1
+                else:
+                    east[column] = 1
+            if loops:
+                for column in range(width):
+                    if rng.random() < loops:
+                        north[column] = 1
+                    if column < width - 1 and rng.random() < loops:
+                        east[column] = 1
+        yield north, east
+
+
+def write_level(file: TextIO, number: int, dimensions: tuple[int, int],
+                rng: random.Random, coins: float = 0.02, items: float = 0.01,
+                lava: float = 0.05, loops: float = 0.0) -> None:
+    """ Writes one randomly generated level to an open game file.
+
+    Parameters:
+        file: The file to write to
+        number: The level's number, for its "Maze N - R C" header
+        dimensions: The (#rows, #columns) of the level; at least 3 x 3
+        rng: The random number generator to draw from
+        coins: The chance each cell holds a coin
+        items: The chance each cell holds a potion, apple, honey or water
+        lava: The chance each cell is lava
+        loops: The chance of each extra opening that makes a loop
+    """
+    num_rows, num_cols = dimensions
+    if num_rows < 3 or num_cols < 3:
+        raise ValueError(f"levels must be at least 3 x 3, not {num_rows} x {num_cols}")
+    height = (num_rows - 1) // 2
+    width = (num_cols - 1) // 2
+    padding = WALL * (num_cols - 2 * width - 1)
+    solid = WALL * num_cols
+
+    file.write(f"Maze {number} - {num_rows} {num_cols}\n")
+    file.write(solid + '\n')
+    for row, (north, east) in enumerate(_cell_rows(height, width, rng, loops)):
+        if row > 0:
+            file.write(''.join(WALL + (EMPTY if opening else WALL) for opening in north)
+                       + WALL + padding + '\n')
+        line = [WALL]
+        for column in range(width):
+            chance = rng.random()
+            if row == 0 and column == 0:
+                cell = PLAYER
+            elif chance < coins:
+                cell = COIN
+            elif chance < coins + items:
+                cell = rng.choice(USABLE_ITEMS)
+            elif chance < coins + items + lava:
+                cell = LAVA
+            else:
+                cell = EMPTY
+            line.append(cell)
+            line.append(EMPTY if east[column] else WALL)
+        if row == height - 1:
+            line[-1] = DOOR
+        file.write(''.join(line) + padding + '\n')
+    for _ in range(num_rows - 2 * height):
+        file.write(solid + '\n')
+    file.write('\n')
+
+
+def generate_game(path: str, levels: int, dimensions: tuple[int, int],
+                  seed: Optional[int] = None, **options: float) -> None:
+    """ Writes a game file of randomly generated levels.
+
+    Parameters:
+        path: Where to write the game file
+        levels: How many levels to generate
+        dimensions: The (#rows, #columns) of every level
+        seed: Seeds the generator, so the same seed gives the same file
+        options: Densities passed on to write_level
+    """
+    rng = random.Random(seed)
+    with open(path, 'w') as file:
+        for number in range(1, levels + 1):
+            write_level(file, number, dimensions, rng, **options)
+
+
+def check_reachable(path: str) -> list[str]:
+    """ Loads a game file and checks every item and door can be reached
+        from the player's start. Loads whole levels, so it is meant for
+        testing the generator rather than for huge files.
+
+    Returns:
+        A description of each problem found
+    """
+    from a2 import load_game
+    from pathfinding import reachable_cells
+
+    problems = []
+    for number, level in enumerate(load_game(path, use_cache=False), start=1):
+        index = level.get_index()
+        reachable = reachable_cells(index, index.start)
+        targets = [position for positions in index.items.values() for position in positions]
+        for target in sorted(targets) + [index.door]:
+            if not reachable >> target[0] * index.num_columns + target[1] & 1:
+                problems.append(f"maze {number}: {target} cannot be reached from {index.start}")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Generate random MazeRunner game files.')
+    parser.add_argument('out')
+    parser.add_argument('--levels', type=int, default=1)
+    parser.add_argument('--size', type=int, nargs=2, default=(21, 21), metavar=('ROWS', 'COLUMNS'))
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--coins', type=float, default=0.02)
+    parser.add_argument('--items', type=float, default=0.01)
+    parser.add_argument('--lava', type=float, default=0.05)
+    parser.add_argument('--loops', type=float, default=0.0)
+    parser.add_argument('--check', action='store_true',
+                        help='load the file afterwards and check reachability')
+    args = parser.parse_args(argv)
+
+    generate_game(args.out, args.levels, tuple(args.size), args.seed, coins=args.coins,
+                  items=args.items, lava=args.lava, loops=args.loops)
+    if args.check:
+        problems = check_reachable(args.out)
+        for problem in problems:
+            print(problem)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
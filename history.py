@@ -0,0 +1,194 @@
+""" An undo/redo log of the commands applied to a Model.
+
+Attach a History to a Model (model.history = History()) and every move and
+item use is recorded as an Event. An event holds what the command changed:
+the player's position, stats and move streak before it, any item collected,
+doors unlocked, item used, and the level it started on. Undoing an event puts
+exactly those things back, and redoing applies its command again, so both
+cost O(1) whatever the size of the level.
+
+The log can be saved as a replay file that parse_transcript in replay.py
+reads, and loaded to replay a game onto a new Model.
+"""
+from typing import Any, NamedTuple, Optional
+
+from constants import MOVE_DELTAS
+
+_MOVE_KEYS = {delta: key for key, delta in MOVE_DELTAS.items()}
+
+
+class Event(NamedTuple):
+    """ One command and how to undo it. """
+    command: str
+    index: int
+    level: Any
+    position: tuple[int, int]
+    stats: tuple[int, int, int]
+    move_streak: int
+    levelled_up: bool
+    collected: Optional[tuple[tuple[int, int], Any]]
+    unlocked: list[tuple[int, int]]
+    used: Any
+
+
+class History():
+    """ The events applied to a Model, with a cursor that undo and redo move
+        along. Recording a new event drops the events that were undone.
+    """
+    def __init__(self) -> None:
+        self.events = []
+        self.cursor = 0
+        self._pending = None
+        self._redoing = False
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        return self.cursor < len(self.events)
+
+    def begin(self, model: Any, delta: Optional[tuple[int, int]] = None,
+              item_name: Optional[str] = None) -> None:
+        """ Notes the state a command starts from. Called by Model before a
+            move (with delta) or an item use (with item_name).
+        """
+        level = model.curr_level
+        position = model.player.get_position()
+        if delta is not None:
+            command = _MOVE_KEYS.get(delta, f"{delta[0]} {delta[1]}")
+            target = (position[0] + delta[0], position[1] + delta[1])
+            item = level.get_items().get(target)
+        else:
+            command = f"i {item_name}"
+            target = item = None
+        player = model.player
+        self._pending = (command, model.index, level, position,
+                         (player.hp, player.hunger, player.thirst),
+                         model.move_streak, model.levelled_up, level.maze.doors, target, item)
+
+    def end(self, model: Any, used: Any = None) -> Event:
+        """ Records the command begun with begin. Called by Model afterwards,
+            with the item that was used, if any.
+
+        Returns:
+            The recorded Event
+        """
+        (command, index, level, position, stats, move_streak, levelled_up,
+         doors, target, item) = self._pending
+        self._pending = None
+        collected = None
+        if (item is not None and model.curr_level is level
+                and model.player.get_position() == target and target not in level.get_items()):
+            collected = (target, item)
+        unlocked = doors if doors and not level.maze.doors else []
+        event = Event(command, index, level, position, stats, move_streak, levelled_up,
+                      collected, unlocked, used)
+        if self._redoing:
+            self.events[self.cursor] = event
+        else:
+            del self.events[self.cursor:]
+            self.events.append(event)
+        self.cursor += 1
+        return event
+
+    def undo(self, model: Any) -> Optional[Event]:
+        """ Puts the model back into the state before the last command.
+
+        Returns:
+            The event undone, or None if there was nothing to undo
+        """
+        if not self.cursor:
+            return None
+        self.cursor -= 1
+        event = self.events[self.cursor]
+        level = event.level
+        if model.curr_level is not level or model.index != event.index:
+            model.index = event.index
+            model.curr_level = level
+            model.levels.keep(event.index, level)
+            model.start_player_pos = level.get_player_start()
+
+        inventory = model.player.get_inventory()
+        if event.collected is not None:
+            position, item = event.collected
+            level.put_item(position, item)
+            inventory.remove_item(item.get_name())
+        if event.unlocked:
+            level.maze.lock_doors(event.unlocked)
+        if event.used is not None:
+            inventory.add_item(event.used)
+
+        player = model.player
+        player.set_position(event.position)
+        player.hp, player.hunger, player.thirst = event.stats
+        model.move_streak = event.move_streak
+        model.levelled_up = event.levelled_up
+        return event
+
+    def redo(self, model: Any) -> Optional[Event]:
+        """ Applies the last undone command again.
+
+        Returns:
+            The event redone, or None if there was nothing to redo
+        """
+        if not self.can_redo():
+            return None
+        self._redoing = True
+        try:
+            model.apply_command(self.events[self.cursor].command)
+        finally:
+            self._redoing = False
+        return self.events[self.cursor - 1]
+
+    def restart_level(self, model: Any) -> int:
+        """ Undoes every command made on the current level.
+
+        Returns:
+            How many commands were undone
+        """
+        undone = 0
+        while self.cursor and self.events[self.cursor - 1].index == model.index:
+            self.undo(model)
+            undone += 1
+        return undone
+
+    def commands(self) -> list[str]:
+        """ Returns the commands that lead to the current state, in order. """
+        return [event.command for event in self.events[:self.cursor]]
+
+    def save(self, filename: str, game_file: str) -> None:
+        """ Writes the commands leading to the current state as a replay file.
+
+        Parameters:
+            filename: Where to write the replay
+            game_file: The game file the commands were played on
+        """
+        from replay import GAME_FILE_PROMPT, MOVE_PROMPT
+
+        with open(filename, 'w') as file:
+            file.write(GAME_FILE_PROMPT + game_file + '\n')
+            for command in self.commands():
+                file.write(MOVE_PROMPT + command + '\n')
+
+    @staticmethod
+    def load(filename: str, model: Any) -> 'History':
+        """ Replays a replay file onto a new Model, recording a History
+            that can then be undone.
+
+        Parameters:
+            filename: A replay file or recorded transcript
+            model: A Model of the game at its start
+
+        Returns:
+            The History attached to model
+        """
+        from replay import parse_transcript
+
+        history = History()
+        model.history = history
+        for command in parse_transcript(filename).moves:
+            model.apply_command(command)
+        return history
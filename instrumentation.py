@@ -0,0 +1,167 @@
+""" Optional per-turn timers and counters for MazeRunner and Model.
+
+An Instrument splits each turn into phases with mark(): each mark records the
+time since the previous one under the given phase name, so phases marked in
+MazeRunner.play and Model.move_player add up to the whole turn. The time spent
+waiting for the player to enter a move is its own phase, 'wait', so the other
+phases only measure the game. Finished turns are passed to sinks, which can
+build histograms, write a log, or run cProfile over a span of turns.
+
+Instrumentation is off unless an Instrument is given; the game then only
+checks for None at each phase boundary.
+"""
+import cProfile
+import json
+import time
+from typing import Callable, Iterable, NamedTuple, Optional, TextIO
+
+
+class TurnRecord(NamedTuple):
+    """ The seconds spent in each phase of one turn, and its counters. """
+    turn: int
+    phases: dict[str, float]
+    counters: dict[str, int]
+    total: float
+
+
+class Sink():
+    """ Receives turns from an Instrument. Subclasses override what they need. """
+    def turn_started(self, turn: int) -> None:
+        pass
+
+    def turn_finished(self, record: TurnRecord) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class Instrument():
+    """ Times the phases of each turn and passes the results to its sinks. """
+    def __init__(self, sinks: Iterable[Sink] = (),
+                 clock: Callable[[], float] = time.perf_counter) -> None:
+        self.sinks = list(sinks)
+        self.clock = clock
+        self.turn = 0
+        self.phases = {}
+        self.counters = {}
+        self._started = None
+        self._last = None
+
+    def start_turn(self) -> None:
+        """ Starts timing a new turn. """
+        self.turn += 1
+        self.phases = {}
+        self.counters = {}
+        for sink in self.sinks:
+            sink.turn_started(self.turn)
+        self._started = self._last = self.clock()
+
+    def mark(self, phase: str) -> None:
+        """ Adds the time since the previous mark to the given phase. Ignored
+            outside a turn.
+        """
+        if self._last is None:
+            return
+        now = self.clock()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_turn(self) -> Optional[TurnRecord]:
+        """ Finishes the turn and passes it to every sink.
+
+        Returns:
+            The finished turn, or None if no turn was started
+        """
+        if self._started is None:
+            return None
+        record = TurnRecord(self.turn, self.phases, self.counters,
+                            self.clock() - self._started)
+        self._started = self._last = None
+        for sink in self.sinks:
+            sink.turn_finished(record)
+        return record
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class HistogramSink(Sink):
+    """ Keeps a histogram of each phase's duration, in power-of-two buckets
+        of microseconds, and totals of every counter.
+    """
+    def __init__(self) -> None:
+        self.turns = 0
+        self.histograms = {}
+        self.totals = {}
+        self.counters = {}
+
+    def turn_finished(self, record: TurnRecord) -> None:
+        self.turns += 1
+        for phase, seconds in list(record.phases.items()) + [('turn', record.total)]:
+            bucket = int(seconds * 1e6).bit_length()
+            histogram = self.histograms.setdefault(phase, [])
+            if len(histogram) <= bucket:
+                histogram.extend([0] * (bucket + 1 - len(histogram)))
+            histogram[bucket] += 1
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        for name, amount in record.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> str:
+        """ Returns the histograms as text, one block per phase. """
+        lines = [f"{self.turns} turns"]
+        for phase, histogram in self.histograms.items():
+            samples = sum(histogram)
+            lines.append(f"{phase}: {samples} samples, "
+                         f"mean {self.totals[phase] / samples * 1e6:.1f} us")
+            for bucket, amount in enumerate(histogram):
+                if amount:
+                    upper = 1 << bucket
+                    lines.append(f"  < {upper:>8} us {amount:>8} {'#' * max(1, 40 * amount // samples)}")
+        for name, amount in self.counters.items():
+            lines.append(f"{name}: {amount}")
+        return '\n'.join(lines)
+
+
+class JsonLinesSink(Sink):
+    """ Writes each turn as a line of JSON to an open file. """
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+
+    def turn_finished(self, record: TurnRecord) -> None:
+        self.file.write(json.dumps(record._asdict()) + '\n')
+
+    def close(self) -> None:
+        self.file.flush()
+
+
+class ProfileSink(Sink):
+    """ Runs cProfile from the start of turn first to the end of turn last
+        (or until closed), then writes the stats to path for pstats or
+        snakeviz.
+    """
+    def __init__(self, path: str, first: int = 1, last: Optional[int] = None) -> None:
+        self.path = path
+        self.first = first
+        self.last = last
+        self.profile = None
+
+    def turn_started(self, turn: int) -> None:
+        if turn == self.first:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def turn_finished(self, record: TurnRecord) -> None:
+        if record.turn == self.last:
+            self.close()
+
+    def close(self) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+            self.profile = None
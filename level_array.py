@@ -0,0 +1,184 @@
+""" Whole-level array operations for analysing levels in bulk.
+
+A LevelArrays holds a level as a grid of tile codes and a grid of item codes,
+so questions about the whole level (how many coins, where the player starts,
+whether it is well formed) are answered with vectorised operations instead of
+loops over every cell. NumPy is used when it is installed; otherwise the
+grids are bytes objects and the same operations use bytes methods.
+"""
+from typing import Iterator, Optional, Union
+
+from a2 import ITEM_CLASSES, TILE_FLYWEIGHTS, Item, Level, split_levels
+from constants import COIN, DOOR, PLAYER
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+NO_ITEM = 0
+ITEM_CODES = {item_id: code for code, item_id in enumerate(ITEM_CLASSES, start=1)}
+ITEM_IDS = {code: item_id for item_id, code in ITEM_CODES.items()}
+
+# Character -> code lookup tables. Unknown characters are floor in the terrain
+# table and are flagged by the valid table.
+_TERRAIN_TABLE = bytearray(256)
+for _code, _tile in enumerate(TILE_FLYWEIGHTS):
+    _TERRAIN_TABLE[ord(_tile.get_id())] = _code
+_ITEM_TABLE = bytearray(256)
+for _item_id, _code in ITEM_CODES.items():
+    _ITEM_TABLE[ord(_item_id)] = _code
+_VALID_TABLE = bytearray(256)
+for _char in [tile.get_id() for tile in TILE_FLYWEIGHTS] + list(ITEM_CLASSES) + [PLAYER]:
+    _VALID_TABLE[ord(_char)] = 1
+if HAS_NUMPY:
+    _TERRAIN_LUT = np.frombuffer(bytes(_TERRAIN_TABLE), dtype=np.uint8)
+    _ITEM_LUT = np.frombuffer(bytes(_ITEM_TABLE), dtype=np.uint8)
+    _VALID_LUT = np.frombuffer(bytes(_VALID_TABLE), dtype=np.uint8)
+
+Grid = Union[bytes, 'np.ndarray']
+
+
+class LevelArrays():
+    """ A level as flat, row-major grids of characters, tile codes and item
+        codes. The tile codes match Maze.tiles.
+    """
+    def __init__(self, dimensions: tuple[int, int], rows: list[str]) -> None:
+        """
+        Parameters:
+            dimensions: The (#rows, #columns) the level is declared with
+            rows: The level's rows, as they appear in a game file
+        """
+        self.num_rows, self.num_columns = dimensions
+        self.rows = rows
+        raw = ''.join(rows).encode('latin-1', 'replace')
+        if HAS_NUMPY:
+            self.chars = np.frombuffer(raw, dtype=np.uint8)
+            self.terrain = _TERRAIN_LUT[self.chars]
+            self.items = _ITEM_LUT[self.chars]
+        else:
+            self.chars = raw
+            self.terrain = raw.translate(_TERRAIN_TABLE)
+            self.items = raw.translate(_ITEM_TABLE)
+
+    @classmethod
+    def from_level(cls, level: Level) -> 'LevelArrays':
+        """ Builds the arrays for a Level in its current state. """
+        rows = [list(row) for row in level.get_maze().maze]
+        for (row, column), item in level.get_items().items():
+            rows[row][column] = item.get_id()
+        start = level.get_player_start()
+        if start is not None:
+            rows[start[0]][start[1]] = PLAYER
+        return cls(level.get_dimensions(), [''.join(row) for row in rows])
+
+    def grid(self, flat: Grid) -> Grid:
+        """ Returns a flat grid shaped as (#rows, #columns) when using NumPy. """
+        if HAS_NUMPY:
+            return flat.reshape(self.num_rows, self.num_columns)
+        return flat
+
+    def _count(self, flat: Grid, code: int) -> int:
+        if HAS_NUMPY:
+            return int(np.count_nonzero(flat == code))
+        return flat.count(code)
+
+    def _positions(self, flat: Grid, code: int) -> list[tuple[int, int]]:
+        if HAS_NUMPY:
+            indices = np.flatnonzero(flat == code).tolist()
+        else:
+            indices = _find_all(flat, code)
+        return [divmod(index, self.num_columns) for index in indices]
+
+    def count_items(self, item_id: str) -> int:
+        """ Returns how many of the given item are in the level. """
+        return self._count(self.items, ITEM_CODES[item_id])
+
+    def count_coins(self) -> int:
+        """ Returns how many coins must be collected to unlock the door. """
+        return self.count_items(COIN)
+
+    def find_player_starts(self) -> list[tuple[int, int]]:
+        """ Returns every position marked as a player start. """
+        return self._positions(self.chars, ord(PLAYER))
+
+    def get_player_start(self) -> Optional[tuple[int, int]]:
+        """ Returns the first player start, or None if there is none. """
+        starts = self.find_player_starts()
+        return starts[0] if starts else None
+
+    def find_doors(self) -> list[tuple[int, int]]:
+        """ Returns the position of every door. """
+        return self._positions(self.chars, ord(DOOR))
+
+    def get_items(self) -> dict[tuple[int, int], Item]:
+        """ Returns a new item map like Level.get_items, in row-major order. """
+        if HAS_NUMPY:
+            indices = np.flatnonzero(self.items)
+            found = zip(indices.tolist(), self.items[indices].tolist())
+        else:
+            found = sorted((index, code) for code in ITEM_IDS
+                           for index in _find_all(self.items, code))
+        items = {}
+        for index, code in found:
+            position = divmod(index, self.num_columns)
+            items[position] = ITEM_CLASSES[ITEM_IDS[code]](position)
+        return items
+
+    def problems(self) -> list[str]:
+        """ Returns a description of everything wrong with the level, or an
+            empty list if it is well formed.
+        """
+        problems = []
+        if len(self.rows) != self.num_rows:
+            problems.append(f"has {len(self.rows)} rows, expected {self.num_rows}")
+        widths = {len(row) for row in self.rows}
+        if widths - {self.num_columns}:
+            problems.append(f"has rows of width {sorted(widths)}, expected {self.num_columns}")
+            return problems
+        if HAS_NUMPY:
+            invalid = np.flatnonzero(_VALID_LUT[self.chars] == 0)
+            unknown = {chr(self.chars[index]) for index in invalid}
+        else:
+            unknown = set(self.chars.translate(None, bytes(
+                char for char in range(256) if _VALID_TABLE[char])).decode('latin-1'))
+        if unknown:
+            problems.append(f"has unknown characters {sorted(unknown)}")
+        starts = self.find_player_starts()
+        if len(starts) != 1:
+            problems.append(f"has {len(starts)} player starts, expected 1")
+        if not self.find_doors():
+            problems.append("has no door")
+        return problems
+
+    def is_valid(self) -> bool:
+        return not self.problems()
+
+
+def _find_all(flat: bytes, code: int) -> Iterator[int]:
+    index = flat.find(code)
+    while index != -1:
+        yield index
+        index = flat.find(code, index + 1)
+
+
+def iter_level_arrays(filename: str) -> Iterator[LevelArrays]:
+    """ Reads a game file into LevelArrays without building Level objects.
+        Malformed levels are returned as they are; use problems() to check
+        them.
+
+    Parameters:
+        filename: The path to the game file
+
+    Returns:
+        An iterator over the levels in the file, in order
+
+    Raises:
+        LevelFormatError: If a maze header is malformed or a row comes before
+            the first header
+    """
+    with open(filename, 'r') as file:
+        for _, dimensions, rows in split_levels(file, filename):
+            yield LevelArrays(dimensions, [row for _, row in rows])
@@ -0,0 +1,206 @@
+""" Level packs and the on-disk cache of compiled levels for a game file.
+
+A level pack holds one opaque record per level (see Level.compile) behind an
+offset table, so a single level can be read from a memory-mapped pack without
+touching the others. The cache for a game file is a level pack keyed on the
+file's modification time, size and SHA-256 hash; a cache whose mtime no
+longer matches is still reused if the hash does.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from typing import Optional, Union
+
+CACHE_DIR = '__mazecache__'
+CACHE_SUFFIX = '.mzc'
+PACK_VERSION = 2
+
+_MAGIC = b'MZC\x00'
+_HEADER = struct.Struct('<4sHqQ32sI')
+_OFFSET = struct.Struct('<QI')
+
+
+class LevelPack():
+    """ A read-only sequence of compiled level records. """
+    def __init__(self, data: Union[bytes, mmap.mmap], count: int) -> None:
+        self._data = data
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        if not 0 <= index < self._count:
+            raise IndexError('level index out of range')
+        offset, length = _OFFSET.unpack_from(self._data, _HEADER.size + index * _OFFSET.size)
+        return self._data[offset:offset + length]
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    @classmethod
+    def from_records(cls, records: list[bytes]) -> 'LevelPack':
+        """ Builds an in-memory pack, for when a game file cannot be cached. """
+        return cls(_pack_bytes(records, 0, 0, bytes(32)), len(records))
+
+
+def cache_path(filename: str) -> str:
+    """ Returns the path of the cache file for the given game file. """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, CACHE_DIR, name + CACHE_SUFFIX)
+
+
+def is_pack(filename: str) -> bool:
+    """ Returns True if the file is a level pack rather than a text game file. """
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
+def open_pack(path: str) -> Optional[LevelPack]:
+    """ Memory-maps a level pack, or returns None if it is missing or invalid.
+
+    Parameters:
+        path: The path to the pack
+
+    Returns:
+        A LevelPack, or None
+    """
+    header = _open_mapped(path)
+    if header is None:
+        return None
+    data, _, _, _, count = header
+    return LevelPack(data, count)
+
+
+def open_cache(filename: str) -> Optional[LevelPack]:
+    """ Memory-maps the cached levels for a game file, or returns None if
+        there is no cache or it is out of date.
+
+    Parameters:
+        filename: The path to the game file
+
+    Returns:
+        A LevelPack, or None
+    """
+    path = cache_path(filename)
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    header = _open_mapped(path)
+    if header is None:
+        return None
+    data, mtime_ns, size, digest, count = header
+    if size != stat.st_size or (mtime_ns != stat.st_mtime_ns and digest != _file_digest(filename)):
+        data.close()
+        return None
+    if mtime_ns != stat.st_mtime_ns:
+        _touch(path, data, stat.st_mtime_ns)
+    return LevelPack(data, count)
+
+
+def read_cache(filename: str) -> Optional[list[bytes]]:
+    """ Returns the cached level records for a game file, or None if there is
+        no cache or it is out of date.
+
+    Parameters:
+        filename: The path to the game file
+
+    Returns:
+        A list of compiled level records, or None
+    """
+    pack = open_cache(filename)
+    if pack is None:
+        return None
+    records = [pack[index] for index in range(len(pack))]
+    pack.close()
+    return records
+
+
+def write_pack(path: str, records: list[bytes]) -> None:
+    """ Writes compiled level records to a standalone level pack.
+
+    Parameters:
+        path: The path to write the pack to
+        records: The compiled level records, in order
+    """
+    _write_atomic(path, _pack_bytes(records, 0, 0, bytes(32)))
+
+
+def write_cache(filename: str, records: list[bytes]) -> bool:
+    """ Writes compiled level records to the cache for a game file. Failing to
+        write the cache (e.g. a read-only directory) is not an error.
+
+    Parameters:
+        filename: The path to the game file
+        records: The compiled level records, in order
+
+    Returns:
+        True if the cache was written
+    """
+    try:
+        stat = os.stat(filename)
+        data = _pack_bytes(records, stat.st_mtime_ns, stat.st_size, _file_digest(filename))
+        _write_atomic(cache_path(filename), data)
+    except OSError:
+        return False
+    return True
+
+
+def _pack_bytes(records: list[bytes], mtime_ns: int, size: int, digest: bytes) -> bytes:
+    header = _HEADER.pack(_MAGIC, PACK_VERSION, mtime_ns, size, digest, len(records))
+    offset = len(header) + len(records) * _OFFSET.size
+    table = []
+    for record in records:
+        table.append(_OFFSET.pack(offset, len(record)))
+        offset += len(record)
+    return b''.join([header, *table, *records])
+
+
+def _open_mapped(path: str) -> Optional[tuple[mmap.mmap, int, int, bytes, int]]:
+    """ Maps a pack and checks its header and offset table fit in the file. """
+    try:
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) >= _HEADER.size:
+        magic, version, mtime_ns, size, digest, count = _HEADER.unpack_from(data)
+        if (magic == _MAGIC and version == PACK_VERSION
+                and _HEADER.size + count * _OFFSET.size <= len(data)):
+            return data, mtime_ns, size, digest, count
+    data.close()
+    return None
+
+
+def _file_digest(filename: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _touch(path: str, data: mmap.mmap, mtime_ns: int) -> None:
+    """ Rewrites a cache whose game file was touched but not changed. """
+    fields = list(_HEADER.unpack_from(data))
+    fields[2] = mtime_ns
+    try:
+        _write_atomic(path, _HEADER.pack(*fields) + data[_HEADER.size:])
+    except OSError:
+        pass
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
@@ -0,0 +1,244 @@
+""" Reachability and shortest paths over a Maze.
+
+Searches run directly on the maze's byte grid of tile codes, using
+Tile.is_blocking to decide which cells can be entered and Tile.damage to
+weight them. Positions are (row, column) tuples as elsewhere in the game.
+
+Distance fields are cached per maze and per source, and are thrown away when
+the maze's terrain changes (e.g. when its door unlocks). Reachability over a
+whole level is flooded cell by cell too and returned as a bitmask matching
+the masks of its LevelIndex.
+"""
+import heapq
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+
+from a2 import TILE_FLYWEIGHTS, WALL_CODE, LevelIndex, Maze
+
+UNREACHABLE = -1
+
+# Per tile code: whether it blocks movement, and the cost of stepping onto it.
+BLOCKING = bytes(tile.is_blocking() for tile in TILE_FLYWEIGHTS)
+STEP_COST = tuple(1 + tile.damage() for tile in TILE_FLYWEIGHTS)
+# Turns a grid of 0 and 1 bytes into the digits of a binary number.
+_DIGITS = bytes(range(256)).replace(b'\x00\x01', b'01')
+
+# How many distance fields to keep per maze.
+CACHE_SIZE = 16
+
+_cache = weakref.WeakKeyDictionary()
+
+
+def _neighbours(index: int, num_rows: int, num_cols: int) -> Iterable[int]:
+    column = index % num_cols
+    if index >= num_cols:
+        yield index - num_cols
+    if index < (num_rows - 1) * num_cols:
+        yield index + num_cols
+    if column > 0:
+        yield index - 1
+    if column < num_cols - 1:
+        yield index + 1
+
+
+def _index(maze: Maze, position: tuple[int, int]) -> int:
+    row, column = position
+    num_rows, num_cols = maze.get_dimensions()
+    if not (0 <= row < num_rows and 0 <= column < num_cols):
+        raise IndexError(f"position {position} is outside the maze")
+    return row * num_cols + column
+
+
+def distance_field(maze: Maze, source: tuple[int, int]) -> array:
+    """ Returns the number of moves from source to every cell, as a flat
+        row-major array. Unreachable cells hold UNREACHABLE. Blocking cells
+        next to a reachable cell (e.g. a locked door) get the distance of
+        the move onto them, but paths never pass through them.
+
+        Fields are cached until the maze's terrain changes, so they must not
+        be modified.
+
+    Parameters:
+        maze: The maze to search
+        source: The (row, column) to measure from
+
+    Returns:
+        An array of distances, indexed by row * #columns + column
+    """
+    start = _index(maze, source)
+    version, fields = _cache.get(maze, (None, None))
+    if version != maze.version:
+        fields = OrderedDict()
+        _cache[maze] = (maze.version, fields)
+    field = fields.get(start)
+    if field is not None:
+        fields.move_to_end(start)
+        return field
+
+    num_rows, num_cols = maze.get_dimensions()
+    tiles = maze.tiles
+    field = array('i', [UNREACHABLE]) * (num_rows * num_cols)
+    field[start] = 0
+    frontier = [start]
+    distance = 0
+    while frontier:
+        distance += 1
+        next_frontier = []
+        for index in frontier:
+            for neighbour in _neighbours(index, num_rows, num_cols):
+                if field[neighbour] == UNREACHABLE:
+                    field[neighbour] = distance
+                    if not BLOCKING[tiles[neighbour]]:
+                        next_frontier.append(neighbour)
+        frontier = next_frontier
+
+    fields[start] = field
+    if len(fields) > CACHE_SIZE:
+        fields.popitem(last=False)
+    return field
+
+
+def distance(maze: Maze, source: tuple[int, int], target: tuple[int, int]) -> Optional[int]:
+    """ Returns the fewest moves from source to target, or None if target
+        cannot be reached.
+    """
+    moves = distance_field(maze, source)[_index(maze, target)]
+    return None if moves == UNREACHABLE else moves
+
+
+def is_reachable(maze: Maze, source: tuple[int, int], target: tuple[int, int]) -> bool:
+    """ Returns True if the player could walk from source to target. A
+        blocking target such as a locked door counts as reachable if the
+        player can stand next to it.
+    """
+    return distance(maze, source, target) is not None
+
+
+def shortest_path(
+    maze: Maze,
+    source: tuple[int, int],
+    target: tuple[int, int],
+    weighted: bool = True
+) -> Optional[list[tuple[int, int]]]:
+    """ Finds a cheapest path with A*. Each move costs 1, plus the damage of
+        the tile moved onto when weighted, so paths avoid lava where they can.
+
+    Parameters:
+        maze: The maze to search
+        source: The (row, column) to start at
+        target: The (row, column) to reach; it may be blocking, e.g. a door
+        weighted: Whether to add tile damage to the cost of each move
+
+    Returns:
+        The positions from source to target inclusive, or None if there is
+        no path
+    """
+    start = _index(maze, source)
+    goal = _index(maze, target)
+    num_rows, num_cols = maze.get_dimensions()
+    goal_row, goal_col = divmod(goal, num_cols)
+    tiles = maze.tiles
+
+    cost = {start: 0}
+    parent = {start: start}
+    # Ties on the estimate go to the entry that has travelled furthest.
+    heap = [(0, 0, start)]
+    while heap:
+        _, spent, index = heapq.heappop(heap)
+        spent = -spent
+        if index == goal:
+            return _walk_back(parent, goal, num_cols)
+        if spent > cost[index] or (index != start and BLOCKING[tiles[index]]):
+            continue
+        for neighbour in _neighbours(index, num_rows, num_cols):
+            code = tiles[neighbour]
+            if BLOCKING[code] and neighbour != goal:
+                continue
+            new_cost = spent + (STEP_COST[code] if weighted else 1)
+            if new_cost < cost.get(neighbour, new_cost + 1):
+                cost[neighbour] = new_cost
+                parent[neighbour] = index
+                row, column = divmod(neighbour, num_cols)
+                estimate = new_cost + abs(row - goal_row) + abs(column - goal_col)
+                heapq.heappush(heap, (estimate, -new_cost, neighbour))
+    return None
+
+
+def path_to_nearest(
+    maze: Maze,
+    source: tuple[int, int],
+    targets: Iterable[tuple[int, int]]
+) -> Optional[list[tuple[int, int]]]:
+    """ Finds a path with the fewest moves to the closest of several targets,
+        e.g. the next coin to collect.
+
+    Parameters:
+        maze: The maze to search
+        source: The (row, column) to start at
+        targets: The positions that would do
+
+    Returns:
+        The positions from source to the closest target inclusive, or None
+        if none can be reached
+    """
+    start = _index(maze, source)
+    goals = {_index(maze, target) for target in targets}
+    num_rows, num_cols = maze.get_dimensions()
+    tiles = maze.tiles
+    parent = {start: start}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for index in frontier:
+            if index in goals:
+                return _walk_back(parent, index, num_cols)
+            if index != start and BLOCKING[tiles[index]]:
+                continue
+            for neighbour in _neighbours(index, num_rows, num_cols):
+                if neighbour not in parent:
+                    if BLOCKING[tiles[neighbour]] and neighbour not in goals:
+                        continue
+                    parent[neighbour] = index
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return None
+
+
+def reachable_cells(index: LevelIndex, source: tuple[int, int]) -> int:
+    """ Returns the cells the player could walk to from source, as a bitmask
+        with bit row * #columns + column set for each. Locked doors next to a
+        reached cell are included, as is_reachable counts them, but the
+        flood never passes through them.
+
+    Parameters:
+        index: The index of the level to search
+        source: The (row, column) to start at
+    """
+    num_rows, num_cols = index.num_rows, index.num_columns
+    row, column = source
+    if not (0 <= row < num_rows and 0 <= column < num_cols):
+        raise IndexError(f"position {source} is outside the maze")
+    tiles = index.level.get_maze().tiles
+    start = row * num_cols + column
+    reached = bytearray(num_rows * num_cols)
+    reached[start] = 1
+    frontier = deque([start])
+    while frontier:
+        for neighbour in _neighbours(frontier.popleft(), num_rows, num_cols):
+            code = tiles[neighbour]
+            if not reached[neighbour] and code != WALL_CODE:
+                reached[neighbour] = 1
+                if not BLOCKING[code]:
+                    frontier.append(neighbour)
+    return int(reached.translate(_DIGITS)[::-1], 2)
+
+
+def _walk_back(parent: dict[int, int], index: int, num_cols: int) -> list[tuple[int, int]]:
+    path = [divmod(index, num_cols)]
+    while parent[index] != index:
+        index = parent[index]
+        path.append(divmod(index, num_cols))
+    path.reverse()
+    return path
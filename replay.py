@@ -0,0 +1,209 @@
+""" Replays recorded MazeRunner transcripts and checks the output matches.
+
+A transcript is the text of an interactive session: it starts with
+"Enter game file: <path>" and each move the player typed follows an
+"Enter a move: " prompt. Each transcript is replayed against its game file
+and the output is compared frame by frame, where a frame is everything
+printed between two prompts. Transcripts are spread over a process pool.
+
+Usage: python replay.py [-j JOBS] [--games-dir DIR] TRANSCRIPT...
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from a2 import MazeRunner
+from a2_support import TextInterface
+
+GAME_FILE_PROMPT = 'Enter game file: '
+MOVE_PROMPT = 'Enter a move: '
+
+
+class Transcript(NamedTuple):
+    """ The parts of a transcript needed to replay it. """
+    path: str
+    game_file: str
+    moves: list[str]
+    text: str
+
+
+class ReplayResult(NamedTuple):
+    """ The outcome of replaying one transcript. """
+    path: str
+    passed: bool
+    frames: int
+    mismatch: Optional[int]
+    detail: str
+
+
+def parse_transcript(path: str) -> Transcript:
+    """ Reads a transcript and extracts the game file and the moves entered.
+
+    Parameters:
+        path: The path to the transcript
+
+    Returns:
+        Transcript
+    """
+    with open(path, 'r') as file:
+        text = file.read()
+    lines = text.rstrip('\n').split('\n')
+    if not lines[0].startswith(GAME_FILE_PROMPT):
+        raise ValueError(f"{path}:1: expected {GAME_FILE_PROMPT!r}")
+    game_file = lines[0][len(GAME_FILE_PROMPT):]
+
+    moves = []
+    for number, line in enumerate(lines):
+        if line.startswith(MOVE_PROMPT):
+            # A prompt on the last line was never answered: the session ended.
+            if number == len(lines) - 1 and line == MOVE_PROMPT:
+                break
+            moves.append(line[len(MOVE_PROMPT):])
+    return Transcript(path, game_file, moves, text)
+
+
+def resolve_game_file(transcript: Transcript, games_dir: Optional[str] = None) -> str:
+    """ Finds the game file a transcript was recorded against. The recorded
+        path is tried as is, relative to the transcript, and by file name in
+        games_dir and the transcript's directory.
+
+    Parameters:
+        transcript: The parsed transcript
+        games_dir: An extra directory to look for game files in
+
+    Returns:
+        The path to the game file
+    """
+    here = os.path.dirname(os.path.abspath(transcript.path))
+    name = os.path.basename(transcript.game_file)
+    candidates = [transcript.game_file, os.path.join(here, transcript.game_file)]
+    if games_dir is not None:
+        candidates.append(os.path.join(games_dir, name))
+    candidates.append(os.path.join(here, name))
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(f"{transcript.path}: game file {transcript.game_file!r} not found")
+
+
+def run_transcript(transcript: Transcript, game_file: str) -> str:
+    """ Plays the transcript's moves through a MazeRunner and returns
+        everything it printed, laid out as the transcript would show it.
+
+    Parameters:
+        transcript: The parsed transcript
+        game_file: The path to the game file to play
+
+    Returns:
+        The output of the session
+    """
+    out = io.StringIO()
+    moves = iter(transcript.moves)
+
+    def read_input(prompt: str) -> str:
+        out.write(prompt)
+        move = next(moves, None)
+        if move is None:
+            raise EOFError
+        out.write(move + '\n')
+        return move
+
+    out.write(GAME_FILE_PROMPT + transcript.game_file + '\n')
+    with contextlib.redirect_stdout(out):
+        try:
+            MazeRunner(game_file, TextInterface(), read_input).play()
+        except (EOFError, SystemExit):
+            pass
+    return out.getvalue()
+
+
+def split_frames(text: str) -> list[str]:
+    """ Splits session output into the frames shown between prompts. """
+    return text.rstrip('\n').split(MOVE_PROMPT)
+
+
+def replay(path: str, games_dir: Optional[str] = None) -> ReplayResult:
+    """ Replays one transcript and compares its output frame by frame.
+
+    Parameters:
+        path: The path to the transcript
+        games_dir: An extra directory to look for game files in
+
+    Returns:
+        ReplayResult
+    """
+    try:
+        transcript = parse_transcript(path)
+        output = run_transcript(transcript, resolve_game_file(transcript, games_dir))
+    except Exception as error:
+        return ReplayResult(path, False, 0, None, f"{type(error).__name__}: {error}")
+
+    expected = split_frames(transcript.text)
+    actual = split_frames(output)
+    for index in range(max(len(expected), len(actual))):
+        want = expected[index] if index < len(expected) else ''
+        got = actual[index] if index < len(actual) else ''
+        if want != got:
+            diff = difflib.unified_diff(want.splitlines(), got.splitlines(),
+                                        'expected', 'replayed', lineterm='')
+            return ReplayResult(path, False, len(expected), index, '\n'.join(diff))
+    return ReplayResult(path, True, len(expected), None, '')
+
+
+def _replay_star(args: tuple[str, Optional[str]]) -> ReplayResult:
+    return replay(*args)
+
+
+def replay_all(paths: Iterable[str], games_dir: Optional[str] = None,
+               jobs: Optional[int] = None) -> list[ReplayResult]:
+    """ Replays many transcripts across a process pool.
+
+    Parameters:
+        paths: The transcripts to replay
+        games_dir: An extra directory to look for game files in
+        jobs: The number of worker processes; defaults to the CPU count
+
+    Returns:
+        The results, in the same order as paths
+    """
+    work = [(path, games_dir) for path in paths]
+    if jobs == 1 or len(work) <= 1:
+        return [_replay_star(args) for args in work]
+    chunksize = max(1, len(work) // ((jobs or os.cpu_count() or 1) * 4))
+    with multiprocessing.Pool(jobs) as pool:
+        return pool.map(_replay_star, work, chunksize)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay MazeRunner transcripts.')
+    parser.add_argument('transcripts', nargs='+')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--games-dir', default=None,
+                        help='directory to look for game files in')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = replay_all(args.transcripts, args.games_dir, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if not result.passed]
+    for result in failed:
+        where = f" at frame {result.mismatch}" if result.mismatch is not None else ''
+        print(f"FAIL {result.path}{where}")
+        if result.detail:
+            print(result.detail)
+    frames = sum(result.frames for result in results)
+    print(f"{len(results) - len(failed)} passed, {len(failed)} failed, "
+          f"{frames} frames in {elapsed:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
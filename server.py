@@ -0,0 +1,254 @@
+""" Serves MazeRunner games to many players from one process.
+
+Each connection plays one session through an AsyncMazeRunner. Sessions share
+the levels of each game file as read-only templates and only keep their own
+Model: the player and copy-on-write instances of the levels being played,
+which hold just the changes made to them.
+
+A client first answers "Enter game file: " with the name of a game in the
+games directory, or with "resume <session id>" to carry on a session whose
+connection was lost. The server replies "Session <id>", then the game runs as
+it would in a terminal. Sessions that are not connected are evicted, least
+recently used first, once there are more than max_sessions or after
+idle_timeout seconds.
+
+Usage: python server.py GAMES_DIR [--host HOST] [--port PORT | --unix PATH]
+                        [--max-sessions N] [--idle-timeout SECONDS]
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import socket
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+from a2 import LevelTemplates
+from a2_support import TextInterface
+from async_runner import ENDED, AsyncMazeRunner, StreamSource
+
+GAME_FILE_PROMPT = 'Enter game file: '
+RESUME_COMMAND = 'resume '
+UNKNOWN_GAME_MESSAGE = 'Unknown game'
+UNKNOWN_SESSION_MESSAGE = 'Unknown session'
+SESSION_IN_USE_MESSAGE = 'Session already connected'
+
+
+class Session():
+    """ One player's game, which outlives the connection playing it. """
+    def __init__(self, session_id: str, runner: AsyncMazeRunner) -> None:
+        self.id = session_id
+        self.runner = runner
+        self.connected = False
+        self.last_used = time.monotonic()
+
+
+class SessionPool():
+    """ The open sessions, in least recently used order, and the level
+        templates they share.
+    """
+    def __init__(self, games_dir: str, max_sessions: int = 10000,
+                 idle_timeout: Optional[float] = None) -> None:
+        self.games_dir = games_dir
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.templates = dict()
+
+    def game_path(self, name: str) -> Optional[str]:
+        """ Returns the path of a game in the games directory, or None if
+            there is no such game. Only plain file names are accepted.
+        """
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            return None
+        path = os.path.join(self.games_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def _templates(self, path: str) -> LevelTemplates:
+        templates = self.templates.get(path)
+        if templates is None:
+            templates = LevelTemplates.open(path)
+            self.templates[path] = templates
+        return templates
+
+    def create(self, path: str) -> Session:
+        """ Starts a new session on the game at path, evicting idle sessions
+            if the pool is full.
+        """
+        levels = self._templates(path).levels()
+        runner = AsyncMazeRunner(path, TextInterface(), None, levels=levels)
+        session = Session(secrets.token_hex(8), runner)
+        self.sessions[session.id] = session
+        self.evict(keep=session)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """ Returns a session by id, marking it as the most recently used. """
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.touch(session)
+        return session
+
+    def touch(self, session: Session) -> None:
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session.id)
+
+    def remove(self, session: Session) -> None:
+        self.sessions.pop(session.id, None)
+
+    def evict(self, now: Optional[float] = None, keep: Optional[Session] = None) -> list[Session]:
+        """ Drops disconnected sessions other than keep, least recently used
+            first, while there are more than max_sessions, and any that have
+            been idle longer than idle_timeout.
+
+        Returns:
+            The evicted sessions
+        """
+        now = time.monotonic() if now is None else now
+        excess = len(self.sessions) - self.max_sessions
+        evicted = []
+        for session in list(self.sessions.values()):
+            if session.connected or session is keep:
+                continue
+            idle = self.idle_timeout is not None and now - session.last_used > self.idle_timeout
+            if excess > 0 or idle:
+                evicted.append(session)
+                excess -= 1
+            elif excess <= 0:
+                # Sessions are in LRU order, so no later one can be idle longer.
+                break
+        for session in evicted:
+            self.remove(session)
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class GameServer():
+    """ Accepts connections and plays a session over each one. """
+    def __init__(self, pool: SessionPool) -> None:
+        self.pool = pool
+        self.server = None
+        self._reaper = None
+        # The loop only keeps weak references to tasks, so local sessions are
+        # held here until they finish.
+        self._tasks = set()
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        source = StreamSource(reader, writer)
+        try:
+            answer = await source.read_move(GAME_FILE_PROMPT)
+            session = self._open_session(answer)
+            if isinstance(session, str):
+                await source.write(session + '\n')
+                return
+            session.connected = True
+            try:
+                await source.write(f"Session {session.id}\n")
+                session.runner.source = source
+                result = await session.runner.run()
+            finally:
+                session.connected = False
+                self.pool.touch(session)
+            if result.outcome != ENDED:
+                self.pool.remove(session)
+        except ConnectionError:
+            pass
+        finally:
+            await source.close()
+
+    def _open_session(self, answer: Optional[str]) -> Union[Session, str]:
+        """ Returns the session a client asked for, or why it cannot have it. """
+        if answer is None:
+            return UNKNOWN_GAME_MESSAGE
+        if answer.startswith(RESUME_COMMAND):
+            session = self.pool.get(answer[len(RESUME_COMMAND):].strip())
+            if session is None:
+                return UNKNOWN_SESSION_MESSAGE
+            if session.connected:
+                return SESSION_IN_USE_MESSAGE
+            return session
+        path = self.pool.game_path(answer.strip())
+        if path is None:
+            return UNKNOWN_GAME_MESSAGE
+        try:
+            return self.pool.create(path)
+        except (ValueError, IndexError):
+            # A LevelFormatError (a ValueError) for a file that is not a
+            # game, or an IndexError for one without any levels.
+            return UNKNOWN_GAME_MESSAGE
+
+    async def connect_local(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """ Connects a client through a socket pair instead of the network,
+            e.g. for tests. The server does not need to be listening.
+
+        Returns:
+            The client's (reader, writer)
+        """
+        client, served = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=served)
+        task = asyncio.get_running_loop().create_task(self.handle_client(reader, writer))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return await asyncio.open_connection(sock=client)
+
+    async def start(self, host: Optional[str] = None, port: int = 0,
+                    unix_path: Optional[str] = None) -> None:
+        """ Starts listening on a TCP port, or on a Unix socket if unix_path
+            is given, and starts evicting idle sessions in the background.
+        """
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        if self.pool.idle_timeout is not None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(self.pool.idle_timeout / 2)
+            self.pool.evict()
+
+    async def serve_forever(self) -> None:
+        await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Serve MazeRunner games over a socket.')
+    parser.add_argument('games_dir')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7878)
+    parser.add_argument('--unix', default=None, help='listen on a Unix socket instead')
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--idle-timeout', type=float, default=1800.0)
+    args = parser.parse_args(argv)
+
+    async def serve() -> None:
+        server = GameServer(SessionPool(args.games_dir, args.max_sessions, args.idle_timeout))
+        await server.start(args.host, args.port, args.unix)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,421 @@
+""" Finds the shortest way through a level, or shows that there is none.
+
+The search follows the rules in Model.move_player: every move costs 1 HP plus
+the damage of the tile moved onto, hunger and thirst rise every 5 moves,
+every coin must be collected before the door opens, and the level ends with
+one more command after stepping onto the open door.
+
+Items only ever help, and their effects only run into a limit (full HP, zero
+hunger or thirst) if used early. So the solver holds on to items and uses
+them only when the next move would otherwise lose the game. That means the
+inventory can be folded into three budgets: how much damage the player can
+still take, and how many more moves they can make before hunger or thirst
+would reach its limit. Those move budgets also account for the move streak.
+
+States are searched with A*. The moves left are estimated from cached
+distance fields as the moves to the nearest remaining coin, plus a minimum
+spanning tree over the remaining coins, plus the moves from the coin nearest
+the door to the door. Only the position and coins collected identify a
+state: a state is dropped if another one there took no more moves and has
+budgets at least as large, whichever other items each picked up. That is
+only certain to lose nothing if the other state's budgets stay as large
+after taking off what the items only it picked up gave it, as the dropped
+state could still pick those up. Checking that exactly keeps far too many
+states on large levels, so states are dropped either way at first. A search
+that dropped any without the exact check cannot prove a level unsolvable, so
+if it finds no route the level is searched again as if the player held every
+item from the start, which proves there is no route if that finds none
+either. Otherwise it is searched once more with only exact drops, which
+finds a route, proves there is none or gives up after EXACT_MAX_STATES. A
+route found by the first search may not be the shortest.
+
+Usage: python solver.py GAME_FILE...
+"""
+import heapq
+import sys
+from typing import NamedTuple, Optional
+
+from a2 import DOOR_CODE, TILE_FLYWEIGHTS, Level, Model, load_game
+from constants import *
+from pathfinding import BLOCKING, distance_field, reachable_cells
+
+# Moves made before hunger and thirst rise.
+STREAK_LENGTH = 5
+MAX_STATES = 2_000_000
+# The exact search keeps far more states, so it gets a smaller share.
+EXACT_MAX_STATES = 100_000
+
+_DIRECTIONS = tuple(MOVE_DELTAS.items())
+_DAMAGE = tuple(1 + tile.damage() for tile in TILE_FLYWEIGHTS)
+
+
+class PlayerState(NamedTuple):
+    """ The player's stats and usable items at the start of a level. """
+    hp: int = MAX_HEALTH
+    hunger: int = 0
+    thirst: int = 0
+    move_streak: int = 0
+    potions: int = 0
+    apples: int = 0
+    honey: int = 0
+    water: int = 0
+
+
+class Solution(NamedTuple):
+    """ The result of solving a level.
+
+    solvable is True with the commands to win, False if the level cannot be
+    won, or None if the search gave up after max_states or could not rule
+    out every route. reason says why, or for a solution why it may not be
+    the shortest.
+    """
+    solvable: Optional[bool]
+    commands: list[str]
+    moves: int
+    reason: str
+    states: int
+    end_state: Optional[PlayerState]
+
+
+def _budgets(state: PlayerState) -> tuple[int, int, int]:
+    """ Returns the damage the player can take and the moves they can make
+        before hunger and before thirst reach their limits, items included.
+    """
+    streak = state.move_streak % STREAK_LENGTH
+    hunger = MAX_HUNGER - 1 - state.hunger - APPLE_AMOUNT * state.apples - HONEY_AMOUNT * state.honey
+    thirst = MAX_THIRST - 1 - state.thirst - WATER_AMOUNT * state.water
+    return (state.hp + POTION_AMOUNT * state.potions,
+            STREAK_LENGTH * (hunger + 1) - 1 - streak,
+            STREAK_LENGTH * (thirst + 1) - 1 - streak)
+
+
+def _item_budget(item_id: str) -> tuple[int, int, int]:
+    """ Returns how much collecting an item adds to each budget. """
+    return {POTION: (POTION_AMOUNT, 0, 0), APPLE: (0, -STREAK_LENGTH * APPLE_AMOUNT, 0),
+            HONEY: (0, -STREAK_LENGTH * HONEY_AMOUNT, 0),
+            WATER: (0, 0, -STREAK_LENGTH * WATER_AMOUNT)}.get(item_id, (0, 0, 0))
+
+
+def _dominated(frontier: list[tuple[int, int, int, int, int]],
+               entry: tuple[int, int, int, int, int],
+               gains: list[tuple[int, int, int]]) -> Optional[bool]:
+    """ Compares entry with each (moves, damage, hunger, thirst, items
+        picked up) in the frontier that took no more moves and has budgets
+        at least as large.
+
+    Parameters:
+        frontier: The entries kept for a position and coins collected
+        entry: The entry to compare
+        gains: What each item picked up adds to the budgets, by bit
+
+    Returns:
+        True if one of them is still as good when the items only it picked
+        up are taken off its budgets, None if one is only as good otherwise,
+        and False if there is none
+    """
+    moves, damage, hunger, thirst, picked = entry
+    dominated = False
+    for other in frontier:
+        if (other[0] <= moves and other[1] >= damage and other[2] >= hunger
+                and other[3] >= thirst):
+            budgets = [other[1], other[2], other[3]]
+            extra = other[4] & ~picked
+            while extra:
+                low = extra & -extra
+                gain = gains[low.bit_length() - 1]
+                budgets = [budget - more for budget, more in zip(budgets, gain)]
+                extra ^= low
+            if budgets[0] >= damage and budgets[1] >= hunger and budgets[2] >= thirst:
+                return True
+            dominated = None
+    return dominated
+
+
+def solve_level(level: Level, start: PlayerState = PlayerState(),
+                max_states: int = MAX_STATES) -> Solution:
+    """ Finds a way through the level with the fewest moves.
+
+    Parameters:
+        level: A level that has not been played yet
+        start: The player's stats and items on entering the level
+        max_states: How many search states to try before giving up, at
+                    most EXACT_MAX_STATES of them in an exact search
+
+    Returns:
+        Solution
+    """
+    solution, inexact = _search(level, start, max_states)
+    if solution.solvable is not False or not inexact:
+        return solution
+    states = solution.states
+    relaxed, _ = _search(level, start, max_states, relaxed=True)
+    states += relaxed.states
+    if relaxed.solvable is False:
+        return relaxed._replace(states=states)
+    solution, _ = _search(level, start, min(max_states, EXACT_MAX_STATES), exact=True)
+    return solution._replace(states=states + solution.states)
+
+
+def _search(level: Level, start: PlayerState, max_states: int, exact: bool = False,
+            relaxed: bool = False) -> tuple[Solution, bool]:
+    """ Searches the level with A*.
+
+    Parameters:
+        level: A level that has not been played yet
+        start: The player's stats and items on entering the level
+        max_states: How many search states to try before giving up
+        exact: Whether to only drop states that are certainly no better
+        relaxed: Whether to give the player every item in the level at the
+                 start instead, which can only show the level is unsolvable
+
+    Returns:
+        The Solution, and whether states were dropped without the exact check
+    """
+    maze = level.get_maze()
+    level_index = level.get_index()
+    position, door = level_index.start, level_index.door
+    if position is None:
+        return Solution(False, [], 0, "the level has no player start", 0, None), False
+    if door is None:
+        return Solution(False, [], 0, "the level has no door", 0, None), False
+    num_rows, num_cols = maze.get_dimensions()
+    tiles = maze.tiles
+    start_index = position[0] * num_cols + position[1]
+    door_index = door[0] * num_cols + door[1]
+    reachable = reachable_cells(level_index, position)
+    if not reachable >> door_index & 1:
+        return Solution(False, [], 0, f"the door at {door} cannot be reached", 0, None), False
+
+    # Coins get a bit in what identifies a state; other items get a bit only
+    # so that each is picked up once.
+    coin_bits, item_bits, item_gain, coin_fields, gains = {}, {}, {}, [], []
+    bonus = [0, 0, 0]
+    for item_id in (COIN, POTION, APPLE, HONEY, WATER):
+        for item_position in sorted(level_index.item_positions(item_id)):
+            index = item_position[0] * num_cols + item_position[1]
+            if not reachable >> index & 1:
+                name = level.get_items()[item_position].get_name()
+                return Solution(False, [], 0,
+                                f"the {name} at {item_position} cannot be reached", 0, None), False
+            if item_id == COIN:
+                coin_bits[index] = 1 << len(coin_fields)
+                # Held here too, as pathfinding only caches a few fields per maze.
+                coin_fields.append(distance_field(maze, item_position))
+            elif relaxed:
+                bonus = [budget + gain for budget, gain in zip(bonus, _item_budget(item_id))]
+            else:
+                item_bits[index] = 1 << len(item_bits)
+                item_gain[index] = _item_budget(item_id)
+                gains.append(item_gain[index])
+    door_field = distance_field(maze, door)
+    coins = (1 << len(coin_fields)) - 1
+    coin_cells = list(coin_bits)
+    spans, estimates = {}, {}
+
+    def span(remaining: int) -> int:
+        """ Returns the weight of a minimum spanning tree over the remaining
+            coins, which no route through all of them can be shorter than.
+        """
+        weight = spans.get(remaining)
+        if weight is None:
+            left = [bit for bit in range(len(coin_cells)) if remaining >> bit & 1]
+            weight = 0
+            if left:
+                closest = {bit: coin_fields[left[0]][coin_cells[bit]] for bit in left[1:]}
+                while closest:
+                    bit = min(closest, key=closest.get)
+                    weight += closest.pop(bit)
+                    field = coin_fields[bit]
+                    for other in closest:
+                        closest[other] = min(closest[other], field[coin_cells[other]])
+            spans[remaining] = weight
+        return weight
+
+    def estimate(index: int, collected: int) -> int:
+        """ Returns a lower bound on the moves from a cell to the open door:
+            to the nearest remaining coin, through the rest of them and from
+            the last one to the door.
+        """
+        key = (index, collected)
+        moves = estimates.get(key)
+        if moves is None:
+            remaining = coins & ~collected
+            if remaining:
+                fields = [coin_fields[bit] for bit in range(len(coin_fields)) if remaining >> bit & 1]
+                moves = (min(field[index] for field in fields) + span(remaining)
+                         + min(field[door_index] for field in fields))
+            else:
+                moves = door_field[index]
+            estimates[key] = moves
+        return moves
+
+    # Each state is (cell index, coins collected, budgets, other items
+    # picked up); the first two identify it.
+    first = (start_index, 0, tuple(budget + more for budget, more in zip(_budgets(start), bonus)), 0)
+    parent = {first: None}
+    seen = {first[:2]: [(0, *first[2], 0)]}
+    # Whether a state was dropped that the exact check would have kept.
+    inexact = False
+    heap = [(estimate(start_index, 0), 0, first)]
+    while heap:
+        _, moves, state = heapq.heappop(heap)
+        index, collected, (damage, hunger, thirst), picked = state
+        row, column = divmod(index, num_cols)
+        moves += 1
+        for key, (d_row, d_col) in _DIRECTIONS:
+            new_row, new_col = row + d_row, column + d_col
+            if not (0 <= new_row < num_rows and 0 <= new_col < num_cols):
+                continue
+            target = new_row * num_cols + new_col
+            code = tiles[target]
+            if BLOCKING[code] and not (code == DOOR_CODE and collected == coins):
+                continue
+
+            budgets = (damage - _DAMAGE[code], hunger - 1, thirst - 1)
+            if budgets[0] <= 0 or budgets[1] < 0 or budgets[2] < 0:
+                continue
+            new_collected = collected | coin_bits.get(target, 0)
+            new_picked = picked
+            bit = item_bits.get(target, 0)
+            if bit and not picked & bit:
+                new_picked |= bit
+                gain = item_gain[target]
+                budgets = (budgets[0] + gain[0], budgets[1] + gain[1], budgets[2] + gain[2])
+
+            new_state = (target, new_collected, budgets, new_picked)
+            entry = (moves, *budgets, new_picked)
+            frontier = seen.setdefault(new_state[:2], [])
+            dominated = _dominated(frontier, entry, gains)
+            if dominated is None and not exact:
+                inexact = True
+                continue
+            if dominated:
+                continue
+            frontier[:] = [other for other in frontier
+                           if not (moves <= other[0] and budgets[0] >= other[1]
+                                   and budgets[1] >= other[2] and budgets[2] >= other[3])]
+            frontier.append(entry)
+            parent[new_state] = (state, key)
+            # The estimate never drops by more than one per move, so the first
+            # state to reach the door has taken the fewest moves.
+            if target == door_index:
+                reason = "other routes were dropped inexactly, so it may not be the shortest" \
+                    if inexact else ''
+                return _solution(level, start, parent, new_state, len(parent), reason), inexact
+            heapq.heappush(heap, (moves + estimate(target, new_collected), moves, new_state))
+            if len(parent) > max_states:
+                return Solution(None, [], 0, f"gave up after {max_states} states",
+                                len(parent), None), inexact
+    reason = "every route runs out of health, food or water"
+    if relaxed:
+        reason += ", even with every item in the level"
+    return Solution(False, [], 0, reason, len(parent), None), inexact
+
+
+def _solution(level: Level, start: PlayerState, parent: dict, state: tuple,
+              states: int, reason: str) -> Solution:
+    """ Turns the winning state into commands, adding item uses just before
+        the moves that need them.
+    """
+    keys = []
+    while parent[state] is not None:
+        state, key = parent[state]
+        keys.append(key)
+    keys.reverse()
+
+    maze = level.get_maze()
+    items = dict(level.get_items())
+    hp, hunger, thirst, streak = start.hp, start.hunger, start.thirst, start.move_streak
+    held = {'Potion': start.potions, 'Apple': start.apples, 'Honey': start.honey, 'Water': start.water}
+    commands = []
+
+    def use(name: str) -> None:
+        held[name] -= 1
+        commands.append(f"i {name}")
+
+    row, column = level.get_player_start()
+    for key in keys:
+        d_row, d_col = MOVE_DELTAS[key]
+        row, column = row + d_row, column + d_col
+        rises = (streak + 1) % STREAK_LENGTH == 0
+        while hp - 1 - maze.get_tile((row, column)).damage() <= 0:
+            use('Potion')
+            hp = min(hp + POTION_AMOUNT, MAX_HEALTH)
+        while rises and hunger + 1 >= MAX_HUNGER:
+            food = 'Honey' if held['Honey'] else 'Apple'
+            use(food)
+            hunger = max(hunger + (HONEY_AMOUNT if food == 'Honey' else APPLE_AMOUNT), 0)
+        while rises and thirst + 1 >= MAX_THIRST:
+            use('Water')
+            thirst = max(thirst + WATER_AMOUNT, 0)
+
+        commands.append(key)
+        item = items.pop((row, column), None)
+        if item is not None and item.get_name() in held:
+            held[item.get_name()] += 1
+        streak = (streak + 1) % STREAK_LENGTH
+        if streak == 0:
+            hunger, thirst = hunger + 1, thirst + 1
+        hp -= 1 + maze.get_tile((row, column)).damage()
+
+    # One more command on the open door moves on to the next level.
+    commands.append(keys[-1])
+    end = PlayerState(hp, hunger, thirst, streak, held['Potion'], held['Apple'],
+                      held['Honey'], held['Water'])
+    return Solution(True, commands, len(keys), reason, states, end)
+
+
+def solve_game(filename: str, max_states: int = MAX_STATES) -> list[Solution]:
+    """ Solves each level of a game file in turn, carrying the player's stats
+        and items from one level's solution into the next. Stops at the first
+        level that cannot be solved.
+
+        This is not an exact search of the whole game: each level is solved
+        on its own, and a slower route through an earlier level could save
+        enough for a later one. So a later level whose door and items can
+        be reached, but which cannot be won after the earlier routes, is
+        reported as undecided (solvable None) rather than unsolvable.
+
+    Parameters:
+        filename: The path to the game file
+        max_states: How many search states to try per level before giving up
+
+    Returns:
+        A Solution for each level that was attempted
+    """
+    solutions = []
+    state = PlayerState()
+    for level in load_game(filename):
+        solution = solve_level(level, state, max_states)
+        if solution.solvable is False and solutions and solution.states:
+            solution = solution._replace(
+                solvable=None, reason=solution.reason + " after the routes through earlier levels")
+        solutions.append(solution)
+        if not solution.solvable:
+            break
+        state = solution.end_state
+    return solutions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    failed = False
+    for filename in (argv if argv is not None else sys.argv[1:]):
+        solutions = solve_game(filename)
+        for number, solution in enumerate(solutions, start=1):
+            if solution.solvable:
+                print(f"{filename}: maze {number}: solved in {solution.moves} moves "
+                      f"({solution.states} states)")
+            else:
+                print(f"{filename}: maze {number}: {solution.reason}")
+        if all(solution.solvable for solution in solutions):
+            commands = [command for solution in solutions for command in solution.commands]
+            if not Model(filename).simulate(commands).won:
+                print(f"{filename}: solution did not win when replayed")
+                failed = True
+        else:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+""" Tests for playing games on an asyncio event loop with async_runner.py. """
+import asyncio
+import unittest
+
+from a2_support import TextInterface
+from async_runner import (ENDED, LOST, MOVE_PROMPT, WON, AsyncMazeRunner, QueueSource,
+                          ReplaySource, run_games)
+from constants import WIN_MESSAGE
+from replay import parse_transcript, resolve_game_file
+
+GAME1_MOVES = list('ddwwdd' + 'w' + 'dddddd' + 'ss' + 'aaaaa' + 'ss' + 'ddddd' + 's' + 's')
+
+
+class AsyncRunnerTest(unittest.TestCase):
+    def test_transcripts(self) -> None:
+        for path in ['item_use.txt', 'simple_game.txt', 'game_loss_hunger_and_thirst.txt']:
+            source = ReplaySource.from_transcript(path)
+            runner = AsyncMazeRunner(resolve_game_file(parse_transcript(path)), TextInterface(), source)
+            asyncio.run(runner.run())
+            with open(path) as file:
+                self.assertEqual(source.getvalue().rstrip('\n'), file.read().rstrip('\n'), path)
+
+    def test_games_run_concurrently(self) -> None:
+        runners = [AsyncMazeRunner('game1.txt', TextInterface(), ReplaySource(GAME1_MOVES)),
+                   AsyncMazeRunner('game1.txt', TextInterface(), ReplaySource(['d', 'x', 'd'])),
+                   AsyncMazeRunner('game1.txt', TextInterface(), ReplaySource('da' * 100))]
+        results = asyncio.run(run_games(runners))
+        self.assertEqual(results[0], (WON, 2, (73, 5, 5), len(GAME1_MOVES)))
+        self.assertTrue(runners[0].source.getvalue().endswith(WIN_MESSAGE + '\n'))
+        # An unrecognised move does not take a turn.
+        self.assertEqual(results[1], (ENDED, 0, (98, 0, 0), 2))
+        self.assertEqual(results[2].outcome, LOST)
+
+    def test_queue_source_carries_on_the_same_game(self) -> None:
+        async def play(runner: AsyncMazeRunner, moves: list[str]) -> tuple[object, list[str]]:
+            for move in moves + [None]:
+                runner.source.moves.put_nowait(move)
+            result = await runner.run()
+            output = []
+            while not runner.source.output.empty():
+                output.append(runner.source.output.get_nowait())
+            return result, output
+
+        async def main() -> None:
+            runner = AsyncMazeRunner('game1.txt', TextInterface(),
+                                     QueueSource(asyncio.Queue(), asyncio.Queue()))
+            result, output = await play(runner, ['d', 'd'])
+            self.assertEqual(result, (ENDED, 0, (98, 0, 0), 2))
+            self.assertEqual(output.count(MOVE_PROMPT), 3)
+            result, _ = await play(runner, ['w'])
+            self.assertEqual(result, (ENDED, 0, (97, 0, 0), 3))
+
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+""" Tests for benchmark.py, run on small mazes. """
+import contextlib
+import io
+import unittest
+
+from benchmark import BENCHMARKS, compare, run_benchmarks
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_every_benchmark_runs(self) -> None:
+        with contextlib.redirect_stderr(io.StringIO()) as log:
+            results = run_benchmarks([5, 11], list(BENCHMARKS), min_time=0.0)
+        self.assertEqual([(entry['op'], entry['size']) for entry in results['results']],
+                         [(op, size) for size in (5, 11) for op in BENCHMARKS])
+        for entry in results['results']:
+            self.assertGreater(entry['operations'], 0)
+            self.assertGreater(entry['median_s'], 0)
+        self.assertEqual(len(log.getvalue().splitlines()), 2 * len(BENCHMARKS))
+
+    def test_compare(self) -> None:
+        baseline = {'results': [{'op': 'get_tile', 'size': 5, 'median_s': 1e-6},
+                                {'op': 'draw', 'size': 5, 'median_s': 0.0}]}
+        results = {'results': [{'op': 'get_tile', 'size': 5, 'median_s': 1.2e-6},
+                               {'op': 'draw', 'size': 5, 'median_s': 1.0},
+                               {'op': 'move_player', 'size': 5, 'median_s': 1.0}]}
+        self.assertEqual(compare(results, baseline, 0.25), [])
+        self.assertEqual(compare(results, baseline, 0.1),
+                         ["get_tile at 5: 1.20x slower (1.00 us -> 1.20 us)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
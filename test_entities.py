@@ -0,0 +1,49 @@
+""" Tests for the player and item entities. """
+import unittest
+
+from a2 import ITEM_CLASSES, Apple, Honey, Player, Potion, Water
+
+
+class EntityTest(unittest.TestCase):
+    def test_entities_only_hold_their_slots(self) -> None:
+        player = Player([2, 3])
+        self.assertEqual(player.get_position(), (2, 3))
+        self.assertFalse(hasattr(player, '__dict__'))
+        for item_class in ITEM_CLASSES.values():
+            item = item_class((1, 2))
+            self.assertFalse(hasattr(item, '__dict__'))
+            with self.assertRaises(AttributeError):
+                item.player = player
+            self.assertEqual(repr(item), f"{item_class.__name__}((1, 2))")
+
+    def test_players_do_not_share_state(self) -> None:
+        first, second = Player((0, 0)), Player((0, 0))
+        first.add_item(Potion((0, 1)))
+        first.change_health(-10)
+        first.set_position((0, 1))
+        self.assertEqual(second.get_inventory().count('Potion'), 0)
+        self.assertEqual(second.get_health(), 100)
+        self.assertEqual(second.get_position(), (0, 0))
+
+    def test_items_apply_to_the_player_they_are_given(self) -> None:
+        player = Player((0, 0))
+        player.change_health(-30)
+        player.change_hunger(7)
+        player.change_thirst(7)
+        potion = Potion((0, 1))
+        potion.apply(player)
+        Apple((0, 2)).apply(player)
+        Honey((0, 3)).apply(player)
+        Water((0, 4)).apply(player)
+        self.assertEqual((player.get_health(), player.get_hunger(), player.get_thirst()),
+                         (90, 1, 2))
+        # Effects are clamped, and the same item works on another player.
+        potion.apply(player)
+        other = Player((0, 0))
+        other.change_health(-50)
+        potion.apply(other)
+        self.assertEqual((player.get_health(), other.get_health()), (100, 70))
+
+
+if __name__ == '__main__':
+    unittest.main()
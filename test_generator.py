@@ -0,0 +1,61 @@
+""" Tests for the random game generator. """
+import os
+import shutil
+import tempfile
+import unittest
+
+from a2 import load_game
+from generator import check_reachable, generate_game
+
+
+class GeneratorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def test_levels_load(self) -> None:
+        for dimensions in [(3, 3), (9, 12), (20, 31)]:
+            path = self.path('game.txt')
+            generate_game(path, 3, dimensions, seed=1, coins=0.1, items=0.1, lava=0.2)
+            levels = load_game(path)
+            self.assertEqual(len(levels), 3)
+            for level in levels:
+                self.assertEqual(level.get_dimensions(), dimensions)
+                self.assertEqual(level.get_player_start(), (1, 1))
+                self.assertIsNotNone(level.door_position)
+
+    def test_everything_is_reachable(self) -> None:
+        path = self.path('game.txt')
+        for seed in range(5):
+            generate_game(path, 2, (15, 15), seed=seed, coins=0.2, items=0.1, loops=0.1)
+            self.assertEqual(check_reachable(path), [])
+
+    def test_seed(self) -> None:
+        generate_game(self.path('a.txt'), 2, (11, 11), seed=7)
+        generate_game(self.path('b.txt'), 2, (11, 11), seed=7)
+        generate_game(self.path('c.txt'), 2, (11, 11), seed=8)
+        self.assertEqual(self.read(self.path('a.txt')), self.read(self.path('b.txt')))
+        self.assertNotEqual(self.read(self.path('a.txt')), self.read(self.path('c.txt')))
+
+    def test_too_small(self) -> None:
+        with self.assertRaises(ValueError):
+            generate_game(self.path('game.txt'), 1, (2, 5))
+
+    def test_check_reachable_reports_problems(self) -> None:
+        path = self.path('game.txt')
+        with open(path, 'w') as file:
+            file.write("Maze 1 - 1 5\nP#C D\n")
+        self.assertEqual(check_reachable(path),
+                         ["maze 1: (0, 2) cannot be reached from (0, 0)",
+                          "maze 1: (0, 4) cannot be reached from (0, 0)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+""" Tests for undoing and redoing commands with history.py. """
+import os
+import tempfile
+import unittest
+
+from a2 import Model
+from history import History
+
+# Through level 1 of game2.txt, then collecting and using items on level 2.
+COMMANDS = list('ddwwdd') + ['w'] + list('dd') + ['i Potion', 'i Apple'] + list('dddd') + ['i Honey']
+
+
+def state(model: Model) -> tuple:
+    return (model.index, model.player.get_position(), model.get_player_stats(),
+            str(model.get_player_inventory()), model.move_streak, model.did_level_up(),
+            {position: item.get_id() for position, item in model.get_current_items().items()},
+            str(model.get_current_maze()))
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = Model('game2.txt')
+        self.history = History()
+        self.model.history = self.history
+
+    def play(self) -> list[tuple]:
+        states = [state(self.model)]
+        for command in COMMANDS:
+            self.model.apply_command(command)
+            states.append(state(self.model))
+        return states
+
+    def test_undo_and_redo_everything(self) -> None:
+        states = self.play()
+        self.assertEqual(len(self.history), len(COMMANDS))
+        for expected in reversed(states[:-1]):
+            self.assertIsNotNone(self.history.undo(self.model))
+            self.assertEqual(state(self.model), expected)
+        self.assertFalse(self.history.can_undo())
+        self.assertIsNone(self.history.undo(self.model))
+        for expected in states[1:]:
+            self.assertIsNotNone(self.history.redo(self.model))
+            self.assertEqual(state(self.model), expected)
+        self.assertFalse(self.history.can_redo())
+        self.assertEqual(self.history.commands(), COMMANDS)
+
+    def test_undo_locks_the_door_again(self) -> None:
+        self.model.simulate('ddww')
+        self.assertEqual(self.model.get_current_maze().doors, [])
+        self.history.undo(self.model)
+        self.assertEqual(self.model.get_current_maze().doors, [(1, 4)])
+        self.assertEqual(self.model.get_player_inventory().count('Coin'), 2)
+        self.assertFalse(self.model.get_level().can_exit())
+
+    def test_undo_a_level_up(self) -> None:
+        self.model.simulate('ddwwdd')
+        before = state(self.model)
+        level = self.model.get_level()
+        self.model.apply_command('w')
+        self.assertEqual(self.model.index, 1)
+        self.history.undo(self.model)
+        self.assertIs(self.model.get_level(), level)
+        self.assertEqual(state(self.model), before)
+        self.assertTrue(self.model.did_level_up())
+
+    def test_new_command_drops_undone_ones(self) -> None:
+        self.model.simulate('ddw')
+        self.history.undo(self.model)
+        self.history.undo(self.model)
+        self.model.apply_command('a')
+        self.assertEqual(self.history.commands(), ['d', 'a'])
+        self.assertFalse(self.history.can_redo())
+        # Using an item the player does not have is recorded but changes nothing.
+        before = state(self.model)
+        self.model.apply_command('i Water')
+        self.history.undo(self.model)
+        self.assertEqual(state(self.model), before)
+
+    def test_restart_level(self) -> None:
+        self.play()
+        self.assertEqual(self.history.restart_level(self.model), len(COMMANDS) - 7)
+        self.assertEqual(self.model.index, 1)
+        self.assertEqual(self.model.player.get_position(), (1, 0))
+        # The move that went on to the level was made on the one before, so
+        # restarting again stays put until it is undone.
+        self.assertEqual(self.history.restart_level(self.model), 0)
+        self.history.undo(self.model)
+        self.assertEqual(self.model.index, 0)
+        self.assertEqual(self.history.restart_level(self.model), 6)
+        self.assertEqual(state(self.model), state(Model('game2.txt')))
+
+    def test_save_and_load(self) -> None:
+        states = self.play()
+        self.history.undo(self.model)
+        file = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        self.history.save(file.name, 'game2.txt')
+        model = Model('game2.txt')
+        history = History.load(file.name, model)
+        self.assertIs(model.history, history)
+        self.assertEqual(history.commands(), COMMANDS[:-1])
+        self.assertEqual(state(model), states[-2])
+
+
+if __name__ == '__main__':
+    unittest.main()
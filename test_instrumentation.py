@@ -0,0 +1,49 @@
+""" Tests for instrumentation.py, timing MazeRunner turns with a fake clock. """
+import contextlib
+import io
+import unittest
+
+from a2 import MazeRunner
+from a2_support import TextInterface
+from instrumentation import HistogramSink, Instrument
+
+
+class FakeClock():
+    """ A clock that only moves when advanced. """
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class InstrumentTest(unittest.TestCase):
+    def test_waiting_for_input_is_its_own_phase(self) -> None:
+        clock = FakeClock()
+        moves = iter(['x', 'd'])
+
+        def read_input(prompt: str) -> str:
+            clock.now += 10.0
+            return next(moves)
+
+        sink = HistogramSink()
+        runner = MazeRunner('game1.txt', TextInterface(), read_input, Instrument([sink], clock))
+        probe = runner.instrument
+        probe.start_turn()
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner.move_player()
+        record = probe.end_turn()
+        self.assertEqual(record.phases['wait'], 20.0)
+        self.assertEqual(record.phases['input'], 0.0)
+        self.assertEqual(record.total, 20.0)
+        self.assertEqual(sink.turns, 1)
+
+    def test_marks_outside_a_turn_are_ignored(self) -> None:
+        probe = Instrument(clock=FakeClock())
+        probe.mark('wait')
+        self.assertEqual(probe.phases, {})
+        self.assertIsNone(probe.end_turn())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+""" Tests for Inventory, in counted and keep_items modes. """
+import unittest
+
+from a2 import Coin, Inventory, Potion
+
+
+class InventoryTest(unittest.TestCase):
+    def test_counts(self) -> None:
+        inventory = Inventory([Potion((1, 1)), Coin((2, 2)), Potion((3, 3))])
+        self.assertEqual(inventory.count('Potion'), 2)
+        self.assertEqual(inventory.count('Coin'), 1)
+        self.assertEqual(inventory.count('Water'), 0)
+        self.assertEqual(len(inventory), 3)
+        self.assertEqual(str(inventory), 'Potion: 2\nCoin: 1')
+
+        inventory.add_item(Coin((4, 4)), 3)
+        self.assertEqual(inventory.count('Coin'), 4)
+        self.assertEqual(len(inventory.remove_items('Coin', 10)), 4)
+        self.assertEqual(inventory.count('Coin'), 0)
+        self.assertEqual(str(inventory), 'Potion: 2')
+
+    def test_remove_item(self) -> None:
+        inventory = Inventory([Potion((1, 1)), Potion((3, 3))])
+        first = inventory.remove_item('Potion')
+        second = inventory.remove_item('Potion')
+        self.assertIsInstance(first, Potion)
+        self.assertIsNot(first, second)
+        self.assertIsNone(inventory.remove_item('Potion'))
+        self.assertEqual(len(inventory), 0)
+
+    def test_keep_items_returns_the_added_items(self) -> None:
+        first, second = Potion((1, 1)), Potion((3, 3))
+        inventory = Inventory([first, second], keep_items=True)
+        self.assertIs(inventory.remove_item('Potion'), first)
+        self.assertIs(inventory.remove_item('Potion'), second)
+
+    def test_get_items_is_a_copy(self) -> None:
+        inventory = Inventory([Potion((1, 1)), Potion((3, 3))])
+        items = inventory.get_items()
+        self.assertEqual([item.get_name() for item in items['Potion']], ['Potion', 'Potion'])
+        self.assertIsNot(items['Potion'][0], items['Potion'][1])
+        items['Potion'].clear()
+        items['Coin'] = [Coin((2, 2))]
+        self.assertEqual(inventory.count('Potion'), 2)
+        self.assertEqual(inventory.count('Coin'), 0)
+
+    def test_repr(self) -> None:
+        inventory = Inventory([Potion((1, 1)), Coin((2, 2))])
+        self.assertEqual(repr(inventory), 'Inventory(initial_items=[Potion((1, 1)), Coin((2, 2))])')
+        kept = Inventory([Potion((1, 1))], keep_items=True)
+        self.assertEqual(repr(kept), 'Inventory(initial_items=[Potion((1, 1))], keep_items=True)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+""" Tests for level_array.py, run with whichever backend is installed. """
+import os
+import tempfile
+import unittest
+
+from a2 import LevelFormatError, load_game
+from level_array import HAS_NUMPY, LevelArrays, iter_level_arrays
+
+GAMES = ['game1.txt', 'game2.txt']
+
+
+class LevelArraysTest(unittest.TestCase):
+    def write_game(self, text: str) -> str:
+        file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_matches_levels(self) -> None:
+        for game in GAMES:
+            arrays = list(iter_level_arrays(game))
+            levels = load_game(game)
+            self.assertEqual(len(arrays), len(levels), game)
+            for level_arrays, level in zip(arrays, levels):
+                self.assertEqual(level_arrays.problems(), [])
+                self.assertEqual(level_arrays.get_player_start(), level.get_player_start())
+                self.assertEqual(level_arrays.find_doors(), level.get_maze().doors)
+                items = {position: item.get_id() for position, item in level.get_items().items()}
+                self.assertEqual({position: item.get_id()
+                                  for position, item in level_arrays.get_items().items()}, items)
+                self.assertEqual(level_arrays.count_coins(), list(items.values()).count('C'))
+
+    def test_from_level(self) -> None:
+        level = load_game('game1.txt')[0]
+        self.assertEqual(LevelArrays.from_level(level).rows, ['#####', '# C D', '# C #',
+                                                              'P C #', '#####'])
+
+    def test_grid_shape(self) -> None:
+        level_arrays = next(iter_level_arrays('game1.txt'))
+        grid = level_arrays.grid(level_arrays.terrain)
+        if HAS_NUMPY:
+            self.assertEqual(grid.shape, (5, 5))
+        else:
+            self.assertEqual(len(grid), 25)
+
+    def test_malformed_levels_are_returned_with_problems(self) -> None:
+        path = self.write_game("Maze 1 - 3 4\n#PP#\n#Z\n\nMaze 2 - 1 3\nP D\n")
+        first, second = iter_level_arrays(path)
+        self.assertEqual(first.problems(), ["has 2 rows, expected 3",
+                                            "has rows of width [2, 4], expected 4"])
+        self.assertFalse(first.is_valid())
+        self.assertTrue(second.is_valid())
+
+        path = self.write_game("Maze 1 - 1 4\nPQQD\n")
+        level_arrays, = iter_level_arrays(path)
+        self.assertEqual(level_arrays.problems(), ["has unknown characters ['Q']"])
+
+    def test_malformed_header(self) -> None:
+        path = self.write_game("Maze 1 - 1 3\nP D\nMaze two\n")
+        with self.assertRaises(LevelFormatError) as caught:
+            list(iter_level_arrays(path))
+        self.assertEqual(caught.exception.line_number, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
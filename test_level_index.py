@@ -0,0 +1,62 @@
+""" Tests for LevelIndex, on loaded levels and copy-on-write instances. """
+import unittest
+
+from a2 import COIN, LAVA, MOVE_DELTAS, WALL, Coin, LevelTemplates, Model, load_game
+
+
+class LevelIndexTest(unittest.TestCase):
+    def test_built_at_load(self) -> None:
+        for level in load_game('game2.txt'):
+            self.assertIsNotNone(level.index)
+            index = level.get_index()
+            self.assertIs(index, level.index)
+            self.assertEqual(index.start, level.get_player_start())
+            self.assertEqual(index.door, level.door_position)
+            maze = level.get_maze()
+            num_rows, num_columns = level.get_dimensions()
+            cells = [(row, column) for row in range(num_rows) for column in range(num_columns)]
+            for cell in cells:
+                tile = maze.get_tile(cell).get_id()
+                self.assertEqual(index.is_wall(cell), tile == WALL)
+                self.assertEqual(index.is_lava(cell), tile == LAVA)
+            self.assertEqual(list(index.lava_cells()),
+                             [cell for cell in cells if maze.get_tile(cell).get_id() == LAVA])
+            coins = {position for position, item in level.get_items().items()
+                     if item.get_id() == COIN}
+            self.assertEqual(index.item_positions(COIN), coins)
+
+    def test_follows_the_level(self) -> None:
+        level = load_game('game1.txt')[0]
+        index = level.get_index()
+        coins = sorted(index.item_positions(COIN))
+        level.add_player_start((1, 1))
+        self.assertEqual(index.start, (1, 1))
+        for position in coins:
+            self.assertFalse(level.can_exit())
+            level.remove_item(position)
+        self.assertEqual(index.item_positions(COIN), set())
+        self.assertTrue(level.can_exit())
+        level.attempt_unlock_door()
+        self.assertFalse(index.door_locked())
+        self.assertFalse(index.is_blocking(index.door))
+        level.put_item(coins[0], Coin(coins[0]))
+        self.assertEqual(index.item_positions(COIN), {coins[0]})
+        self.assertFalse(level.can_exit())
+
+    def test_instances_share_the_template_index_until_changed(self) -> None:
+        templates = LevelTemplates.open('game1.txt')
+        first = Model('game1.txt', levels=templates.levels())
+        second = Model('game1.txt', levels=templates.levels())
+        template_index = first.curr_level.template.get_index()
+        self.assertIs(first.get_level_index().items, template_index.items)
+        self.assertIs(first.get_level_index().walls, template_index.walls)
+
+        first.move_player(MOVE_DELTAS['d'])
+        first.move_player(MOVE_DELTAS['d'])
+        self.assertEqual(len(first.get_level_index().item_positions(COIN)), 2)
+        self.assertEqual(len(second.get_level_index().item_positions(COIN)), 3)
+        self.assertEqual(len(template_index.item_positions(COIN)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
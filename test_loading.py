@@ -0,0 +1,116 @@
+""" Tests for reading game files: validation, compiled levels and the cache. """
+import os
+import shutil
+import tempfile
+import unittest
+
+from a2 import Level, LevelFormatError, Model, iter_levels, load_game, open_levels
+from level_cache import cache_path, is_pack, read_cache, write_pack
+
+GAME = "Maze 1 - 3 4\n#P #\n#C D\n####\n\nMaze 2 - 1 3\nPMD\n"
+
+
+class LoadingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_game(self, text: str, name: str = 'game.txt') -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def assertFormatError(self, text: str, line_number: int, message: str) -> None:
+        path = self.write_game(text)
+        with self.assertRaises(LevelFormatError) as caught:
+            load_game(path)
+        self.assertEqual(caught.exception.line_number, line_number)
+        self.assertEqual(str(caught.exception), f"{path}:{line_number}: {message}")
+
+    def test_levels(self) -> None:
+        first, second = load_game(self.write_game(GAME))
+        self.assertEqual(first.get_dimensions(), (3, 4))
+        self.assertEqual(first.get_player_start(), (0, 1))
+        self.assertEqual(first.door_position, (1, 3))
+        self.assertEqual({position: item.get_id() for position, item in first.get_items().items()},
+                         {(1, 1): 'C'})
+        self.assertEqual(second.get_player_start(), (0, 0))
+
+    def test_malformed_files(self) -> None:
+        self.assertFormatError("#P D\n", 1, "row found before the first maze header")
+        self.assertFormatError("Maze 1 - 1\nP D\n", 1, "malformed maze header 'Maze 1 - 1'")
+        self.assertFormatError("Maze 1 - 1 3\nP  D\n", 2, "row has 4 columns, expected 3")
+        self.assertFormatError("Maze 1 - 1 3\nPXD\n", 2, "unknown character 'X' in column 1")
+        self.assertFormatError("Maze 1 - 2 3\nP D\n", 1, "maze has 1 rows, expected 2")
+        self.assertFormatError("Maze 1 - 1 3\nP D\n# #\n", 3, "maze has more than 1 rows")
+
+    def test_streaming(self) -> None:
+        # Levels before a malformed one are yielded before the error.
+        levels = iter_levels(self.write_game(GAME + "\nMaze 3 - 1 3\nP  D\n"))
+        self.assertEqual(next(levels).get_player_start(), (0, 1))
+        self.assertEqual(next(levels).get_player_start(), (0, 0))
+        with self.assertRaises(LevelFormatError):
+            next(levels)
+
+    def test_compiled_levels(self) -> None:
+        for level in load_game(self.write_game(GAME)) + load_game('game2.txt'):
+            copy = Level.from_compiled(level.compile())
+            self.assertEqual(copy.get_maze().maze, level.get_maze().maze)
+            self.assertEqual(copy.get_player_start(), level.get_player_start())
+            self.assertEqual(copy.door_position, level.door_position)
+            self.assertEqual({position: item.get_id() for position, item in copy.get_items().items()},
+                             {position: item.get_id() for position, item in level.get_items().items()})
+            self.assertEqual(copy.compile(), level.compile())
+
+    def test_cache(self) -> None:
+        path = self.write_game(GAME)
+        records = [level.compile() for level in load_game(path)]
+        self.assertFalse(os.path.exists(cache_path(path)))
+        self.assertEqual([level.compile() for level in load_game(path, use_cache=True)], records)
+        self.assertEqual(read_cache(path), records)
+        self.assertEqual([level.compile() for level in load_game(path, use_cache=True)], records)
+
+        # Touching the file without changing it keeps the cache.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(read_cache(path), records)
+
+        self.write_game(GAME + "\nMaze 3 - 1 3\nP D\n")
+        self.assertIsNone(read_cache(path))
+        self.assertEqual(len(load_game(path, use_cache=True)), 3)
+        self.assertEqual(read_cache(path), [level.compile() for level in load_game(path)])
+
+    def test_level_file_parses_only_the_levels_used(self) -> None:
+        path = self.write_game(GAME + "\nMaze 3 - 1 3\nP  D\n")
+        levels = open_levels(path)
+        self.assertEqual(len(levels), 3)
+        self.assertEqual(levels[1].get_player_start(), (0, 0))
+        with self.assertRaises(LevelFormatError) as caught:
+            levels[2]
+        self.assertEqual(caught.exception.line_number, 10)
+        self.assertEqual(Model(path).get_level().get_player_start(), (0, 1))
+
+        with self.assertRaises(LevelFormatError):
+            open_levels('constants.py')
+        self.assertEqual(len(open_levels(self.write_game('', 'empty.txt'))), 0)
+
+    def test_level_file_line_endings(self) -> None:
+        levels = open_levels(self.write_game(GAME.replace('\n', '\r\n')))
+        self.assertEqual([levels[index].compile() for index in range(len(levels))],
+                         [level.compile() for level in load_game(self.write_game(GAME, 'lf.txt'))])
+
+    def test_level_pack(self) -> None:
+        records = [level.compile() for level in load_game('game2.txt')]
+        path = os.path.join(self.directory, 'game2.mzc')
+        write_pack(path, records)
+        self.assertTrue(is_pack(path))
+        self.assertFalse(is_pack('game2.txt'))
+        levels = open_levels(path)
+        self.assertEqual([levels[index].compile() for index in range(len(levels))], records)
+        self.assertEqual(levels[-1].compile(), records[-1])
+        self.assertEqual(Model(path).simulate('ddwwddd').levels_cleared, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
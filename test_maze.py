@@ -0,0 +1,73 @@
+""" Tests for Maze's tile grid and doors. """
+import unittest
+
+from a2 import DOOR_CODE, EMPTY_CODE, TILE_FLYWEIGHTS, Door, Maze, Model
+from constants import DOOR, EMPTY, LAVA, WALL
+
+
+def build_maze(rows: list[str]) -> Maze:
+    maze = Maze((len(rows), len(rows[0])))
+    for row in rows:
+        maze.add_row(row)
+    return maze
+
+
+class MazeTest(unittest.TestCase):
+    def test_tiles(self) -> None:
+        maze = build_maze(['#L D',
+                           '#  #'])
+        self.assertEqual([[maze.get_tile((row, column)).get_id() for column in range(4)]
+                          for row in range(2)], [[WALL, LAVA, EMPTY, DOOR], [WALL, EMPTY, EMPTY, WALL]])
+        self.assertIs(maze.get_tile((0, 0)), maze.get_tile((1, 3)))
+        self.assertEqual(maze.get_tile((0, 1)).damage(), 5)
+        self.assertTrue(maze.get_tile((0, 3)).is_blocking())
+        self.assertEqual(maze.doors, [(0, 3)])
+        self.assertEqual(str(maze), '#L D\n#  #')
+
+    def test_outside_the_maze(self) -> None:
+        maze = build_maze(['# D'])
+        for position in [(-1, 0), (0, -1), (1, 0), (0, 3)]:
+            with self.assertRaises(IndexError):
+                maze.get_tile(position)
+
+    def test_unlock_door(self) -> None:
+        maze = build_maze(['#D#D'])
+        version = maze.version
+        maze.unlock_door()
+        self.assertEqual(maze.doors, [])
+        self.assertEqual(maze.get_tile((0, 1)).get_id(), EMPTY)
+        self.assertEqual(maze.tiles[3], EMPTY_CODE)
+        self.assertEqual(str(maze), '# # ')
+        self.assertGreater(maze.version, version)
+        maze.lock_doors([(0, 1), (0, 3)])
+        self.assertEqual(maze.tiles[1], DOOR_CODE)
+        self.assertEqual(str(maze), '#D#D')
+
+    def test_door_from_get_tile_opens_only_its_cell(self) -> None:
+        maze = build_maze(['#D#D'])
+        other = build_maze(['#D#D'])
+        door = maze.get_tile((0, 3))
+        door.unlock()
+        self.assertEqual(door.get_id(), EMPTY)
+        self.assertEqual(maze.doors, [(0, 1)])
+        self.assertEqual(str(maze), '#D# ')
+        self.assertEqual(other.doors, [(0, 1), (0, 3)])
+        self.assertEqual(TILE_FLYWEIGHTS[DOOR_CODE].get_id(), DOOR)
+
+    def test_door_unlock_in_a_game_does_not_leak(self) -> None:
+        first, second = Model('game1.txt'), Model('game1.txt')
+        door = first.curr_level.door_position
+        first.curr_level.get_maze().get_tile(door).unlock()
+        self.assertFalse(first.curr_level.get_maze().get_tile(door).is_blocking())
+        self.assertTrue(second.curr_level.get_maze().get_tile(door).is_blocking())
+
+    def test_shared_tiles_cannot_change(self) -> None:
+        with self.assertRaises(TypeError):
+            TILE_FLYWEIGHTS[DOOR_CODE].unlock()
+        door = Door()
+        door.unlock()
+        self.assertEqual(door.get_id(), EMPTY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+""" Tests for the game rules in Model.move_player and the level's item index. """
+import os
+import tempfile
+import unittest
+
+from a2 import MOVE_DELTAS, Coin, Model
+from constants import COIN
+
+
+class ModelTest(unittest.TestCase):
+    def open_game(self, text: str) -> Model:
+        file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return Model(file.name)
+
+    def move(self, model: Model, keys: str) -> None:
+        for key in keys:
+            model.move_player(MOVE_DELTAS[key])
+
+    def test_items_are_indexed_by_position(self) -> None:
+        model = Model('game1.txt')
+        items = model.get_current_items()
+        self.assertEqual(sorted(items), [(1, 2), (2, 2), (3, 2)])
+        self.assertTrue(all(isinstance(item, Coin) for item in items.values()))
+        self.assertIs(model.get_current_items()[(1, 2)], items[(1, 2)])
+
+        self.move(model, 'dd')
+        self.assertNotIn((3, 2), model.get_current_items())
+        self.assertEqual(model.get_player_inventory().count('Coin'), 1)
+        # Collected items are no longer part of the maze's terrain.
+        self.assertEqual(model.get_current_maze().get_tile((3, 2)).get_id(), ' ')
+
+    def test_player_position_and_lava(self) -> None:
+        model = self.open_game("Maze 1 - 2 4\nPL D\n#  #\n")
+        self.move(model, 'd')
+        self.assertEqual(model.player.get_position(), (0, 1))
+        # Lava takes its damage on top of the move's.
+        self.assertEqual(model.get_player_stats(), (94, 0, 0))
+        self.move(model, 'w')
+        self.assertEqual(model.player.get_position(), (0, 1))
+        self.assertEqual(model.get_player_stats(), (94, 0, 0))
+        self.move(model, 's')
+        self.assertEqual(model.player.get_position(), (1, 1))
+        self.assertEqual(model.get_player_stats(), (93, 0, 0))
+        # The player does not overwrite the terrain, and with no coins to
+        # collect the door opened on the first move.
+        self.assertEqual(str(model.get_current_maze()), ' L  \n#  #')
+
+    def test_hunger_and_thirst_every_five_moves(self) -> None:
+        model = self.open_game("Maze 1 - 1 7\nP     D\n")
+        self.move(model, 'dddd')
+        self.assertEqual(model.get_player_stats(), (96, 0, 0))
+        self.move(model, 'a')
+        self.assertEqual(model.get_player_stats(), (95, 1, 1))
+
+    def test_door_opens_with_the_last_coin(self) -> None:
+        model = self.open_game("Maze 1 - 1 5\nPCC D\n")
+        level = model.get_level()
+        self.move(model, 'd')
+        self.assertFalse(level.can_exit())
+        self.assertEqual(level.get_maze().doors, [(0, 4)])
+        self.move(model, 'd')
+        self.assertTrue(level.can_exit())
+        self.assertEqual(level.get_maze().doors, [])
+
+    def test_level_up_waits_for_the_next_move(self) -> None:
+        model = self.open_game("Maze 1 - 1 3\nPCD\n\nMaze 2 - 2 3\n  D\nP  \n")
+        self.move(model, 'dd')
+        self.assertTrue(model.did_level_up())
+        self.assertEqual(model.index, 0)
+        self.assertEqual(model.player.get_position(), (0, 2))
+        stats = model.get_player_stats()
+        # The next move only takes the player to the next level's start.
+        self.move(model, 'w')
+        self.assertFalse(model.did_level_up())
+        self.assertEqual(model.index, 1)
+        self.assertEqual(model.player.get_position(), (1, 0))
+        self.assertEqual(model.get_player_stats(), stats)
+        self.assertEqual(model.get_player_inventory().count('Coin'), 1)
+
+    def test_add_entity(self) -> None:
+        model = self.open_game("Maze 1 - 1 4\nP  D\n")
+        level = model.get_level()
+        level.add_entity((0, 1), COIN)
+        level.add_entity((0, 3), COIN)
+        self.assertEqual(list(level.get_items()), [(0, 1)])
+        self.assertFalse(level.can_exit())
+
+
+if __name__ == '__main__':
+    unittest.main()
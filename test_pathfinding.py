@@ -0,0 +1,108 @@
+""" Tests for pathfinding.py. """
+import time
+import unittest
+
+from a2 import WALL_CODE, Level, Model
+from pathfinding import (UNREACHABLE, distance, distance_field, is_reachable, path_to_nearest,
+                         reachable_cells, shortest_path)
+
+
+def build_level(rows: list[str]) -> Level:
+    level = Level((len(rows), len(rows[0])))
+    for row in rows:
+        level.add_row(row)
+    return level
+
+
+def serpentine(size: int) -> Level:
+    """ A maze of one corridor winding across every other row. """
+    rows = []
+    for row in range(size):
+        if row % 2 == 0:
+            rows.append(' ' * size)
+        elif row % 4 == 1:
+            rows.append('#' * (size - 1) + ' ')
+        else:
+            rows.append(' ' + '#' * (size - 1))
+    rows[0] = 'P' + rows[0][1:]
+    rows[-1] = rows[-1][:-1] + 'D'
+    return build_level(rows)
+
+
+class PathTest(unittest.TestCase):
+    def test_distance(self) -> None:
+        maze = build_level(['P #D',
+                            '#  #',
+                            '## #']).get_maze()
+        self.assertEqual(distance(maze, (0, 0), (2, 2)), 4)
+        self.assertEqual(distance(maze, (0, 0), (0, 0)), 0)
+        # A door with no open cell next to it cannot be reached.
+        self.assertIsNone(distance(maze, (0, 0), (0, 3)))
+        self.assertFalse(is_reachable(maze, (0, 0), (0, 3)))
+        self.assertTrue(is_reachable(maze, (2, 2), (1, 1)))
+        # One the player can stand next to can.
+        maze = build_level(['P D']).get_maze()
+        self.assertTrue(is_reachable(maze, (0, 0), (0, 2)))
+        self.assertEqual(distance(maze, (0, 0), (0, 2)), 2)
+
+    def test_shortest_path_avoids_lava(self) -> None:
+        maze = build_level(['PLLD',
+                            '    ']).get_maze()
+        self.assertEqual(shortest_path(maze, (0, 0), (0, 3)),
+                         [(0, 0), (1, 0), (1, 1), (1, 2), (1, 3), (0, 3)])
+        self.assertEqual(shortest_path(maze, (0, 0), (0, 3), weighted=False),
+                         [(0, 0), (0, 1), (0, 2), (0, 3)])
+        self.assertIsNone(shortest_path(build_level(['P#D']).get_maze(), (0, 0), (0, 2)))
+
+    def test_path_to_nearest(self) -> None:
+        level = Model('game1.txt').get_level()
+        maze = level.get_maze()
+        coins = list(level.get_items())
+        self.assertEqual(path_to_nearest(maze, (3, 0), coins), [(3, 0), (3, 1), (3, 2)])
+        self.assertEqual(path_to_nearest(maze, (1, 1), coins), [(1, 1), (1, 2)])
+        self.assertIsNone(path_to_nearest(maze, (3, 0), [(0, 0)]))
+        self.assertIsNone(path_to_nearest(maze, (3, 0), []))
+
+
+class ReachableCellsTest(unittest.TestCase):
+    def assertReachable(self, level: Level, cells: set[tuple[int, int]]) -> None:
+        num_columns = level.get_dimensions()[1]
+        reached = reachable_cells(level.get_index(), level.get_player_start())
+        self.assertEqual({divmod(bit, num_columns) for bit in range(reached.bit_length())
+                          if reached >> bit & 1}, cells)
+
+    def test_walls_and_locked_doors(self) -> None:
+        level = build_level(['P #  ',
+                             '###D#',
+                             '   C '])
+        self.assertReachable(level, {(0, 0), (0, 1)})
+        level = build_level(['P  D ',
+                             '#####'])
+        self.assertReachable(level, {(0, 0), (0, 1), (0, 2), (0, 3)})
+        level.get_maze().unlock_door()
+        self.assertReachable(level, {(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)})
+
+    def test_outside_the_maze(self) -> None:
+        level = build_level(['P D'])
+        with self.assertRaises(IndexError):
+            reachable_cells(level.get_index(), (1, 0))
+
+    def test_serpentine_maze(self) -> None:
+        level = serpentine(301)
+        maze = level.get_maze()
+        started = time.perf_counter()
+        reached = reachable_cells(level.get_index(), (0, 0))
+        flood_time = time.perf_counter() - started
+        started = time.perf_counter()
+        field = distance_field(maze, (0, 0))
+        field_time = time.perf_counter() - started
+
+        walls = {cell for cell in range(len(field)) if maze.tiles[cell] == WALL_CODE}
+        expected = {cell for cell, moves in enumerate(field) if moves != UNREACHABLE} - walls
+        self.assertEqual(reached, sum(1 << cell for cell in expected))
+        # Winding corridors must not make the flood slower than a BFS.
+        self.assertLess(flood_time, 3 * field_time + 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
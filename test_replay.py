@@ -0,0 +1,55 @@
+""" Tests for replaying recorded transcripts with replay.py. """
+import os
+import shutil
+import tempfile
+import unittest
+
+from replay import parse_transcript, replay, replay_all
+
+TRANSCRIPTS = ['attempt_exit_locked_door.txt', 'game_loss_hunger_and_thirst.txt',
+               'item_use.txt', 'simple_game.txt']
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_transcript(self, text: str) -> str:
+        path = os.path.join(self.directory, 'transcript.txt')
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def test_transcripts_pass(self) -> None:
+        results = replay_all(TRANSCRIPTS, jobs=1)
+        self.assertEqual([result.path for result in results], TRANSCRIPTS)
+        for result in results:
+            self.assertTrue(result.passed, result.detail)
+            self.assertIsNone(result.mismatch)
+
+    def test_parse_transcript(self) -> None:
+        transcript = parse_transcript('simple_game.txt')
+        self.assertEqual(transcript.game_file, 'games/game1.txt')
+        self.assertEqual(transcript.moves[0], 'd')
+
+    def test_mismatch(self) -> None:
+        with open('simple_game.txt') as file:
+            text = file.read()
+        path = self.write_transcript(text.replace('HP: 99', 'HP: 98', 1))
+        # The game file is only found through games_dir.
+        self.assertFalse(replay(path).passed)
+        result = replay(path, games_dir=os.getcwd())
+        self.assertFalse(result.passed)
+        self.assertEqual(result.mismatch, 1)
+        self.assertIn('-HP: 98', result.detail)
+        self.assertIn('+HP: 99', result.detail)
+
+    def test_not_a_transcript(self) -> None:
+        result = replay(self.write_transcript('#####\n'))
+        self.assertFalse(result.passed)
+        self.assertTrue(result.detail.startswith('ValueError'))
+
+
+if __name__ == '__main__':
+    unittest.main()
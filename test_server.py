@@ -0,0 +1,125 @@
+""" Tests for server.py, playing sessions through GameServer.connect_local. """
+import asyncio
+import gc
+import os
+import tempfile
+import unittest
+
+from server import (GAME_FILE_PROMPT, UNKNOWN_GAME_MESSAGE, UNKNOWN_SESSION_MESSAGE, GameServer,
+                    SessionPool)
+
+GAMES_DIR = os.path.dirname(os.path.abspath(__file__))
+MOVE_PROMPT = 'Enter a move: '
+TIMEOUT = 5
+
+
+class Client():
+    """ One end of a local connection, reading up to the next prompt. """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def read_until(self, text: str) -> str:
+        data = await asyncio.wait_for(self.reader.readuntil(text.encode()), TIMEOUT)
+        return data.decode()
+
+    async def send(self, line: str) -> None:
+        self.writer.write((line + '\n').encode())
+        await self.writer.drain()
+
+    async def open(self, answer: str) -> str:
+        """ Answers the game file prompt and returns the server's reply. """
+        await self.read_until(GAME_FILE_PROMPT)
+        await self.send(answer)
+        return (await asyncio.wait_for(self.reader.readline(), TIMEOUT)).decode().strip()
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.pool = SessionPool(GAMES_DIR, max_sessions=1)
+        self.server = GameServer(self.pool)
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+
+    async def connect(self) -> Client:
+        client = Client(*await self.server.connect_local())
+        # The session task must survive a collection while the client waits.
+        gc.collect()
+        return client
+
+    async def start(self) -> tuple[Client, str]:
+        client = await self.connect()
+        reply = await client.open('game1.txt')
+        self.assertTrue(reply.startswith('Session '), reply)
+        return client, reply[len('Session '):]
+
+    async def disconnect(self, client: Client, session_id: str) -> None:
+        await client.close()
+        session = self.pool.sessions[session_id]
+        while session.connected:
+            await asyncio.sleep(0.01)
+
+    async def test_play_disconnect_and_resume(self) -> None:
+        client, session_id = await self.start()
+        await client.read_until(MOVE_PROMPT)
+        await client.send('d')
+        frame = await client.read_until(MOVE_PROMPT)
+        self.assertIn('HP: 99', frame)
+        await self.disconnect(client, session_id)
+        self.assertIn(session_id, self.pool.sessions)
+
+        client = await self.connect()
+        self.assertEqual(await client.open(f"resume {session_id}"), f"Session {session_id}")
+        await client.read_until(MOVE_PROMPT)
+        await client.send('d')
+        frame = await client.read_until(MOVE_PROMPT)
+        self.assertIn('HP: 98', frame)
+        await self.disconnect(client, session_id)
+
+    async def test_unknown_session(self) -> None:
+        client = await self.connect()
+        self.assertEqual(await client.open('resume 0123'), UNKNOWN_SESSION_MESSAGE)
+        await client.close()
+
+    async def test_files_that_are_not_games(self) -> None:
+        for name in ('constants.py', 'missing.txt', '../game1.txt'):
+            client = await self.connect()
+            self.assertEqual(await client.open(name), UNKNOWN_GAME_MESSAGE)
+            await client.close()
+        self.assertEqual(len(self.pool), 0)
+
+    async def test_game_file_without_levels(self) -> None:
+        with tempfile.TemporaryDirectory() as games_dir:
+            open(os.path.join(games_dir, 'empty.txt'), 'w').close()
+            self.pool.games_dir = games_dir
+            client = await self.connect()
+            self.assertEqual(await client.open('empty.txt'), UNKNOWN_GAME_MESSAGE)
+            await client.close()
+        self.assertEqual(len(self.pool), 0)
+
+    async def test_new_session_is_not_evicted_when_pool_is_full(self) -> None:
+        first, first_id = await self.start()
+        second, second_id = await self.start()
+        self.assertIn(first_id, self.pool.sessions)
+        self.assertIn(second_id, self.pool.sessions)
+        await self.disconnect(second, second_id)
+        await self.disconnect(first, first_id)
+
+        # A third session evicts the disconnected ones, least recently used
+        # first, until the pool is back to max_sessions.
+        third, third_id = await self.start()
+        self.assertEqual(list(self.pool.sessions), [third_id])
+        await third.close()
+
+        client = await self.connect()
+        self.assertEqual(await client.open(f"resume {first_id}"), UNKNOWN_SESSION_MESSAGE)
+        await client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
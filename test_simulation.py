@@ -0,0 +1,98 @@
+""" Tests for running games headlessly with Model.simulate and batches of moves. """
+import os
+import tempfile
+import unittest
+
+from a2 import MOVE_DELTAS, Model, parse_moves
+
+# Moves through both levels of game1.txt, ending on the last door.
+GAME1_MOVES = 'ddwwdd' + 'w' + 'dddddd' + 'ss' + 'aaaaa' + 'ss' + 'ddddd' + 's'
+
+
+class SimulateTest(unittest.TestCase):
+    def open_game(self, text: str) -> Model:
+        file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return Model(file.name)
+
+    def test_win(self) -> None:
+        model = Model('game1.txt')
+        result = model.simulate(GAME1_MOVES)
+        self.assertEqual(result.levels_cleared, 1)
+        self.assertFalse(result.won)
+        # Commands after the game is won are not applied.
+        result = model.simulate('sd')
+        self.assertEqual(result, ((73, 5, 5), 2, True, False, 1))
+        self.assertTrue(model.has_won())
+
+    def test_loss(self) -> None:
+        model = self.open_game("Maze 1 - 1 3\nP D\n")
+        result = model.simulate('da' * 100)
+        self.assertTrue(result.lost)
+        self.assertFalse(result.won)
+        self.assertEqual(result.steps, 50)
+        self.assertEqual(result.stats, (50, 10, 10))
+
+    def test_commands(self) -> None:
+        model = Model('game2.txt')
+        result = model.simulate(['d', 'jump', 'i Potion', '', 'd'])
+        # Unknown commands are skipped; using a missing item still counts.
+        self.assertEqual(result.steps, 3)
+        self.assertEqual(result.stats, (98, 0, 0))
+
+    def test_level_up_on_the_last_level_does_not_exit(self) -> None:
+        model = self.open_game("Maze 1 - 1 3\nP D\n")
+        model.simulate('dd')
+        self.assertTrue(model.did_level_up())
+        model.level_up()
+        self.assertTrue(model.has_won())
+        self.assertEqual(model.index, 1)
+        # The last level stays current so it can still be drawn.
+        self.assertIs(model.get_level(), model.levels[0])
+
+
+class MoveBatchTest(unittest.TestCase):
+    def test_parse_moves(self) -> None:
+        right, up, left = MOVE_DELTAS['d'], MOVE_DELTAS['w'], MOVE_DELTAS['a']
+        self.assertEqual(parse_moves('dddwwa'),
+                         [(1, right), (1, right), (1, right), (1, up), (1, up), (1, left)])
+        self.assertEqual(parse_moves(' 5d2w '), [(5, right), (2, up)])
+        for command in ['', 'd5', 'i Potion', '5', 'dx', '5 d']:
+            self.assertIsNone(parse_moves(command), command)
+
+    def test_batch_stops_at_a_wall(self) -> None:
+        model = Model('game1.txt')
+        self.assertEqual(model.move_batch(parse_moves('9dw')), 3)
+        self.assertEqual(model.player.get_position(), (3, 3))
+
+    def test_batch_stops_at_the_door(self) -> None:
+        model = Model('game1.txt')
+        self.assertEqual(model.move_batch(parse_moves('ddwwddd')), 6)
+        self.assertEqual(model.player.get_position(), (1, 4))
+        self.assertTrue(model.did_level_up())
+        # Moving on to the next level ends the batch too.
+        self.assertEqual(model.move_batch(parse_moves('5d')), 1)
+        self.assertEqual(model.index, 1)
+        self.assertEqual(model.player.get_position(), (1, 0))
+
+    def test_batch_stops_when_the_game_is_lost(self) -> None:
+        model = Model('game1.txt')
+        model.simulate(['ddwwdd', 'w'])
+        model.player.change_health(3 - model.player.get_health())
+        self.assertEqual(model.move_batch(parse_moves('6d')), 3)
+        self.assertTrue(model.has_lost())
+        self.assertEqual(model.player.get_position(), (1, 3))
+        self.assertEqual(model.move_batch(parse_moves('d')), 0)
+
+    def test_batches_in_simulate(self) -> None:
+        model = Model('game1.txt')
+        result = model.simulate(['ddwwdd', 'w', '6d2s5a2s5ds', 's'])
+        # Each batch is one step.
+        self.assertEqual(result, ((73, 5, 5), 2, True, False, 4))
+        self.assertEqual(Model('game1.txt').simulate(GAME1_MOVES + 's')[:4], result[:4])
+
+
+if __name__ == '__main__':
+    unittest.main()
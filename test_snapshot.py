@@ -0,0 +1,74 @@
+""" Tests for saving and restoring a game with Model.snapshot and restore. """
+import os
+import tempfile
+import unittest
+
+from a2 import Model
+
+GAME2_MOVES = 'ddwwdd' + 'w' + 'dddddd' + 'ss' + 'aaaaa'
+
+
+def state(model: Model) -> tuple:
+    return (model.index, model.player.get_position(), model.get_player_stats(),
+            str(model.get_player_inventory()), model.move_streak, model.did_level_up(),
+            {position: item.get_id() for position, item in model.get_current_items().items()},
+            str(model.get_current_maze()))
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_round_trip_at_every_move(self) -> None:
+        model = Model('game2.txt')
+        for step, key in enumerate(GAME2_MOVES + 'ss'):
+            snapshot = model.snapshot()
+            copy = Model('game2.txt')
+            copy.restore(snapshot)
+            self.assertEqual(state(copy), state(model), step)
+            self.assertEqual(copy.snapshot(), snapshot)
+            model.apply_command(key)
+            copy.apply_command(key)
+            self.assertEqual(state(copy), state(model), step)
+
+    def test_restore_rewinds(self) -> None:
+        model = Model('game2.txt')
+        model.simulate('ddww')
+        snapshot = model.snapshot()
+        expected = state(model)
+        model.simulate(['dd', 'w', 'dd', 'i Potion', 'dddd'])
+        self.assertNotEqual(state(model), expected)
+        model.restore(snapshot)
+        self.assertEqual(state(model), expected)
+        # The door unlocked by the coins stays open.
+        self.assertEqual(model.get_current_maze().doors, [])
+
+    def test_added_items(self) -> None:
+        model = Model('game1.txt')
+        model.get_level().add_entity((1, 1), 'M')
+        copy = Model('game1.txt')
+        copy.restore(model.snapshot())
+        self.assertEqual(copy.get_current_items()[(1, 1)].get_id(), 'M')
+
+    def test_save_and_load(self) -> None:
+        model = Model('game2.txt')
+        model.simulate(GAME2_MOVES)
+        file = tempfile.NamedTemporaryFile(suffix='.snapshot', delete=False)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        model.save(file.name)
+        copy = Model('game2.txt')
+        copy.load(file.name)
+        self.assertEqual(state(copy), state(model))
+
+    def test_bad_snapshots(self) -> None:
+        snapshot = Model('game1.txt').snapshot()
+        with self.assertRaises(ValueError):
+            Model('game1.txt').restore(b'XXXX' + snapshot[4:])
+        file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        with file:
+            file.write("Maze 1 - 1 3\nP D\n")
+        self.addCleanup(os.remove, file.name)
+        with self.assertRaises(ValueError):
+            Model(file.name).restore(snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
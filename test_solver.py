@@ -0,0 +1,75 @@
+""" Tests for solver.py on small hand-made levels and the bundled games. """
+import unittest
+
+from a2 import Level, Model
+from solver import PlayerState, solve_game, solve_level
+
+
+def build_level(rows: list[str]) -> Level:
+    level = Level((len(rows), len(rows[0])))
+    for row in rows:
+        level.add_row(row)
+    return level
+
+
+class SolveLevelTest(unittest.TestCase):
+    def test_fewest_moves(self) -> None:
+        level = build_level(['#######',
+                             '#P   C#',
+                             '# ### #',
+                             '#     D',
+                             '#######'])
+        solution = solve_level(level)
+        self.assertTrue(solution.solvable)
+        self.assertEqual(solution.moves, 7)
+        # One more command on the open door ends the level.
+        self.assertEqual(solution.commands, list('ddddssdd'))
+        self.assertEqual(solution.end_state, PlayerState(93, 1, 1, 2))
+
+    def test_uses_items_only_when_needed(self) -> None:
+        level = build_level(['P    D'])
+        self.assertFalse(solve_level(level, PlayerState(hp=4)).solvable)
+        level = build_level(['PM   D'])
+        solution = solve_level(level, PlayerState(hp=4))
+        self.assertTrue(solution.solvable)
+        self.assertEqual(solution.commands, ['d', 'd', 'd', 'i Potion', 'd', 'd', 'd'])
+
+    def test_unreachable(self) -> None:
+        solution = solve_level(build_level(['P#D']))
+        self.assertFalse(solution.solvable)
+        self.assertEqual(solution.reason, "the door at (0, 2) cannot be reached")
+        solution = solve_level(build_level(['P D#C']))
+        self.assertFalse(solution.solvable)
+        self.assertEqual(solution.reason, "the Coin at (0, 4) cannot be reached")
+
+    def test_unsolvable_is_proven_despite_inexact_drops(self) -> None:
+        # Dropping states here ignores which honey each route picked up, so
+        # the level is only shown unsolvable by searching it again.
+        level = build_level(['#######',
+                             '#P H  #',
+                             '# # ###',
+                             '#H#L  D',
+                             '#######'])
+        solution = solve_level(level, PlayerState(hp=12, hunger=8, thirst=8))
+        self.assertIs(solution.solvable, False)
+        self.assertIn("even with every item", solution.reason)
+
+    def test_gives_up(self) -> None:
+        level = build_level(['P    ',
+                             '     ',
+                             '    D'])
+        solution = solve_level(level, max_states=2)
+        self.assertIsNone(solution.solvable)
+
+
+class SolveGameTest(unittest.TestCase):
+    def test_solutions_win(self) -> None:
+        for game in ('game1.txt', 'game2.txt'):
+            solutions = solve_game(game)
+            self.assertTrue(all(solution.solvable for solution in solutions))
+            commands = [command for solution in solutions for command in solution.commands]
+            self.assertTrue(Model(game).simulate(commands).won)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+""" Tests for sharing levels between games as copy-on-write templates. """
+import unittest
+
+from a2 import MOVE_DELTAS, ItemOverlay, Level, LevelTemplates, Maze, Model
+
+
+def build_maze(rows: list[str]) -> Maze:
+    maze = Maze((len(rows), len(rows[0])))
+    for row in rows:
+        maze.add_row(row)
+    return maze
+
+
+class TemplateTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.templates = LevelTemplates.open('game1.txt')
+        self.first = Model('game1.txt', self.templates.levels())
+        self.second = Model('game1.txt', self.templates.levels())
+
+    def move(self, model: Model, keys: str) -> None:
+        for key in keys:
+            model.move_player(MOVE_DELTAS[key])
+
+    def test_games_share_until_they_change(self) -> None:
+        template = self.templates[0]
+        for model in (self.first, self.second):
+            level = model.get_level()
+            self.assertIsNot(level, template)
+            self.assertIs(level.get_maze().tiles, template.get_maze().tiles)
+            self.assertIs(level.get_items(), template.get_items())
+
+        self.move(self.first, 'dd')
+        items = self.first.get_level().get_items()
+        self.assertIsInstance(items, ItemOverlay)
+        self.assertEqual(items.removed, {(3, 2)})
+        self.assertEqual(sorted(self.second.get_current_items()), [(1, 2), (2, 2), (3, 2)])
+        self.assertEqual(sorted(template.get_items()), [(1, 2), (2, 2), (3, 2)])
+
+    def test_unlocking_is_per_game(self) -> None:
+        template = self.templates[0]
+        self.move(self.first, 'ddww')
+        maze = self.first.get_current_maze()
+        self.assertEqual(maze.doors, [])
+        self.assertFalse(maze.get_tile((1, 4)).is_blocking())
+        # The unlocked terrain is itself shared rather than copied.
+        self.assertIs(maze.tiles, template.get_maze().unlocked().tiles)
+        for level in (self.second.get_level(), template):
+            self.assertEqual(level.get_maze().doors, [(1, 4)])
+            self.assertTrue(level.get_maze().get_tile((1, 4)).is_blocking())
+        self.assertFalse(self.second.get_level().can_exit())
+
+    def test_games_play_independently(self) -> None:
+        moves = 'ddwwdd' + 'w' + 'dddddd' + 'ss' + 'aaaaa' + 'ss' + 'ddddd' + 's' + 's'
+        self.assertTrue(self.first.simulate(moves).won)
+        self.assertEqual(self.second.simulate(moves), Model('game1.txt').simulate(moves))
+        # A fresh game from the same templates starts from the original levels.
+        self.assertEqual(Model('game1.txt', self.templates.levels()).get_current_items().keys(),
+                         self.templates[0].get_items().keys())
+
+    def test_opening_one_door_takes_a_private_copy(self) -> None:
+        template = build_maze(['D #D'])
+        maze = Maze.from_template(template)
+        maze.open_door((0, 0))
+        self.assertEqual(str(maze), '  #D')
+        self.assertEqual(maze.doors, [(0, 3)])
+        self.assertIsNot(maze.tiles, template.tiles)
+        self.assertEqual(str(template), 'D #D')
+        self.assertEqual(template.doors, [(0, 0), (0, 3)])
+
+    def test_level_from_template(self) -> None:
+        template = Model('game2.txt').levels[1]
+        level = Level.from_template(template)
+        self.assertEqual(level.compile(), template.compile())
+        level.remove_item(next(iter(level.get_items())))
+        self.assertEqual(len(level.get_items()), len(template.get_items()) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+""" Tests for the buffered and viewport text renderers in a2_support.py. """
+import io
+import os
+import unittest
+from unittest import mock
+
+from a2 import MOVE_DELTAS, Maze, Model
+from a2_support import (CLEAR_BELOW, CLEAR_LINE, CLEAR_SCREEN, BufferedTextInterface, TextInterface,
+                        ViewportTextInterface)
+
+TERMINAL = {'TERM': 'xterm', 'LINES': '40', 'COLUMNS': '80'}
+
+
+class TerminalStream(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+def draw(view: TextInterface, model: Model) -> None:
+    view.draw(model.get_current_maze(), model.get_current_items(), model.player.get_position(),
+              model.get_player_inventory(), model.get_player_stats())
+
+
+class BufferedTextInterfaceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(os.environ, TERMINAL)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_plain_stream_gets_full_frames(self) -> None:
+        model = Model('game1.txt')
+        stream = io.StringIO()
+        draw(BufferedTextInterface(stream), model)
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            draw(TextInterface(), model)
+        self.assertEqual(stream.getvalue(), stdout.getvalue())
+
+    def test_only_changed_cells_are_sent(self) -> None:
+        view = BufferedTextInterface()
+        self.assertEqual(view._frame_update(['#P #', 'HP: 5']),
+                         CLEAR_SCREEN + '#P #\nHP: 5\n')
+        self.assertEqual(view._frame_update(['# P#', 'HP: 4']),
+                         '\x1b[1;2H P\x1b[2;5H4\x1b[3;1H' + CLEAR_BELOW)
+        # Shorter lines clear what is left of the old one.
+        self.assertEqual(view._frame_update(['# P#', 'HP: 45']),
+                         '\x1b[2;6H5\x1b[3;1H' + CLEAR_BELOW)
+        self.assertEqual(view._frame_update(['# P#', 'HP:']),
+                         '\x1b[2;4H' + CLEAR_LINE + '\x1b[3;1H' + CLEAR_BELOW)
+
+    def test_full_redraws(self) -> None:
+        view = BufferedTextInterface()
+        view._frame_update(['#P #', 'HP: 5'])
+        # A frame with a different number of lines,
+        self.assertTrue(view._frame_update(['#P #']).startswith(CLEAR_SCREEN))
+        # one after a reset,
+        view.reset()
+        self.assertTrue(view._frame_update(['#P #']).startswith(CLEAR_SCREEN))
+        # and one too tall to leave room for the prompt are drawn in full.
+        lines = ['#'] * 38
+        view._frame_update(lines)
+        self.assertTrue(view._frame_update(lines).startswith(CLEAR_SCREEN))
+
+    def test_terminal_frames_replay_the_game(self) -> None:
+        model = Model('game1.txt')
+        stream = TerminalStream()
+        view = BufferedTextInterface(stream)
+        draw(view, model)
+        first = stream.getvalue()
+        self.assertTrue(first.startswith(CLEAR_SCREEN))
+        model.move_player(MOVE_DELTAS['d'])
+        draw(view, model)
+        update = stream.getvalue()[len(first):]
+        self.assertLess(len(update), len(first) - len(CLEAR_SCREEN))
+        self.assertTrue(update.endswith(CLEAR_BELOW))
+
+        with mock.patch.dict(os.environ, {'TERM': 'dumb'}):
+            stream = TerminalStream()
+            draw(BufferedTextInterface(stream), model)
+        self.assertFalse(stream.getvalue().startswith(CLEAR_SCREEN))
+
+
+class BufferedViewport(ViewportTextInterface, BufferedTextInterface):
+    pass
+
+
+class ViewportTextInterfaceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(os.environ, TERMINAL)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.maze = Maze((10, 10))
+        for _ in range(10):
+            self.maze.add_row(' ' * 10)
+
+    def test_window_follows_the_player(self) -> None:
+        view = ViewportTextInterface((3, 4))
+        self.assertEqual(view.get_window(self.maze, (5, 5)), (4, 3, 3, 4))
+        # The window stops at the edges of the maze.
+        self.assertEqual(view.get_window(self.maze, (0, 0)), (0, 0, 3, 4))
+        self.assertEqual(view.get_window(self.maze, (9, 9)), (7, 6, 3, 4))
+        # It never grows past the maze either.
+        self.assertEqual(ViewportTextInterface((20, 30)).get_window(self.maze, (5, 5)),
+                         (0, 0, 10, 10))
+
+    def test_window_fits_the_terminal(self) -> None:
+        view = ViewportTextInterface()
+        with mock.patch.dict(os.environ, {'LINES': '8', 'COLUMNS': '6'}):
+            # Three lines are kept free for the prompt until a frame is drawn.
+            self.assertEqual(view.get_window(self.maze, (5, 5)), (3, 2, 5, 6))
+
+    def test_lines_show_the_window(self) -> None:
+        model = Model('game1.txt')
+        maze = model.get_current_maze()
+        view = ViewportTextInterface((2, 3))
+        lines = view._level_lines(maze, model.get_current_items(), model.player.get_position())
+        full = TextInterface()._level_lines(maze, model.get_current_items(), model.player.get_position())
+        top, left, height, width = view.get_window(maze, model.player.get_position())
+        self.assertEqual(lines, [line[left:left + width] for line in full[top:top + height]])
+        self.assertIn('P', ''.join(lines))
+
+    def test_buffered_viewport(self) -> None:
+        model = Model('game1.txt')
+        stream = io.StringIO()
+        view = BufferedViewport(size=(2, 3), stream=stream)
+        draw(view, model)
+        frame = stream.getvalue().split('\n')
+        self.assertEqual([len(line) for line in frame[:2]], [3, 3])
+        self.assertEqual(frame[2], '---------------')
+
+
+if __name__ == '__main__':
+    unittest.main()